@@ -2,7 +2,7 @@
 
 import uuid
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, Request, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.schemas.claim import (
@@ -10,9 +10,15 @@ from app.schemas.claim import (
     ClaimResponse, 
     ClaimUpdate, 
     ClaimListResponse,
-    FileUploadResponse
+    BatchUploadResponse,
+    ClaimScoreRequest,
+    ClaimScoreResponse,
+    FileByHashRequest,
+    FileUploadResponse,
+    ImageReuseItem
 )
 from app.services.claim_service import ClaimService
+from app.services.file_download import FileDownloadService
 from app.services.file_service import FileService
 from app.services.local_file_service import LocalFileService
 from app.config import settings
@@ -48,6 +54,19 @@ async def get_claims(
     return await claim_service.get_user_claims(current_user.id, page, size)
 
 
+@router.post("/scores", response_model=ClaimScoreResponse)
+async def score_claims(
+    payload: ClaimScoreRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Instant heuristic strength scores for a batch of claims."""
+    claim_service = ClaimService(db)
+    
+    scores = await claim_service.score_claims(current_user.id, payload.claim_ids)
+    return ClaimScoreResponse(scores=scores)
+
+
 @router.get("/{claim_id}", response_model=ClaimResponse)
 async def get_claim(
     claim_id: uuid.UUID,
@@ -146,7 +165,75 @@ async def upload_file(
     else:
         file_service = LocalFileService(db)
     
-    return await file_service.upload_file(claim_id, file)
+    uploaded = await file_service.upload_file(claim_id, file)
+    # Photo count feeds the heuristic score, so refresh it
+    await claim_service.score_claims(current_user.id, [claim_id])
+    return uploaded
+
+
+@router.post("/{claim_id}/files/batch", response_model=BatchUploadResponse)
+async def upload_files(
+    claim_id: uuid.UUID,
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload several files to a claim in one request.
+    
+    Each file gets its own status; one bad file does not fail the batch.
+    """
+    claim_service = ClaimService(db)
+    if not await claim_service.owns_claim(claim_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Claim not found"
+        )
+    
+    # Choose file service based on configuration
+    if settings.aws_access_key_id and settings.aws_secret_access_key:
+        file_service = FileService(db)
+    else:
+        file_service = LocalFileService(db)
+    
+    batch = await file_service.upload_files(claim_id, files)
+    if batch.uploaded:
+        await claim_service.score_claims(current_user.id, [claim_id])
+    return batch
+
+
+@router.post("/{claim_id}/files/by-hash", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED)
+async def attach_file_by_hash(
+    claim_id: uuid.UUID,
+    request: FileByHashRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Attach a file the user already uploaded, identified by SHA-256.
+    
+    Returns 404 when the content is unknown; the client then uploads it.
+    """
+    claim_service = ClaimService(db)
+    claim = await claim_service.get_claim_by_id(claim_id, current_user.id)
+    if not claim:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Claim not found"
+        )
+    
+    # Choose file service based on configuration
+    if settings.aws_access_key_id and settings.aws_secret_access_key:
+        file_service = FileService(db)
+    else:
+        file_service = LocalFileService(db)
+    
+    attached = await file_service.attach_by_hash(claim_id, current_user.id, request.sha256, request.filename)
+    if not attached:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No file with this hash; upload it instead"
+        )
+    await claim_service.score_claims(current_user.id, [claim_id])
+    return attached
 
 
 @router.get("/{claim_id}/files", response_model=List[FileUploadResponse])
@@ -181,12 +268,46 @@ async def get_claim_files(
             file_size=file.file_size,
             content_type=file.content_type,
             s3_url=file.s3_url,
+            sha256=file.sha256,
+            thumbnail_url=file.thumbnail_url,
+            preview_url=file.preview_url,
             created_at=file.created_at
         )
         for file in files
     ]
 
 
+@router.get("/{claim_id}/files/reuse", response_model=List[ImageReuseItem])
+async def get_reused_images(
+    claim_id: uuid.UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Flag images of a claim that were also submitted with the user's other claims."""
+    claim_service = ClaimService(db)
+    if not await claim_service.owns_claim(claim_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Claim not found"
+        )
+    return await claim_service.find_reused_images(claim_id, current_user.id)
+
+
+@router.get("/files/{file_id}/content")
+async def download_file(
+    file_id: uuid.UUID,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Download a file the user owns.
+    
+    Supports Range, ETag/If-None-Match and Last-Modified for local storage;
+    S3 files redirect to a short-lived presigned URL.
+    """
+    return await FileDownloadService(db).download(file_id, current_user.id, request.headers)
+
+
 @router.delete("/files/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_file(
     file_id: uuid.UUID,
@@ -5,6 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from app.database import get_db
 from app.config import settings
+from app.repositories.jobs_repo import JobsRepo
+from app.services.retention import memory_gauges
+from app.services.s3_client import s3_metrics
+from app.services.virus_scan_service import scan_metrics
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -37,3 +41,21 @@ async def database_health_check(db: AsyncSession = Depends(get_db)):
             "database": "disconnected",
             "error": str(e)
         }
+
+
+@router.get("/storage")
+async def storage_metrics():
+    """Per-operation S3 latency metrics for this process."""
+    return {"s3": s3_metrics()}
+
+
+@router.get("/scanner")
+async def scanner_metrics():
+    """Virus-scan queue depth, latency and verdict-cache counters for this process."""
+    return {"queued": await JobsRepo().queue_depth("file_scan"), **scan_metrics()}
+
+
+@router.get("/memory")
+async def memory_metrics():
+    """RSS and entry counts of the in-process job, draft and PDF URL stores."""
+    return await memory_gauges()
@@ -7,17 +7,25 @@ from app.container import (
     get_ai_drafting_service,
     get_claims_repo,
     get_email_service,
+    get_files_repo,
     get_idempotency_service,
     get_pdf_service,
     get_submission_service,
 )
-from app.domain.dto.requests import CreateClaimRequest, StartDraftRequest, UpdateClaimRequest
-from app.domain.dto.responses import ClaimResponse, JobResponse, PDFResponse
+from app.domain.dto.requests import (
+    CreateClaimRequest,
+    StartDraftRequest,
+    UpdateClaimRequest,
+    ValidateClaimsRequest,
+)
+from app.domain.dto.responses import ClaimResponse, JobResponse, PDFResponse, ValidateClaimsResponse
 from app.repositories.claims_repo import ClaimsRepo
+from app.repositories.files_repo import FilesRepo
 from app.services.ai_drafting_service import AIDraftingService
 from app.services.email_service import EmailService
 from app.services.idempotency_service import IdempotencyService
 from app.services.pdf_service import PDFService
+from app.services.photo_metadata import apply_attachment_metadata
 from app.services.submission_service import SubmissionService
 
 router = APIRouter(prefix="/v1/claims", tags=["claims"])
@@ -27,6 +35,7 @@ router = APIRouter(prefix="/v1/claims", tags=["claims"])
 async def create_claim(
     payload: CreateClaimRequest,
     claims: ClaimsRepo = Depends(get_claims_repo),
+    files: FilesRepo = Depends(get_files_repo),
     idempo: IdempotencyService = Depends(get_idempotency_service),
     user=Depends(get_current_user),
     idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
@@ -35,6 +44,7 @@ async def create_claim(
     if cached:
         return cached
     claim = await claims.create(user.id, payload)
+    await apply_attachment_metadata(claim, files)
     resp = await claims.to_response(claim)
     idempo.set(user.id, idempotency_key, resp)
     return resp
@@ -52,6 +62,15 @@ async def list_claims(
     return {"items": [await claims.to_response(c) for c in items], "next_cursor": next_cursor}
 
 
+@router.post("/validate", response_model=ValidateClaimsResponse)
+async def validate_claims(
+    payload: ValidateClaimsRequest,
+    ai: AIDraftingService = Depends(get_ai_drafting_service),
+    user=Depends(get_current_user),
+):
+    return await ai.validate_claims(user.id, payload.claim_ids)
+
+
 @router.get("/{claim_id}", response_model=ClaimResponse)
 async def get_claim(claim_id: str, claims: ClaimsRepo = Depends(get_claims_repo), user=Depends(get_current_user)):
     claim = await claims.get(user.id, claim_id)
@@ -63,9 +82,12 @@ async def update_claim(
     claim_id: str,
     payload: UpdateClaimRequest,
     claims: ClaimsRepo = Depends(get_claims_repo),
+    files: FilesRepo = Depends(get_files_repo),
     user=Depends(get_current_user),
 ):
     updated = await claims.update(user.id, claim_id, payload)
+    if payload.attachments is not None:
+        await apply_attachment_metadata(updated, files)
     return await claims.to_response(updated)
 
 
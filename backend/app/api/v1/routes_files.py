@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
 
 from app.auth.dependencies import get_current_user
 from app.container import get_storage_service
-from app.domain.dto.requests import CreateFileRequest
-from app.domain.dto.responses import CreateFileResponse, FileResponse
+from app.domain.dto.requests import CreateFileRequest, CreateUploadSessionRequest
+from app.domain.dto.responses import CreateFileResponse, FileResponse, UploadSessionResponse
 from app.services.storage_service import StorageService
 
 router = APIRouter(prefix="/v1/files", tags=["files"])
@@ -21,6 +21,27 @@ async def create_file_slot(
     return await storage.create_upload_slot(user.id, payload, idempotency_key)
 
 
+@router.put("/{file_id}/content", status_code=204)
+async def put_file_content(
+    file_id: str,
+    request: Request,
+    max_bytes: int = Query(...),
+    expires: int = Query(...),
+    signature: str = Query(...),
+    storage: StorageService = Depends(get_storage_service),
+):
+    # Authorised by the signed URL from create_file_slot (local storage only)
+    await storage.receive_local_upload(
+        file_id,
+        request.headers.get("content-type"),
+        max_bytes,
+        expires,
+        signature,
+        request.stream(),
+    )
+    return Response(status_code=204)
+
+
 @router.post("/{file_id}/complete", response_model=FileResponse, status_code=202)
 async def complete_upload(
     file_id: str,
@@ -38,3 +59,41 @@ async def get_file(
 ):
     return await storage.get_file(user.id, file_id)
 
+
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(
+    payload: CreateUploadSessionRequest,
+    storage: StorageService = Depends(get_storage_service),
+    user=Depends(get_current_user),
+):
+    return await storage.create_upload_session(user.id, payload)
+
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    storage: StorageService = Depends(get_storage_service),
+    user=Depends(get_current_user),
+):
+    return await storage.get_upload_session(user.id, session_id)
+
+
+@router.patch("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def append_upload_chunk(
+    session_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    storage: StorageService = Depends(get_storage_service),
+    user=Depends(get_current_user),
+):
+    return await storage.append_upload_chunk(user.id, session_id, upload_offset, request.stream())
+
+
+@router.post("/uploads/{session_id}/complete", response_model=FileResponse, status_code=202)
+async def complete_upload_session(
+    session_id: str,
+    storage: StorageService = Depends(get_storage_service),
+    user=Depends(get_current_user),
+):
+    return await storage.complete_upload_session(user.id, session_id)
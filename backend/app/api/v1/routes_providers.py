@@ -3,9 +3,10 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, Query
 
 from app.auth.dependencies import get_current_user
-from app.container import get_providers_repo
+from app.container import get_files_repo, get_providers_repo
 from app.domain.dto.requests import PolicyValidationRequest
 from app.domain.dto.responses import PolicyValidationResult
+from app.repositories.files_repo import FilesRepo
 from app.repositories.providers_repo import ProvidersRepo
 
 router = APIRouter(prefix="/v1/providers", tags=["providers"])
@@ -28,7 +29,11 @@ async def search_providers(
 async def validate_policy(
     payload: PolicyValidationRequest,
     providers: ProvidersRepo = Depends(get_providers_repo),
+    files: FilesRepo = Depends(get_files_repo),
     user=Depends(get_current_user),
 ):
-    return await providers.validate_policy(payload)
+    document = None
+    if payload.policy_file_id:
+        document = (await files.get(user.id, payload.policy_file_id)).policy
+    return await providers.validate_policy(payload, document)
 
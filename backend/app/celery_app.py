@@ -23,4 +23,14 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    beat_schedule={
+        "collect-storage-garbage": {
+            "task": "app.tasks.collect_storage_garbage",
+            "schedule": settings.storage_gc_interval,
+        },
+        "purge-deleted-claims": {
+            "task": "app.tasks.purge_deleted_claims",
+            "schedule": settings.claim_purge_sweep_interval,
+        },
+    },
 )
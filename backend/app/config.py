@@ -1,7 +1,7 @@
 """Application configuration settings."""
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseSettings, validator
 
 
@@ -20,12 +20,23 @@ class Settings(BaseSettings):
     # OpenAI
     openai_api_key: Optional[str] = None
     openai_model: str = "gpt-4-vision-preview"
+    ai_prompt_token_budget: int = 6000  # estimated prompt tokens per request
+    ai_max_completion_tokens: int = 2000
+    ai_summary_batch_size: int = 20  # claims packed into one summary prompt
+    ai_summary_description_tokens: int = 400  # per-claim description cap in batches
+    ai_summary_requeue_after: int = 300  # seconds before list views may queue the same stale claim again
     
     # AWS
     aws_access_key_id: Optional[str] = None
     aws_secret_access_key: Optional[str] = None
     aws_region: str = "us-east-1"
     s3_bucket_name: str = "claimmax-ai-files"
+    s3_multipart_threshold: int = 8388608  # 8MB; smaller uploads use one PUT
+    s3_multipart_part_size: int = 8388608  # S3 requires parts >= 5MB
+    s3_max_concurrency: int = 32  # executor threads and pooled connections
+    s3_connect_timeout: float = 5.0
+    s3_read_timeout: float = 60.0
+    presigned_download_expires: int = 300  # seconds; file downloads redirect to these
     
     # Application
     environment: str = "development"
@@ -34,8 +45,67 @@ class Settings(BaseSettings):
     
     # File Upload
     max_file_size: int = 10485760  # 10MB
+    upload_chunk_size: int = 1048576  # 1MB read size when streaming uploads
+    local_io_workers: int = 8  # disk I/O threads for local file storage
+    local_upload_fsync: bool = False
+    local_accel_redirect_prefix: Optional[str] = None  # e.g. "/protected"; nginx then sendfiles downloads
+    presigned_upload_expires: int = 900  # seconds a direct-upload URL stays valid
+    upload_session_ttl: int = 86400  # seconds an idle resumable upload is kept
+    public_base_url: str = "http://localhost:8000"  # base for locally signed upload URLs
+    upload_batch_concurrency: int = 4  # files stored in parallel per batch request
+    upload_batch_max_files: int = 50
+    derivative_workers: int = 2  # processes rendering thumbnails and previews
+    image_duplicate_distance: int = 6  # max pHash bits apart for two photos to count as the same shot
+    image_reuse_index_users: int = 1000  # per-user pHash indexes kept in each API process
     allowed_extensions: List[str] = ["jpg", "jpeg", "png", "gif", "pdf"]
     
+    # Storage garbage collection
+    storage_gc_interval: int = 3600  # seconds between collect_storage_garbage runs (Celery beat)
+    storage_gc_min_age: int = 86400  # objects younger than this are never collected
+    storage_gc_delete_rate: int = 1000  # objects deleted per second at most
+    claim_purge_sweep_interval: int = 900  # seconds; deleted claims still present after this are purged by the sweep
+    
+    # Virus scanning (clamd)
+    clamd_host: str = "localhost"
+    clamd_port: int = 3310
+    clamd_socket: Optional[str] = None  # unix socket path; overrides host/port
+    clamd_pool_size: int = 4  # pooled sessions, i.e. concurrent scans per worker
+    clamd_timeout: float = 60.0  # seconds per scan
+    scan_verdict_cache_size: int = 100000  # (sha256, signature version) verdicts kept
+    
+    # OCR (Tesseract)
+    ocr_workers: int = max(1, (os.cpu_count() or 2) - 1)  # page processes; 0 runs OCR inline
+    ocr_worker_memory_mb: int = 1024  # address-space cap per worker and its tesseract; 0 = none
+    ocr_max_tasks_per_child: int = 200  # pages before a worker process is replaced
+    ocr_max_pages: int = 50  # pages OCR'd per file
+    ocr_languages: str = "eng"
+    ocr_cache_size: int = 1000  # (sha256, engine version) results kept
+    policy_extract_cache_size: int = 1000  # policy PDFs whose extracted fields are kept
+    
+    # Retention for in-process stores (finished jobs, claim drafts, PDF URLs)
+    memory_sweep_interval: int = 60  # seconds between retention sweeps
+    job_retention_seconds: int = 3600  # finished jobs stay readable this long
+    job_retention_by_type: Dict[str, int] = {}  # per job type overrides, e.g. {"file_exif": 300}
+    job_retention_max: int = 10000  # finished jobs kept per type, oldest dropped first
+    claim_draft_ttl: int = 7 * 86400  # seconds a draft is kept after its last use
+    claim_draft_max: int = 10000
+    pdf_url_ttl: int = 86400
+    pdf_url_max: int = 10000
+    
+    # Worker wakeup
+    job_wakeup_redis: bool = False  # also signal idle workers in other processes via Redis BLPOP
+    worker_poll_min_interval: float = 0.01  # first idle wait; doubles while idle
+    worker_poll_max_interval: float = 1.0  # longest idle wait without a notification
+    
+    # Worker pool and job leases
+    worker_draft_concurrency: int = 32  # drafting jobs in flight per worker; they mostly wait on I/O
+    worker_concurrency: Dict[str, int] = {}  # per job type overrides of jobs in flight, e.g. {"file_exif": 32}
+    worker_shutdown_grace: float = 30.0  # seconds SIGTERM waits for in-flight jobs before requeueing them
+    job_lease_seconds: int = 60  # a running job is requeued when its lease is not renewed within this
+    job_heartbeat_interval: float = 15.0  # seconds between lease renewals of in-flight jobs
+    job_max_attempts: int = 3  # leases a job may lose before it is failed instead of requeued
+    job_retry_delay: float = 30.0  # seconds before a job that hit a transient error runs again; doubles per attempt
+    
     # Celery
     celery_broker_url: str = "redis://localhost:6379/1"
     celery_result_backend: str = "redis://localhost:6379/2"
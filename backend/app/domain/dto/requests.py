@@ -14,6 +14,14 @@ class CreateFileRequest(BaseModel):
     bytes: Optional[int] = None
 
 
+class CreateUploadSessionRequest(BaseModel):
+    purpose: Literal["incident_image", "policy_pdf", "other"]
+    content_type: str
+    filename: Optional[str] = None
+    # Total size is required so the server knows when the upload is whole
+    bytes: int = Field(..., gt=0)
+
+
 class CreateClaimRequest(BaseModel):
     claim_type: ClaimType
     provider_id: Optional[str] = None
@@ -46,4 +54,11 @@ class PolicyValidationRequest(BaseModel):
     claim_type: ClaimType
     policy_number: str
     email: Optional[EmailStr] = None
+    # An uploaded policy_pdf to cross-check the number against
+    policy_file_id: Optional[str] = None
+
+
 
+class ValidateClaimsRequest(BaseModel):
+    # None validates every claim the user owns
+    claim_ids: Optional[List[str]] = None
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
@@ -7,7 +8,20 @@ from pydantic import BaseModel, Field
 class CreateFileResponse(BaseModel):
     file_id: str
     upload_url: str
+    # PUT the raw body with `headers`, or POST multipart form `fields` + file
+    method: str = "PUT"
     headers: Dict[str, str] = Field(default_factory=dict)
+    fields: Dict[str, str] = Field(default_factory=dict)
+    expires_in: int = 0
+
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    file_id: str
+    offset: int
+    size: int
+    chunk_size: int
+    expires_at: datetime
 
 
 class FileResponse(BaseModel):
@@ -19,6 +33,7 @@ class FileResponse(BaseModel):
     status: str
     virus_scan: str
     ocr_text: Optional[str]
+    policy: Optional[Dict[str, Any]] = None  # fields extracted from policy_pdf uploads
 
 
 class ClaimResponse(BaseModel):
@@ -56,3 +71,20 @@ class PolicyValidationResult(BaseModel):
 class PDFResponse(BaseModel):
     url: Optional[str]
 
+
+
+class ValidationIssueResponse(BaseModel):
+    code: str
+    severity: str
+    message: str
+
+
+class ClaimValidationResult(BaseModel):
+    claim_id: str
+    issues: List[ValidationIssueResponse] = Field(default_factory=list)
+
+
+class ValidateClaimsResponse(BaseModel):
+    items: List[ClaimValidationResult] = Field(default_factory=list)
+    total: int
+    with_errors: int
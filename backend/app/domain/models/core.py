@@ -22,6 +22,46 @@ class File:
     status: str = "pending"  # pending|uploaded|scanning|ready|failed
     virus_scan: str = "unknown"  # clean|infected|unknown
     ocr_text: Optional[str] = None
+    storage_key: Optional[str] = None  # object key (S3) or path under uploads/
+    sha256: Optional[str] = None  # content hash, known once the upload is stored
+    policy: Optional["PolicyFields"] = None  # extracted from policy_pdf uploads
+    photo_metadata: Optional[Dict[str, Any]] = None  # EXIF capture time, GPS, camera
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass
+class PolicyFields:
+    policy_number: Optional[str] = None
+    coverage_limits: Dict[str, str] = field(default_factory=dict)
+    deductibles: Dict[str, str] = field(default_factory=dict)
+    pages_read: int = 0
+    page_count: int = 0
+    ocr_pages: List[int] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.policy_number and self.coverage_limits and self.deductibles)
+
+    def prompt_text(self) -> str:
+        """Compact rendering for AI prompts."""
+        lines = [f"Policy number: {self.policy_number or 'not found'}"]
+        lines += [f"Coverage limit ({label}): {amount}" for label, amount in self.coverage_limits.items()]
+        lines += [f"Deductible ({label}): {amount}" for label, amount in self.deductibles.items()]
+        return "\n".join(lines)
+
+
+@dataclass
+class UploadSession:
+    id: str
+    user_id: str
+    file_id: str
+    size: int
+    expires_at: datetime
+    offset: int = 0  # bytes durably received so far
+    s3_upload_id: Optional[str] = None
+    parts: List[Dict[str, Any]] = field(default_factory=list)
+    uploaded: int = 0  # bytes of offset already sent to S3 as parts
+    busy: bool = False  # a chunk is being received
     created_at: datetime = field(default_factory=datetime.utcnow)
 
 
@@ -55,6 +95,19 @@ class ClaimDraft:
     content: Dict[str, Any] = field(default_factory=dict)
     confidence: float = 0.5
     issues: List[str] = field(default_factory=list)
+    # Per-section input hashes and last render time (seconds), used to skip
+    # re-rendering sections whose claim inputs did not change.
+    section_hashes: Dict[str, str] = field(default_factory=dict)
+    section_timings: Dict[str, float] = field(default_factory=dict)
+    compute_saved_seconds: float = 0.0
+    last_used: datetime = field(default_factory=datetime.utcnow)  # for retention
+
+
+@dataclass
+class ValidationIssue:
+    code: str
+    severity: str  # error|warning
+    message: str
 
 
 @dataclass
@@ -63,9 +116,11 @@ class Job:
     user_id: str
     type: str
     status: str = "queued"  # queued|running|succeeded|failed
+    payload: Dict[str, Any] = field(default_factory=dict)
     progress: int = 0
     result: Dict[str, Any] = field(default_factory=dict)
     error: Optional[str] = None
+    attempts: int = 0  # worker claims so far, including one that holds it now
 
 
 @dataclass
@@ -7,6 +7,8 @@ from fastapi.staticfiles import StaticFiles
 import os
 from app.config import settings
 from app.database import init_db
+from app.services.retention import start_sweeper, stop_sweeper
+from app.services.s3_client import init_s3, shutdown_s3
 from app.api.v1 import auth, claims, health
 
 # Create FastAPI app
@@ -50,6 +52,16 @@ if settings.environment == "development":
 async def startup_event():
     """Initialize application on startup."""
     await init_db()
+    if settings.aws_access_key_id and settings.aws_secret_access_key:
+        init_s3()
+    start_sweeper()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release shared clients on shutdown."""
+    stop_sweeper()
+    shutdown_s3()
 
 
 @app.get("/")
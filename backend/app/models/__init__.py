@@ -2,5 +2,6 @@
 
 from .user import User
 from .claim import Claim, ClaimFile, ClaimProcessingJob
+from .blob import Blob
 
-__all__ = ["User", "Claim", "ClaimFile", "ClaimProcessingJob"]
+__all__ = ["User", "Claim", "ClaimFile", "ClaimProcessingJob", "Blob"]
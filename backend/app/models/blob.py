@@ -0,0 +1,21 @@
+"""Content-addressed blob model."""
+
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class Blob(Base):
+    """Stored file bytes, keyed by SHA-256 and shared by every ClaimFile with that content."""
+    
+    __tablename__ = "blobs"
+    
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    storage_key: Mapped[str] = mapped_column(String(500))
+    size: Mapped[int] = mapped_column(Integer)
+    content_type: Mapped[str] = mapped_column(String(100))
+    # Number of ClaimFile rows pointing at this blob; bytes go when it hits 0
+    ref_count: Mapped[int] = mapped_column(Integer, default=1)
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -66,6 +66,11 @@ class Claim(Base):
     claim_justification: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     requested_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     strength_score: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # "heuristic" until the AI analysis replaces it with "ai"
+    strength_score_source: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Hash of the summary prompt version and inputs the summary was built from
+    summary_fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     
     # Status and metadata
     status: Mapped[ClaimStatus] = mapped_column(
@@ -78,6 +83,8 @@ class Claim(Base):
         default=datetime.utcnow, 
         onupdate=datetime.utcnow
     )
+    # Set by DELETE /claims/{id}; the purge_claim task then removes the rows and bytes
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
     
     # Relationships
     files: Mapped[List["ClaimFile"]] = relationship(
@@ -113,6 +120,15 @@ class ClaimFile(Base):
     content_type: Mapped[str] = mapped_column(String(100))
     s3_key: Mapped[str] = mapped_column(String(500))
     s3_url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    # Content hash; the bytes live in the shared blob with this sha256
+    sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    # Set by the generate_derivatives task once the images exist
+    thumbnail_url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    preview_url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    # 64-bit perceptual hash (hex) for near-duplicate detection, set with the derivatives
+    phash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    # When phash was last written; reuse lookups sync their cached index from here
+    phash_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
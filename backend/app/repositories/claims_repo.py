@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
+from app.config import settings
 from app.domain.dto.requests import CreateClaimRequest, UpdateClaimRequest
 from app.domain.models.core import Claim, ClaimDraft
 from app.domain.dto.responses import ClaimResponse
@@ -9,7 +12,16 @@ from app.utils.ids import new_id
 
 
 _CLAIMS: Dict[str, Claim] = {}
-_CLAIM_DRAFTS: Dict[str, ClaimDraft] = {}
+# Least recently used first; see expire_drafts
+_CLAIM_DRAFTS: "OrderedDict[str, ClaimDraft]" = OrderedDict()
+
+
+def _use_draft(claim_id: str) -> Optional[ClaimDraft]:
+    draft = _CLAIM_DRAFTS.get(claim_id)
+    if draft:
+        draft.last_used = datetime.utcnow()
+        _CLAIM_DRAFTS.move_to_end(claim_id)
+    return draft
 
 
 class ClaimsRepo:
@@ -42,23 +54,71 @@ class ClaimsRepo:
         items.sort(key=lambda c: c.created_at, reverse=True)
         return items[:limit], None
 
+    async def get_many(self, user_id: str, claim_ids: Optional[List[str]] = None) -> List[Claim]:
+        if claim_ids is None:
+            return [c for c in _CLAIMS.values() if c.user_id == user_id]
+        found = (_CLAIMS.get(claim_id) for claim_id in claim_ids)
+        return [c for c in found if c and c.user_id == user_id]
+
+    async def with_attachment(self, user_id: str, file_id: str) -> List[Claim]:
+        return [c for c in _CLAIMS.values() if c.user_id == user_id and file_id in c.attachments]
+
     async def update(self, user_id: str, claim_id: str, payload: UpdateClaimRequest) -> Claim:
         claim = await self.get(user_id, claim_id)
         data = payload.model_dump(exclude_unset=True)
         for k, v in data.items():
             if v is not None:
                 setattr(claim, k, v)
+        # Fields the user sets are theirs from now on, not photo-derived
+        autofilled = claim.incident_metadata.get("autofilled")
+        if autofilled:
+            claim.incident_metadata["autofilled"] = [k for k in autofilled if data.get(k) is None]
         return claim
 
     async def finalize(self, user_id: str, claim_id: str) -> None:
         claim = await self.get(user_id, claim_id)
         claim.status = "finalized"
 
-    async def save_draft(self, claim_id: str, content: dict, confidence: float, issues: List[str]) -> None:
-        _CLAIM_DRAFTS[claim_id] = ClaimDraft(claim_id=claim_id, content=content, confidence=confidence, issues=issues)
+    async def get_draft(self, claim_id: str) -> Optional[ClaimDraft]:
+        return _use_draft(claim_id)
+
+    async def save_draft(
+        self,
+        claim_id: str,
+        content: dict,
+        confidence: float,
+        issues: List[str],
+        section_hashes: Optional[Dict[str, str]] = None,
+        section_timings: Optional[Dict[str, float]] = None,
+        compute_saved_seconds: float = 0.0,
+    ) -> None:
+        _CLAIM_DRAFTS[claim_id] = ClaimDraft(
+            claim_id=claim_id,
+            content=content,
+            confidence=confidence,
+            issues=issues,
+            section_hashes=section_hashes or {},
+            section_timings=section_timings or {},
+            compute_saved_seconds=compute_saved_seconds,
+        )
+        _CLAIM_DRAFTS.move_to_end(claim_id)
+        while len(_CLAIM_DRAFTS) > settings.claim_draft_max:
+            _CLAIM_DRAFTS.popitem(last=False)
+
+    async def expire_drafts(self, now: Optional[datetime] = None) -> int:
+        """Drop drafts unused for ``claim_draft_ttl``; the next generation rebuilds them."""
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=settings.claim_draft_ttl)
+        removed = 0
+        while _CLAIM_DRAFTS and next(iter(_CLAIM_DRAFTS.values())).last_used <= cutoff:
+            _CLAIM_DRAFTS.popitem(last=False)
+            removed += 1
+        return removed
+
+    async def draft_count(self) -> int:
+        return len(_CLAIM_DRAFTS)
 
     async def to_response(self, claim: Claim) -> ClaimResponse:
-        draft = _CLAIM_DRAFTS.get(claim.id)
+        draft = _use_draft(claim.id)
         return ClaimResponse(
             id=claim.id,
             status=claim.status,
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from app.domain.models.core import File
+from app.domain.models.core import File, UploadSession
 
 
 _FILES: Dict[str, File] = {}
+_UPLOAD_SESSIONS: Dict[str, UploadSession] = {}
 
 
 class FilesRepo:
@@ -19,9 +21,29 @@ class FilesRepo:
             raise KeyError("file_not_found")
         return f
 
+    async def find(self, file_id: str) -> Optional[File]:
+        """Look up a file without an owner check (signed upload URLs)."""
+        return _FILES.get(file_id)
+
     async def update(self, file_id: str, **updates) -> File:
         f = _FILES[file_id]
         for k, v in updates.items():
             setattr(f, k, v)
         return f
 
+
+    async def create_session(self, session: UploadSession) -> UploadSession:
+        _UPLOAD_SESSIONS[session.id] = session
+        return session
+
+    async def get_session(self, user_id: str, session_id: str) -> UploadSession:
+        session = _UPLOAD_SESSIONS.get(session_id)
+        if not session or session.user_id != user_id:
+            raise KeyError("upload_session_not_found")
+        return session
+
+    async def delete_session(self, session_id: str) -> None:
+        _UPLOAD_SESSIONS.pop(session_id, None)
+
+    async def expired_sessions(self, now: datetime) -> List[UploadSession]:
+        return [s for s in _UPLOAD_SESSIONS.values() if s.expires_at <= now and not s.busy]
@@ -1,19 +1,74 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, Optional
 
+from app.config import settings
 from app.domain.models.core import Job
+from app.services import job_wakeup
 from app.utils.ids import new_id
 
 
 _JOBS: Dict[str, Job] = {}
+# Ids of queued jobs per type, oldest first. A job that stops being "queued"
+# without a claim keeps its id here until claim_next pops and skips it, so
+# _QUEUED holds the number of jobs actually waiting per type.
+_QUEUES: Dict[str, Deque[str]] = defaultdict(deque)
+_QUEUED: Dict[str, int] = defaultdict(int)
+
+# Finished job ids per type, oldest first, with their finish time
+_FINISHED: Dict[str, "OrderedDict[str, datetime]"] = defaultdict(OrderedDict)
+
+# Lease expiry of jobs a worker claimed; past it the job goes back to its queue
+_LEASES: Dict[str, datetime] = {}
+
+
+def _leave_queue(job: Job) -> None:
+    if job.status == "queued":
+        _QUEUED[job.type] -= 1
+
+
+def _holds(job: Optional[Job], attempt: int) -> bool:
+    """Whether the worker that made claim number ``attempt`` still owns ``job``."""
+    return job is not None and job.status == "running" and job.attempts == attempt and job.id in _LEASES
+
+
+def _requeue(job: Job) -> None:
+    # Ahead of newer work; it has waited longest
+    _LEASES.pop(job.id, None)
+    job.status = "queued"
+    _QUEUES[job.type].appendleft(job.id)
+    _QUEUED[job.type] += 1
+
+
+def _finish(job: Job, status: str) -> None:
+    _leave_queue(job)
+    _LEASES.pop(job.id, None)
+    job.status = status
+    finished = _FINISHED[job.type]
+    finished[job.id] = datetime.utcnow()
+    finished.move_to_end(job.id)
+    while len(finished) > settings.job_retention_max:
+        _JOBS.pop(finished.popitem(last=False)[0], None)
+
+
+def has_queued(queue_types: Iterable[str]) -> bool:
+    return any(_QUEUED.get(queue_type) for queue_type in queue_types)
+
+
+def retention_seconds(job_type: str) -> int:
+    return settings.job_retention_by_type.get(job_type, settings.job_retention_seconds)
 
 
 class JobsRepo:
     async def enqueue(self, user_id: str, type_: str, payload: dict | None = None) -> dict:
         job_id = new_id("job")
-        job = Job(id=job_id, user_id=user_id, type=type_)
+        job = Job(id=job_id, user_id=user_id, type=type_, payload=payload or {})
         _JOBS[job_id] = job
+        _QUEUES[type_].append(job_id)
+        _QUEUED[type_] += 1
+        await job_wakeup.notify(type_)
         return await self.to_response(job)
 
     async def get(self, user_id: str, job_id: str) -> dict:
@@ -23,29 +78,128 @@ class JobsRepo:
         return await self.to_response(job)
 
     async def claim_next(self, queue_type: str) -> Optional[Job]:
-        for job in _JOBS.values():
-            if job.type == queue_type and job.status == "queued":
-                job.status = "running"
-                return job
+        """Oldest queued job of a type, marked running and leased; amortized O(1).
+
+        No await between pop and status change, so concurrent coroutines
+        never claim the same job. The claim holds for ``job_lease_seconds``
+        unless renewed with ``heartbeat``; ``job.attempts`` identifies it.
+        """
+        queue = _QUEUES.get(queue_type)
+        while queue:
+            job = _JOBS.get(queue.popleft())
+            if job is None or job.status != "queued":
+                continue  # left the queue without a claim
+            _QUEUED[queue_type] -= 1
+            job.status = "running"
+            job.attempts += 1
+            _LEASES[job.id] = datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds)
+            return job
         return None
 
+    async def heartbeat(self, job_id: str, attempt: int) -> bool:
+        """Renew the lease of a claimed job; False once the claim is lost."""
+        if not _holds(_JOBS.get(job_id), attempt):
+            return False
+        _LEASES[job_id] = datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds)
+        return True
+
+    async def release(self, job_id: str, attempt: int) -> bool:
+        """Give a claimed job back unfinished, e.g. on shutdown; the attempt is not counted."""
+        job = _JOBS.get(job_id)
+        if not _holds(job, attempt):
+            return False
+        job.attempts -= 1
+        _requeue(job)
+        await job_wakeup.notify(job.type)
+        return True
+
+    async def defer(self, job_id: str, attempt: int, delay: float, error: str) -> bool:
+        """Hold a claimed job back for ``delay`` seconds after a transient error.
+
+        The job keeps its claim until the lease runs out; ``reclaim_expired``
+        then requeues it, counting the attempt.
+        """
+        job = _JOBS.get(job_id)
+        if not _holds(job, attempt):
+            return False
+        job.error = error
+        _LEASES[job_id] = datetime.utcnow() + timedelta(seconds=delay)
+        return True
+
+    async def reclaim_expired(self, now: Optional[datetime] = None) -> int:
+        """Requeue running jobs whose lease passed; returns how many.
+
+        A job that already lost ``job_max_attempts`` leases is failed instead,
+        so one that kills its worker every time cannot loop forever.
+        """
+        now = now or datetime.utcnow()
+        expired = [job_id for job_id, until in _LEASES.items() if until <= now]
+        requeued = set()
+        for job_id in expired:
+            job = _JOBS.get(job_id)
+            if job is None:
+                del _LEASES[job_id]
+            elif job.attempts >= settings.job_max_attempts:
+                _finish(job, "failed")
+                job.error = "lease_expired"
+            else:
+                _requeue(job)
+                requeued.add(job.type)
+        for job_type in requeued:
+            await job_wakeup.notify(job_type)
+        return len(expired)
+
+    async def queue_depth(self, queue_type: str) -> int:
+        return _QUEUED.get(queue_type, 0)
+
     async def start(self, job_id: str) -> None:
-        _JOBS[job_id].status = "running"
+        job = _JOBS[job_id]
+        _leave_queue(job)
+        job.status = "running"
 
     async def progress(self, job_id: str, progress: int) -> None:
         _JOBS[job_id].progress = progress
 
-    async def succeed(self, job_id: str, result: dict | None = None) -> None:
+    async def succeed(self, job_id: str, result: dict | None = None, attempt: Optional[int] = None) -> bool:
+        """Mark a job succeeded. With ``attempt``, only if that claim still holds it."""
         job = _JOBS[job_id]
-        job.status = "succeeded"
+        if attempt is not None and not _holds(job, attempt):
+            return False
+        _finish(job, "succeeded")
         job.progress = 100
         if result is not None:
             job.result = result
+        return True
 
-    async def fail(self, job_id: str, error: str) -> None:
+    async def fail(self, job_id: str, error: str, attempt: Optional[int] = None) -> bool:
         job = _JOBS[job_id]
-        job.status = "failed"
+        if attempt is not None and not _holds(job, attempt):
+            return False
+        _finish(job, "failed")
         job.error = error
+        return True
+
+    async def expire_finished(self, now: Optional[datetime] = None) -> int:
+        """Drop finished jobs older than their type's retention; returns how many."""
+        now = now or datetime.utcnow()
+        removed = 0
+        for job_type, finished in _FINISHED.items():
+            cutoff = now - timedelta(seconds=retention_seconds(job_type))
+            while finished:
+                job_id, finished_at = next(iter(finished.items()))
+                if finished_at > cutoff:
+                    break
+                finished.popitem(last=False)
+                _JOBS.pop(job_id, None)
+                removed += 1
+        return removed
+
+    async def counts(self) -> Dict[str, int]:
+        return {
+            "jobs": len(_JOBS),
+            "queued": sum(_QUEUED.values()),
+            "finished": sum(len(finished) for finished in _FINISHED.values()),
+        }
 
     async def to_response(self, job: Job) -> dict:
         return {
@@ -4,6 +4,7 @@ from typing import List, Optional, Tuple
 
 from app.domain.dto.requests import PolicyValidationRequest
 from app.domain.dto.responses import PolicyValidationResult
+from app.domain.models.core import PolicyFields
 
 
 _PROVIDERS = [
@@ -18,11 +19,22 @@ class ProvidersRepo:
         results = [p for p in _PROVIDERS if ql in p["name"].lower() or ql in p["id"]]
         return results[:limit], None
 
-    async def validate_policy(self, payload: PolicyValidationRequest) -> PolicyValidationResult:
+    async def validate_policy(
+        self, payload: PolicyValidationRequest, document: Optional[PolicyFields] = None
+    ) -> PolicyValidationResult:
         policy = payload.policy_number.strip()
         digits = "".join(ch for ch in policy if ch.isdigit())
         valid = len(digits) >= 6
         normalized = f"****{digits[-4:]}" if digits else None
         hints = [] if valid else ["Policy number too short"]
+        document_number = _comparable(document.policy_number) if document and document.policy_number else ""
+        # The uploaded policy document is the source of truth; prefixes like
+        # HO/AUTO count, separators and case do not
+        if document_number and document_number != _comparable(policy):
+            valid = False
+            hints.append(f"Policy number does not match the uploaded policy (****{document_number[-4:]})")
         return PolicyValidationResult(valid=valid, normalized=normalized, hints=hints)
 
+
+def _comparable(policy_number: str) -> str:
+    return "".join(ch for ch in policy_number.upper() if ch.isalnum())
@@ -15,6 +15,9 @@ class ClaimFileResponse(BaseModel):
     file_size: int
     content_type: str
     s3_url: Optional[str] = None
+    sha256: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
     created_at: datetime
     
     class Config:
@@ -74,6 +77,8 @@ class ClaimResponse(BaseModel):
     claim_justification: Optional[str] = None
     requested_amount: Optional[float] = None
     strength_score: Optional[int] = None
+    strength_score_source: Optional[str] = None
+    summary: Optional[str] = None
     
     # Status and metadata
     status: ClaimStatus
@@ -88,6 +93,23 @@ class ClaimResponse(BaseModel):
         from_attributes = True
 
 
+class ClaimScoreRequest(BaseModel):
+    """Schema for batch heuristic scoring."""
+    claim_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=5000)
+
+
+class ClaimScore(BaseModel):
+    """Strength score for one claim."""
+    claim_id: uuid.UUID
+    strength_score: int
+    strength_score_source: str
+
+
+class ClaimScoreResponse(BaseModel):
+    """Schema for batch scoring response."""
+    scores: List[ClaimScore]
+
+
 class ClaimListResponse(BaseModel):
     """Schema for claim list response."""
     claims: List[ClaimResponse]
@@ -105,7 +127,44 @@ class FileUploadResponse(BaseModel):
     file_size: int
     content_type: str
     s3_url: str
+    sha256: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
+
+
+class BatchUploadItem(BaseModel):
+    """Outcome for one file of a batch upload."""
+    filename: str
+    status: str  # uploaded | failed
+    file: Optional[FileUploadResponse] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    """Schema for batch file upload response."""
+    files: List[BatchUploadItem]
+    uploaded: int
+    failed: int
+
+
+class ImageReuseMatch(BaseModel):
+    """A near-identical image attached to another of the user's claims."""
+    claim_id: uuid.UUID
+    file_id: uuid.UUID
+    distance: int  # perceptual hash bits that differ; 0 = same picture
+
+
+class ImageReuseItem(BaseModel):
+    """An image of this claim that also appears on other claims."""
+    file_id: uuid.UUID
+    matches: List[ImageReuseMatch]
+
+
+class FileByHashRequest(BaseModel):
+    """Schema for attaching already-uploaded content by its SHA-256."""
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+    filename: str = Field(..., min_length=1, max_length=255)
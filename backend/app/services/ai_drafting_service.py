@@ -1,13 +1,41 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import hashlib
+import inspect
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from app.config import Settings
 from app.domain.dto.requests import StartDraftRequest
+from app.domain.dto.responses import ClaimValidationResult, ValidateClaimsResponse
+from app.domain.models.core import Claim, ClaimDraft, ValidationIssue
 from app.repositories.claims_repo import ClaimsRepo
 from app.repositories.files_repo import FilesRepo
 from app.repositories.jobs_repo import JobsRepo
 from app.repositories.providers_repo import ProvidersRepo
+from app.services.rule_engine import RuleEngine, default_engine
+
+
+# Bump when a section renderer changes so cached sections are re-rendered.
+DRAFT_RENDERER_VERSION = "1"
+
+# Claim fields each draft section is rendered from, in draft order. The
+# "summary" key is the top-level summary; the rest are titled sections.
+SECTION_INPUTS: Dict[str, Tuple[str, ...]] = {
+    "summary": ("incident_description",),
+    "Incident": ("incident_description", "incident_occurred_at", "incident_location"),
+    "Damages": (),
+    "Requested Action": (),
+}
+
+
+def section_input_hash(claim: Claim, section: str) -> str:
+    """Stable hash of the claim fields that feed ``section``."""
+    fields = SECTION_INPUTS[section]
+    payload = {name: getattr(claim, name) for name in fields}
+    raw = json.dumps([DRAFT_RENDERER_VERSION, section, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
 class AIDraftingService:
@@ -18,12 +46,21 @@ class AIDraftingService:
         files_repo: FilesRepo,
         providers_repo: ProvidersRepo,
         jobs_repo: JobsRepo,
+        rule_engine: Optional[RuleEngine] = None,
     ) -> None:
         self._settings = settings
         self._claims = claims_repo
         self._files = files_repo
         self._providers = providers_repo
         self._jobs = jobs_repo
+        self._rules = rule_engine or default_engine
+        # Section renderers may be plain rules or coroutines (e.g. LLM calls).
+        self._renderers: Dict[str, Callable[[Claim], Any]] = {
+            "summary": self._render_summary,
+            "Incident": self._render_incident,
+            "Damages": self._render_damages,
+            "Requested Action": self._render_requested_action,
+        }
 
     async def enqueue_draft_job(self, user_id: str, claim_id: str, payload: StartDraftRequest) -> dict:
         # Enqueue and return job object
@@ -34,33 +71,112 @@ class AIDraftingService:
 
     async def process_draft_job(self, job_id: str, user_id: str, claim_id: str) -> None:
         await self._jobs.start(job_id)
+        await self._jobs.succeed(job_id, await self.draft_claim(job_id, user_id, claim_id))
+
+    async def draft_claim(self, job_id: str, user_id: str, claim_id: str) -> dict:
+        """Build and save the draft, reporting progress on ``job_id``; returns the job result."""
         claim = await self._claims.get(user_id, claim_id)
+        previous = await self._claims.get_draft(claim_id)
         await self._jobs.progress(job_id, 20)
-        draft = self._simple_draft(claim.incident_description or "")
+        draft, hashes, timings, regenerated, saved = await self._build_draft(claim, previous)
         await self._jobs.progress(job_id, 70)
-        issues = self._simple_issues(claim)
-        confidence = 0.8 if not issues else 0.6
-        await self._claims.save_draft(claim_id, draft, confidence, issues)
-        await self._jobs.succeed(job_id, {"claim_id": claim_id, "draft_ready": True})
-
-    def _simple_draft(self, description: str) -> Dict[str, Any]:
+        found = self._rules.evaluate([claim])[0]
+        issues = [issue.message for issue in found]
+        confidence = 0.6 if any(issue.severity == "error" for issue in found) else 0.8
+        total_saved = (previous.compute_saved_seconds if previous else 0.0) + saved
+        await self._claims.save_draft(
+            claim_id,
+            draft,
+            confidence,
+            issues,
+            section_hashes=hashes,
+            section_timings=timings,
+            compute_saved_seconds=total_saved,
+        )
         return {
-            "summary": description[:200] or "No incident description provided.",
-            "sections": [
-                {"title": "Incident", "text": description or "TBD"},
-                {"title": "Damages", "text": "TBD"},
-                {"title": "Requested Action", "text": "Please process this claim promptly."},
-            ],
-            "notes": [],
+            "claim_id": claim_id,
+            "draft_ready": True,
+            "sections_regenerated": regenerated,
+            "sections_reused": [s for s in SECTION_INPUTS if s not in regenerated],
+            "compute_saved_seconds": round(saved, 6),
+        }
+
+    async def _build_draft(
+        self, claim: Claim, previous: Optional[ClaimDraft]
+    ) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, float], List[str], float]:
+        """Render only the sections whose inputs changed since ``previous``.
+
+        Returns the merged draft content, the new section hashes and timings,
+        the regenerated section keys and the render time saved by reuse.
+        """
+        old_texts = self._section_texts(previous.content) if previous else {}
+        old_hashes = previous.section_hashes if previous else {}
+        old_timings = previous.section_timings if previous else {}
+
+        texts: Dict[str, str] = {}
+        hashes: Dict[str, str] = {}
+        timings: Dict[str, float] = {}
+        regenerated: List[str] = []
+        saved = 0.0
+        for section in SECTION_INPUTS:
+            digest = section_input_hash(claim, section)
+            hashes[section] = digest
+            if old_hashes.get(section) == digest and section in old_texts:
+                texts[section] = old_texts[section]
+                timings[section] = old_timings.get(section, 0.0)
+                saved += timings[section]
+                continue
+            started = time.perf_counter()
+            text = self._renderers[section](claim)
+            if inspect.isawaitable(text):
+                text = await text
+            timings[section] = time.perf_counter() - started
+            texts[section] = text
+            regenerated.append(section)
+
+        content = {
+            "summary": texts["summary"],
+            "sections": [{"title": s, "text": texts[s]} for s in SECTION_INPUTS if s != "summary"],
+            "notes": previous.content.get("notes", []) if previous else [],
         }
+        return content, hashes, timings, regenerated, saved
+
+    def _section_texts(self, content: Dict[str, Any]) -> Dict[str, str]:
+        texts = {s["title"]: s["text"] for s in content.get("sections", [])}
+        if "summary" in content:
+            texts["summary"] = content["summary"]
+        return texts
+
+    def _render_summary(self, claim: Claim) -> str:
+        return (claim.incident_description or "")[:200] or "No incident description provided."
+
+    def _render_incident(self, claim: Claim) -> str:
+        lines = [claim.incident_description or "TBD"]
+        if claim.incident_occurred_at:
+            lines.append(f"Occurred at: {claim.incident_occurred_at}")
+        if claim.incident_location:
+            lines.append(f"Location: {claim.incident_location}")
+        return "\n".join(lines)
+
+    def _render_damages(self, claim: Claim) -> str:
+        return "TBD"
+
+    def _render_requested_action(self, claim: Claim) -> str:
+        return "Please process this claim promptly."
 
-    def _simple_issues(self, claim) -> List[str]:
-        issues: List[str] = []
-        if not claim.policy_number:
-            issues.append("Policy number missing")
-        if not claim.provider_id and not claim.provider_name:
-            issues.append("Provider not selected")
-        if not claim.incident_description:
-            issues.append("Incident description missing")
-        return issues
+    async def validate_claims(self, user_id: str, claim_ids: Optional[List[str]] = None) -> ValidateClaimsResponse:
+        """Run the rule engine over many of the user's claims in one batch."""
+        claims = await self._claims.get_many(user_id, claim_ids)
+        results = self._rules.evaluate(claims)
+        items = [
+            ClaimValidationResult(claim_id=claim.id, issues=[self._issue_dict(i) for i in issues])
+            for claim, issues in zip(claims, results)
+        ]
+        return ValidateClaimsResponse(
+            items=items,
+            total=len(items),
+            with_errors=sum(1 for issues in results if any(i.severity == "error" for i in issues)),
+        )
 
+    def _issue_dict(self, issue: ValidationIssue) -> Dict[str, str]:
+        return {"code": issue.code, "severity": issue.severity, "message": issue.message}
@@ -2,10 +2,39 @@
 
 import json
 import base64
-from typing import List, Dict, Any, Optional
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Deque
 import httpx
 from app.config import settings
 from app.models.claim import Claim, ClaimFile
+from app.services.image_hash import collapse_near_duplicates, parse_phash
+from app.services.prompt_registry import PromptTemplate, estimate_tokens, prompts, trim_to_tokens
+
+
+# Recent per-request token usage (newest last) for cost and latency tracking.
+_TOKEN_USAGE: Deque[Dict[str, Any]] = deque(maxlen=1000)
+
+
+def recent_token_usage(limit: int = 100) -> List[Dict[str, Any]]:
+    """Return the most recent token usage records."""
+    return list(_TOKEN_USAGE)[-limit:]
+
+
+def _summary_input(claim: Claim) -> Dict[str, Any]:
+    return {
+        "id": str(claim.id),
+        "type": claim.claim_type.value,
+        "provider": claim.insurance_provider,
+        "description": trim_to_tokens(claim.incident_description or "", settings.ai_summary_description_tokens),
+    }
+
+
+def summary_fingerprint(claim: Claim) -> str:
+    """Fingerprint of the summary prompt version and the claim's summary inputs."""
+    item = _summary_input(claim)
+    item.pop("id")
+    return prompts.get("claim_summary_batch").cache_key(claims=json.dumps(item, sort_keys=True))
 
 
 class AIService:
@@ -16,9 +45,35 @@ class AIService:
         self.model = settings.openai_model
         self.base_url = "https://api.openai.com/v1"
     
-    async def _make_openai_request(self, messages: List[Dict[str, Any]]) -> str:
+    def _record_usage(
+        self,
+        template: Optional[PromptTemplate],
+        estimated_tokens: int,
+        started: float,
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        usage = usage or {}
+        _TOKEN_USAGE.append({
+            "template": template.name if template else None,
+            "template_version": template.version if template else None,
+            "model": self.model,
+            "estimated_prompt_tokens": estimated_tokens,
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "total_tokens": usage.get("total_tokens"),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+
+    async def _make_openai_request(
+        self,
+        messages: List[Dict[str, Any]],
+        template: Optional[PromptTemplate] = None,
+        estimated_tokens: int = 0,
+    ) -> str:
         """Make a request to OpenAI API."""
+        started = time.perf_counter()
         if not self.openai_api_key:
+            self._record_usage(template, estimated_tokens, started)
             # Return mock response when OpenAI is not configured
             return """{
                 "optimized_description": "AI analysis is not available. Please review the original incident description and add any additional details you feel are important for your claim.",
@@ -36,7 +91,7 @@ class AIService:
         payload = {
             "model": self.model,
             "messages": messages,
-            "max_tokens": 2000,
+            "max_tokens": settings.ai_max_completion_tokens,
             "temperature": 0.7
         }
         
@@ -50,6 +105,7 @@ class AIService:
             response.raise_for_status()
             
             result = response.json()
+            self._record_usage(template, estimated_tokens, started, result.get("usage"))
             return result["choices"][0]["message"]["content"]
     
     async def _encode_image_to_base64(self, image_url: str) -> str:
@@ -65,80 +121,64 @@ class AIService:
     async def analyze_claim(
         self, 
         claim: Claim, 
-        files: List[ClaimFile]
+        files: List[ClaimFile],
+        policy_details: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Analyze a claim and generate optimized content."""
-        
-        # Prepare the prompt
-        system_prompt = """You are an expert insurance claim analyst. Your job is to analyze incident details and images to create an optimized insurance claim that maximizes reimbursement potential.
-
-Analyze the provided information and generate:
-1. An optimized incident description that highlights key details
-2. A comprehensive damage assessment
-3. A strong claim justification
-4. A realistic requested amount
-5. A strength score (0-100) for the claim
-
-Focus on:
-- Clear, detailed descriptions
-- Professional language
-- Highlighting all claimable damages
-- Supporting evidence from images
-- Legal and policy compliance
-- Maximizing claim value while being realistic
-
-Return your response as a JSON object with these fields:
-{
-    "optimized_description": "...",
-    "damage_assessment": "...", 
-    "claim_justification": "...",
-    "requested_amount": 12345.67,
-    "strength_score": 85
-}"""
-
-        # Build user message with claim details
-        user_message = f"""
-Claim Type: {claim.claim_type.value}
-Insurance Provider: {claim.insurance_provider}
-Policy Number: {claim.policy_number}
-Incident Date: {claim.incident_date}
-Incident Location: {claim.incident_location}
-
-Original Incident Description:
-{claim.incident_description}
-
-Please analyze this claim and the attached images to create an optimized version.
-"""
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
+        """Analyze a claim and generate optimized content.
+
+        ``policy_details`` is text extracted from the policy document
+        (``PolicyFields.prompt_text()``), letting the model check the claim
+        against actual limits and deductibles.
+        """
         
-        # Add images to the message if available
-        if files:
-            image_content = []
-            for file in files:
-                if file.content_type and file.content_type.startswith('image/'):
-                    try:
-                        base64_image = await self._encode_image_to_base64(file.s3_url)
-                        image_content.append({
-                            "type": "image_url",
-                            "image_url": {"url": base64_image}
-                        })
-                    except Exception as e:
-                        print(f"Failed to process image {file.filename}: {e}")
-                        continue
-            
-            if image_content:
-                messages[-1]["content"] = [
-                    {"type": "text", "text": user_message},
-                    *image_content
-                ]
+        template = prompts.get("claim_analysis")
+        values: Dict[str, Any] = {
+            "claim_type": claim.claim_type.value,
+            "insurance_provider": claim.insurance_provider,
+            "policy_number": claim.policy_number,
+            "incident_date": claim.incident_date,
+            "incident_location": claim.incident_location,
+            "incident_description": claim.incident_description,
+            "policy_details": policy_details or "Not provided",
+        }
+
+        # Near-identical shots cost image tokens but add no evidence; send one of each
+        images = collapse_near_duplicates(
+            [f for f in files or [] if f.content_type and f.content_type.startswith('image/')],
+            lambda f: parse_phash(f.phash),
+            settings.image_duplicate_distance,
+        )
+        image_content = []
+        for file in images:
+            try:
+                base64_image = await self._encode_image_to_base64(file.s3_url)
+                image_content.append({
+                    "type": "image_url",
+                    "image_url": {"url": base64_image}
+                })
+            except Exception as e:
+                print(f"Failed to process image {file.filename}: {e}")
+                continue
+
+        # Trim a long description so the whole prompt stays within budget
+        values = template.fit(
+            values,
+            settings.ai_prompt_token_budget,
+            trim_field="incident_description",
+            images=len(image_content),
+        )
+        estimated_tokens = template.estimate(values, images=len(image_content))
+        messages = template.messages(**values)
+
+        if image_content:
+            messages[-1]["content"] = [
+                {"type": "text", "text": messages[-1]["content"]},
+                *image_content
+            ]
         
         try:
             # Make API request
-            response = await self._make_openai_request(messages)
+            response = await self._make_openai_request(messages, template, estimated_tokens)
             
             # Parse JSON response
             try:
@@ -168,22 +208,72 @@ Please analyze this claim and the attached images to create an optimized version
     
     async def generate_claim_summary(self, claim: Claim) -> str:
         """Generate a brief summary of the claim."""
-        summary_prompt = f"""
-        Generate a brief 2-3 sentence summary of this insurance claim:
-        
-        Type: {claim.claim_type.value}
-        Provider: {claim.insurance_provider}
-        Description: {claim.incident_description}
-        
-        Focus on the key incident details and claim type.
-        """
-        
-        messages = [
-            {"role": "user", "content": summary_prompt}
-        ]
+        template = prompts.get("claim_summary")
+        values = template.fit(
+            {
+                "claim_type": claim.claim_type.value,
+                "insurance_provider": claim.insurance_provider,
+                "incident_description": claim.incident_description,
+            },
+            settings.ai_prompt_token_budget,
+            trim_field="incident_description",
+        )
+        messages = template.messages(**values)
         
         try:
-            response = await self._make_openai_request(messages)
+            response = await self._make_openai_request(messages, template, template.estimate(values))
             return response.strip()
         except Exception:
-            return f"{claim.claim_type.value} claim with {claim.insurance_provider}"
+            return self.fallback_summary(claim)
+    
+    def fallback_summary(self, claim: Claim) -> str:
+        return f"{claim.claim_type.value} claim with {claim.insurance_provider}"
+    
+    def _summary_chunks(self, claims: List[Claim]) -> List[List[Dict[str, Any]]]:
+        """Split claims into prompts bounded by batch size and token budget."""
+        template = prompts.get("claim_summary_batch")
+        budget = settings.ai_prompt_token_budget - template.static_tokens
+        chunks: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        used = 0
+        for claim in claims:
+            item = _summary_input(claim)
+            cost = estimate_tokens(json.dumps(item))
+            if current and (len(current) >= settings.ai_summary_batch_size or used + cost > budget):
+                chunks.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    async def summarize_claims(self, claims: List[Claim], fallback: bool = True) -> Dict[str, str]:
+        """Summarize many claims with one LLM call per chunk.
+        
+        Returns a map of claim id to summary. Claims the model skipped, or
+        whole chunks that failed, get the same fallback as
+        ``generate_claim_summary``; with ``fallback=False`` they are left out.
+        """
+        template = prompts.get("claim_summary_batch")
+        by_id = {str(c.id): c for c in claims}
+        summaries: Dict[str, str] = {}
+        for chunk in self._summary_chunks(claims):
+            values = {"claims": json.dumps(chunk)}
+            try:
+                response = await self._make_openai_request(
+                    template.messages(**values), template, template.estimate(values)
+                )
+                parsed = json.loads(response)
+                for entry in parsed.get("summaries", []):
+                    claim_id = str(entry.get("id"))
+                    if claim_id in by_id and entry.get("summary"):
+                        summaries[claim_id] = str(entry["summary"]).strip()
+            except Exception:
+                pass
+            if not fallback:
+                continue
+            for item in chunk:
+                summaries.setdefault(item["id"], self.fallback_summary(by_id[item["id"]]))
+        return summaries
+
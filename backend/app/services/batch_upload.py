@@ -0,0 +1,58 @@
+"""Concurrent multi-file uploads shared by the S3 and local file services."""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.claim import ClaimFile
+from app.schemas.claim import BatchUploadItem, BatchUploadResponse, FileUploadResponse
+from app.services.derivatives import enqueue_derivatives
+
+# (file, db_lock, placing) -> unsaved ClaimFile, raising HTTPException on failure
+UploadOne = Callable[[UploadFile, asyncio.Lock, Dict[str, "asyncio.Future[None]"]], Awaitable[ClaimFile]]
+
+
+async def run_batch_upload(
+    db: AsyncSession,
+    files: List[UploadFile],
+    upload_one: UploadOne,
+    to_response: Callable[[ClaimFile], FileUploadResponse],
+) -> BatchUploadResponse:
+    """Store ``files`` concurrently and insert every row in one commit.
+
+    Per-file failures (validation, size, storage errors) become failed items;
+    anything unexpected rolls the whole batch back.
+    """
+    if len(files) > settings.upload_batch_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.upload_batch_max_files} files per batch"
+        )
+
+    db_lock = asyncio.Lock()
+    placing: Dict[str, "asyncio.Future[None]"] = {}
+    limit = asyncio.Semaphore(settings.upload_batch_concurrency)
+
+    async def bounded(file: UploadFile) -> ClaimFile:
+        async with limit:
+            return await upload_one(file, db_lock, placing)
+
+    results = await asyncio.gather(*(bounded(file) for file in files), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, HTTPException):
+            await db.rollback()
+            raise result
+
+    rows = [result for result in results if isinstance(result, ClaimFile)]
+    db.add_all(rows)
+    await db.commit()
+
+    items = []
+    for file, result in zip(files, results):
+        if isinstance(result, HTTPException):
+            items.append(BatchUploadItem(filename=file.filename or "", status="failed", error=str(result.detail)))
+            continue
+        enqueue_derivatives(result.s3_key, result.content_type, result.sha256)
+        items.append(BatchUploadItem(filename=file.filename or "", status="uploaded", file=to_response(result)))
+    return BatchUploadResponse(files=items, uploaded=len(rows), failed=len(files) - len(rows))
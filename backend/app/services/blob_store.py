@@ -0,0 +1,120 @@
+"""Reference-counted, content-addressed blob bookkeeping."""
+
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.models.blob import Blob
+from app.models.claim import Claim, ClaimFile
+
+
+def blob_key(sha256: str) -> str:
+    """Storage key for content with the given hash (same layout on S3 and disk)."""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+class BlobStore:
+    """Tracks which blobs exist and how many claim files reference them.
+
+    ``acquire``/``release`` do not commit; the caller commits together with
+    its ClaimFile changes so reference counts and rows stay consistent.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _locked(self, sha256: str) -> Optional[Blob]:
+        result = await self.db.execute(
+            select(Blob).where(Blob.sha256 == sha256).with_for_update()
+        )
+        return result.scalar_one_or_none()
+
+    async def exists(self, sha256: str) -> bool:
+        result = await self.db.execute(select(Blob.sha256).where(Blob.sha256 == sha256))
+        return result.scalar_one_or_none() is not None
+
+    async def acquire(self, sha256: str, size: int, content_type: str, storage_key: str) -> Tuple[Blob, bool]:
+        """Add a reference to a blob, creating it if needed.
+
+        Returns the blob and whether it is new, i.e. whether the caller must
+        store the bytes under ``storage_key``.
+        """
+        blob = await self._locked(sha256)
+        if blob:
+            blob.ref_count += 1
+            return blob, False
+
+        blob = Blob(sha256=sha256, storage_key=storage_key, size=size, content_type=content_type, ref_count=1)
+        try:
+            async with self.db.begin_nested():
+                self.db.add(blob)
+        except IntegrityError:
+            # A concurrent upload created it first; reference theirs
+            blob = await self._locked(sha256)
+            blob.ref_count += 1
+            return blob, False
+        return blob, True
+
+    async def release(self, sha256: str) -> Optional[Blob]:
+        """Drop one reference. Returns the blob if that was the last one.
+
+        The returned blob's row is already deleted; the caller removes the
+        bytes at ``blob.storage_key``.
+        """
+        blob = await self._locked(sha256)
+        if not blob:
+            return None
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            return None
+        await self.db.delete(blob)
+        return blob
+
+    async def find_user_file(self, user_id: uuid.UUID, sha256: str) -> Optional[ClaimFile]:
+        """A file with this content the user already uploaded, if any."""
+        result = await self.db.execute(
+            select(ClaimFile)
+            .join(Claim, Claim.id == ClaimFile.claim_id)
+            .where(ClaimFile.sha256 == sha256, Claim.user_id == user_id, Claim.deleted_at.is_(None))
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def attach_existing(
+        self,
+        claim_id: uuid.UUID,
+        user_id: uuid.UUID,
+        sha256: str,
+        filename: str,
+    ) -> Optional[ClaimFile]:
+        """Attach already-stored content to a claim without re-uploading it.
+
+        Only content the same user uploaded before can be attached, so a
+        known hash cannot be used to reach another user's file.
+        """
+        source = await self.find_user_file(user_id, sha256)
+        if not source or not await self.exists(sha256):
+            return None
+        await self.acquire(sha256, source.file_size, source.content_type, source.s3_key)
+        claim_file = ClaimFile(
+            claim_id=claim_id,
+            filename=filename,
+            original_filename=filename,
+            file_size=source.file_size,
+            content_type=source.content_type,
+            s3_key=source.s3_key,
+            s3_url=source.s3_url,
+            sha256=sha256,
+            thumbnail_url=source.thumbnail_url,
+            preview_url=source.preview_url,
+            # generate_derivatives ran once for this content; a fresh phash_at lets reuse indexes pick it up.
+            # Without a hash yet, that task's UPDATE covers this row too.
+            phash=source.phash,
+            phash_at=datetime.utcnow() if source.phash else None,
+        )
+        self.db.add(claim_file)
+        await self.db.commit()
+        await self.db.refresh(claim_file)
+        return claim_file
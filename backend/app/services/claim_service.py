@@ -1,15 +1,57 @@
 """Claim service for business logic."""
 
+import time
 import uuid
-from datetime import datetime
-from typing import Optional, List
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import delete, select, func, desc, update
 from sqlalchemy.orm import selectinload
-from app.models.claim import Claim, ClaimStatus, ProcessingStatus
+from app.config import settings
+from app.models.blob import Blob
+from app.models.claim import Claim, ClaimFile, ClaimProcessingJob, ClaimStatus, ProcessingStatus
 from app.models.user import User
-from app.schemas.claim import ClaimCreate, ClaimUpdate, ClaimListResponse
-from app.services.ai_service import AIService
+from app.schemas.claim import (
+    ClaimCreate,
+    ClaimUpdate,
+    ClaimListResponse,
+    ClaimScore,
+    ImageReuseItem,
+    ImageReuseMatch,
+)
+from app.services.ai_service import AIService, summary_fingerprint
+from app.services.image_hash import SyncedIndex, parse_phash
+from app.services.scoring_service import AI_SOURCE, HEURISTIC_SOURCE, ClaimScoringService
+from app.services.storage_gc import StorageGarbageCollector
+
+
+# (claim id, summary fingerprint) -> when a summarize task was queued for it,
+# oldest first; keeps list views from queueing the same claims while it is pending
+_SUMMARIES_QUEUED: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+_SUMMARIES_QUEUED_MAX = 10000
+
+# Per-user pHash indexes for reuse lookups, least recently used first
+_PHASH_INDEXES: "OrderedDict[uuid.UUID, SyncedIndex]" = OrderedDict()
+PHASH_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _mark_summaries_queued(stale: Dict[str, str]) -> List[str]:
+    """Ids of stale claims not queued within ``ai_summary_requeue_after``; marks them queued."""
+    now = time.monotonic()
+    cutoff = now - settings.ai_summary_requeue_after
+    # Markers expire so a failed or lost task is retried
+    while _SUMMARIES_QUEUED and next(iter(_SUMMARIES_QUEUED.values())) <= cutoff:
+        _SUMMARIES_QUEUED.popitem(last=False)
+    fresh = []
+    for claim_id, fingerprint in stale.items():
+        key = (claim_id, fingerprint)
+        if key not in _SUMMARIES_QUEUED:
+            _SUMMARIES_QUEUED[key] = now
+            fresh.append(claim_id)
+    while len(_SUMMARIES_QUEUED) > _SUMMARIES_QUEUED_MAX:
+        _SUMMARIES_QUEUED.popitem(last=False)
+    return fresh
 
 
 class ClaimService:
@@ -18,6 +60,7 @@ class ClaimService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.ai_service = AIService()
+        self.scoring_service = ClaimScoringService()
     
     async def create_claim(self, user_id: uuid.UUID, claim_data: ClaimCreate) -> Claim:
         """Create a new claim."""
@@ -31,6 +74,9 @@ class ClaimService:
             claim_type=claim_data.claim_type,
             status=ClaimStatus.DRAFT
         )
+        # Instant local score; replaced once the AI analysis finishes
+        claim.strength_score = (await self.scoring_service.score_claims([claim]))[0]
+        claim.strength_score_source = HEURISTIC_SOURCE
         
         self.db.add(claim)
         await self.db.commit()
@@ -43,10 +89,84 @@ class ClaimService:
         result = await self.db.execute(
             select(Claim)
             .options(selectinload(Claim.files), selectinload(Claim.processing_jobs))
-            .where(Claim.id == claim_id, Claim.user_id == user_id)
+            .where(Claim.id == claim_id, Claim.user_id == user_id, Claim.deleted_at.is_(None))
         )
         return result.scalar_one_or_none()
     
+    async def owns_claim(self, claim_id: uuid.UUID, user_id: uuid.UUID) -> bool:
+        """Whether the claim exists and belongs to the user, without loading it."""
+        result = await self.db.execute(
+            select(Claim.id).where(Claim.id == claim_id, Claim.user_id == user_id, Claim.deleted_at.is_(None))
+        )
+        return result.scalar_one_or_none() is not None
+    
+    async def _user_phash_index(self, user_id: uuid.UUID) -> SyncedIndex:
+        """The user's cached pHash index, first synced with hashes written since the last call.
+        
+        Only new or rewritten hashes are read; entries of deleted files are
+        dropped when a lookup finds them.
+        """
+        entry = _PHASH_INDEXES.pop(user_id, None) or SyncedIndex()
+        _PHASH_INDEXES[user_id] = entry
+        while len(_PHASH_INDEXES) > settings.image_reuse_index_users:
+            _PHASH_INDEXES.popitem(last=False)
+        
+        synced_at = datetime.utcnow()
+        query = (
+            select(ClaimFile.id, ClaimFile.claim_id, ClaimFile.phash)
+            .join(Claim, Claim.id == ClaimFile.claim_id)
+            .where(Claim.user_id == user_id, Claim.deleted_at.is_(None), ClaimFile.phash.is_not(None))
+        )
+        if entry.synced_at is not None:
+            # Overlap covers writes that committed late or on a skewed clock
+            query = query.where(ClaimFile.phash_at > entry.synced_at - PHASH_SYNC_OVERLAP)
+        for file_id, file_claim_id, phash in (await self.db.execute(query)).all():
+            entry.index.add((file_claim_id, file_id), parse_phash(phash))
+        entry.synced_at = synced_at
+        return entry
+    
+    async def find_reused_images(self, claim_id: uuid.UUID, user_id: uuid.UUID) -> List[ImageReuseItem]:
+        """Images of a claim that are near-identical to images on the user's other claims."""
+        index = (await self._user_phash_index(user_id)).index
+        own = (await self.db.execute(
+            select(ClaimFile.id, ClaimFile.phash).where(ClaimFile.claim_id == claim_id, ClaimFile.phash.is_not(None))
+        )).all()
+        found = {}
+        for file_id, phash in own:
+            matches = [
+                (key, distance)
+                for key, distance in index.query(parse_phash(phash), settings.image_duplicate_distance)
+                if key[0] != claim_id
+            ]
+            if matches:
+                found[file_id] = matches
+        
+        # The few candidates are checked against the database; the cache never sees deletes
+        candidates = {key for matches in found.values() for key, _ in matches}
+        alive = set()
+        if candidates:
+            alive = set((await self.db.execute(
+                select(ClaimFile.id)
+                .join(Claim, Claim.id == ClaimFile.claim_id)
+                .where(ClaimFile.id.in_({file_id for _, file_id in candidates}), Claim.deleted_at.is_(None))
+            )).scalars().all())
+            for key in candidates:
+                if key[1] not in alive and key in index:
+                    index.remove(key)
+        
+        reused = []
+        for file_id, matches in found.items():
+            matches = [(key, distance) for key, distance in matches if key[1] in alive]
+            if matches:
+                reused.append(ImageReuseItem(
+                    file_id=file_id,
+                    matches=[
+                        ImageReuseMatch(claim_id=other_claim, file_id=other_file, distance=distance)
+                        for (other_claim, other_file), distance in matches
+                    ],
+                ))
+        return reused
+    
     async def get_user_claims(
         self, 
         user_id: uuid.UUID, 
@@ -59,7 +179,7 @@ class ClaimService:
         
         # Get total count
         count_result = await self.db.execute(
-            select(func.count(Claim.id)).where(Claim.user_id == user_id)
+            select(func.count(Claim.id)).where(Claim.user_id == user_id, Claim.deleted_at.is_(None))
         )
         total = count_result.scalar()
         
@@ -67,13 +187,24 @@ class ClaimService:
         result = await self.db.execute(
             select(Claim)
             .options(selectinload(Claim.files))
-            .where(Claim.user_id == user_id)
+            .where(Claim.user_id == user_id, Claim.deleted_at.is_(None))
             .order_by(desc(Claim.created_at))
             .offset(offset)
             .limit(size)
         )
         claims = result.scalars().all()
         
+        # Summaries are built in batches off the request path; the list only
+        # serves what is stored and queues claims whose inputs changed.
+        stale = {}
+        for c in claims:
+            fingerprint = summary_fingerprint(c)
+            if c.summary_fingerprint != fingerprint:
+                stale[str(c.id)] = fingerprint
+        stale_ids = _mark_summaries_queued(stale)
+        if stale_ids:
+            self._enqueue_summaries(stale_ids)
+        
         # Calculate pages
         pages = (total + size - 1) // size
         
@@ -85,6 +216,44 @@ class ClaimService:
             pages=pages
         )
     
+    def _enqueue_summaries(self, claim_ids: List[str]) -> None:
+        """Queue batch summarization; list views must not fail if the broker is down."""
+        from app.tasks import summarize_claims
+        try:
+            summarize_claims.delay(claim_ids)
+        except Exception:
+            pass
+    
+    async def score_claims(self, user_id: uuid.UUID, claim_ids: List[uuid.UUID]) -> List[ClaimScore]:
+        """Refresh heuristic scores for a batch of the user's claims.
+        
+        Claims already scored by the AI keep their AI score.
+        """
+        result = await self.db.execute(
+            select(Claim)
+            .options(selectinload(Claim.files))
+            .where(Claim.id.in_(claim_ids), Claim.user_id == user_id, Claim.deleted_at.is_(None))
+            .execution_options(populate_existing=True)
+        )
+        claims = result.scalars().all()
+        pending = [c for c in claims if c.strength_score_source != AI_SOURCE]
+        scores = await self.scoring_service.score_claims(pending, {c.id: c.files for c in pending})
+        for claim, score in zip(pending, scores):
+            claim.strength_score = score
+            claim.strength_score_source = HEURISTIC_SOURCE
+        if pending:
+            await self.db.commit()
+        
+        return [
+            ClaimScore(
+                claim_id=c.id,
+                strength_score=c.strength_score,
+                strength_score_source=c.strength_score_source,
+            )
+            for c in claims
+            if c.strength_score is not None
+        ]
+    
     async def update_claim(
         self, 
         claim_id: uuid.UUID, 
@@ -109,16 +278,79 @@ class ClaimService:
         return claim
     
     async def delete_claim(self, claim_id: uuid.UUID, user_id: uuid.UUID) -> bool:
-        """Delete a claim."""
-        claim = await self.get_claim_by_id(claim_id, user_id)
-        if not claim:
-            return False
+        """Soft-delete a claim and queue the purge of its rows and files.
         
-        await self.db.delete(claim)
+        One UPDATE regardless of attachment count; the claim disappears from
+        every query at once and ``purge_claim`` does the heavy lifting.
+        """
+        result = await self.db.execute(
+            update(Claim)
+            .where(Claim.id == claim_id, Claim.user_id == user_id, Claim.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow())
+        )
         await self.db.commit()
+        if not result.rowcount:
+            return False
         
+        self._enqueue_purge(str(claim_id))
         return True
     
+    def _enqueue_purge(self, claim_id: str) -> None:
+        """Queue the purge; purge_deleted_claims picks it up if the broker is down."""
+        from app.tasks import purge_claim
+        try:
+            purge_claim.delay(claim_id)
+        except Exception:
+            pass
+    
+    async def purge_claim(self, claim_id: uuid.UUID, storage: Optional[StorageGarbageCollector] = None) -> dict:
+        """Remove a soft-deleted claim's rows, blob references and stored bytes.
+        
+        Child rows go with set-based DELETEs rather than an ORM cascade that
+        would load every file and job first. Bytes are removed after the
+        commit, so a failure there leaves orphans for the storage collector,
+        never rows pointing at missing files.
+        """
+        # Locking the claim row keeps a concurrent purge, or a live claim, out
+        claim = (await self.db.execute(
+            select(Claim.id).where(Claim.id == claim_id, Claim.deleted_at.is_not(None)).with_for_update()
+        )).scalar_one_or_none()
+        if claim is None:
+            return {"claim_id": str(claim_id), "purged": False, "files": 0, "objects_removed": 0}
+        
+        files = (await self.db.execute(
+            select(ClaimFile.s3_key, ClaimFile.sha256).where(ClaimFile.claim_id == claim_id)
+        )).all()
+        shas = {sha256 for _, sha256 in files if sha256}
+        # Locked in a fixed order, so an upload acquiring the same blob waits for us or we for it
+        blobs = {}
+        if shas:
+            blobs = {blob.sha256: blob for blob in (await self.db.execute(
+                select(Blob).where(Blob.sha256.in_(shas)).order_by(Blob.sha256).with_for_update()
+            )).scalars().all()}
+        blob_keys = {blob.storage_key for blob in blobs.values()}
+        # Legacy per-claim objects have no blob row and are never shared
+        legacy_keys = [key for key, _ in files if key not in blob_keys]
+        
+        await self.db.execute(delete(ClaimProcessingJob).where(ClaimProcessingJob.claim_id == claim_id))
+        await self.db.execute(delete(ClaimFile).where(ClaimFile.claim_id == claim_id))
+        deleted = await self.db.execute(delete(Claim).where(Claim.id == claim_id))
+        # Drop exactly the references purged here, as BlobStore.release does; a
+        # recount would miss references from uploads that are not committed yet
+        released = Counter(sha256 for key, sha256 in files if sha256 in blobs and blobs[sha256].storage_key == key)
+        dead_keys: List[str] = []
+        for sha256, count in released.items():
+            blob = blobs[sha256]
+            blob.ref_count -= count
+            if blob.ref_count <= 0:
+                dead_keys.append(blob.storage_key)
+                await self.db.delete(blob)
+        await self.db.commit()
+        
+        storage = storage or StorageGarbageCollector(self.db)
+        removed = await storage.delete_objects([*legacy_keys, *dead_keys])
+        return {"claim_id": str(claim_id), "purged": bool(deleted.rowcount), "files": len(files), "objects_removed": removed}
+    
     async def start_ai_processing(self, claim_id: uuid.UUID, user_id: uuid.UUID) -> bool:
         """Start AI processing for a claim."""
         claim = await self.get_claim_by_id(claim_id, user_id)
@@ -0,0 +1,166 @@
+"""Thumbnail and preview derivatives for uploaded images.
+
+Derivatives are JPEGs stored next to the original as ``<key>.<name>.jpg``.
+Originals under ``blobs/`` are keyed by content hash, so every file with the
+same bytes shares one set of derivatives and regenerating them is a no-op.
+Decoding and resizing is CPU-bound and runs in a process pool.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import ClientError
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.disk_io import run_disk_io
+from app.services.image_hash import phash_bytes
+from app.services.s3_client import get_s3_client, run_s3
+
+
+# Longest edge in pixels, largest first: smaller sizes are cut from the previous one.
+DERIVATIVE_SIZES: Dict[str, int] = {"medium": 1024, "thumb": 256}
+DERIVATIVE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif"}
+JPEG_QUALITY = 82
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def derivative_key(source_key: str, name: str) -> str:
+    return f"{source_key}.{name}.jpg"
+
+
+def render_derivatives(data: bytes) -> Dict[str, bytes]:
+    """Decode an image once and encode every derivative size as JPEG."""
+    with Image.open(io.BytesIO(data)) as img:
+        largest = max(DERIVATIVE_SIZES.values())
+        # Let the JPEG decoder downscale by a power of two while decoding
+        img.draft("RGB", (largest, largest))
+        current = ImageOps.exif_transpose(img).convert("RGB")
+    out: Dict[str, bytes] = {}
+    for name, edge in DERIVATIVE_SIZES.items():
+        current.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        current.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        out[name] = buffer.getvalue()
+    return out
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _POOL
+    # Daemonic processes (Celery prefork children) cannot start their own pool
+    if multiprocessing.current_process().daemon:
+        return None
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=settings.derivative_workers)
+    return _POOL
+
+
+async def _in_pool(fn: Callable[[bytes], Any], data: bytes) -> Any:
+    pool = _get_pool()
+    if pool is None:
+        return fn(data)
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, data)
+
+
+async def render_in_pool(data: bytes) -> Dict[str, bytes]:
+    return await _in_pool(render_derivatives, data)
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+def _write(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp, path)
+
+
+class DerivativeService:
+    """Generate and locate derivatives on S3 or local disk."""
+
+    def __init__(self, s3_client: Optional[Any] = None):
+        self._use_s3 = s3_client is not None or bool(settings.aws_access_key_id and settings.aws_secret_access_key)
+        self._s3 = s3_client
+
+    def _client(self) -> Any:
+        if self._s3 is None:
+            self._s3 = get_s3_client()
+        return self._s3
+
+    def url_for(self, key: str) -> str:
+        if self._use_s3:
+            return f"https://{settings.s3_bucket_name}.s3.{settings.aws_region}.amazonaws.com/{key}"
+        # Local keys are paths under uploads/, served from /files
+        return f"http://localhost:8000/files/{key.replace(os.sep, '/').split('uploads/', 1)[-1]}"
+
+    async def _exists(self, key: str) -> bool:
+        if not self._use_s3:
+            return await run_disk_io(os.path.exists, key)
+        try:
+            await run_s3(self._client().head_object, Bucket=settings.s3_bucket_name, Key=key)
+        except ClientError:
+            return False
+        return True
+
+    async def _load(self, key: str) -> bytes:
+        if not self._use_s3:
+            return await run_disk_io(_read, key)
+        result = await run_s3(self._client().get_object, Bucket=settings.s3_bucket_name, Key=key)
+        return await run_s3(result["Body"].read)
+
+    async def _store(self, key: str, data: bytes) -> None:
+        if not self._use_s3:
+            await run_disk_io(_write, key, data)
+            return
+        await run_s3(
+            self._client().put_object,
+            Bucket=settings.s3_bucket_name,
+            Key=key,
+            Body=data,
+            ContentType="image/jpeg",
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+    async def ensure(self, source_key: str, content_type: str) -> Dict[str, str]:
+        """Make sure every derivative of ``source_key`` exists; returns their URLs.
+
+        Returns an empty dict for content that has no derivatives.
+        """
+        if content_type not in DERIVATIVE_CONTENT_TYPES:
+            return {}
+        keys = {name: derivative_key(source_key, name) for name in DERIVATIVE_SIZES}
+        # Cheap existence checks make reprocessing the same content free
+        missing = [name for name, key in keys.items() if not await self._exists(key)]
+        if missing:
+            rendered = await render_in_pool(await self._load(source_key))
+            for name in missing:
+                await self._store(keys[name], rendered[name])
+        return {name: self.url_for(key) for name, key in keys.items()}
+
+    async def phash(self, source_key: str) -> str:
+        """Perceptual hash of an image, computed from its existing thumbnail."""
+        return await _in_pool(phash_bytes, await self._load(derivative_key(source_key, "thumb")))
+
+
+def enqueue_derivatives(source_key: str, content_type: str, sha256: Optional[str] = None) -> None:
+    """Queue derivative generation; uploads must not fail if the broker is down."""
+    if content_type not in DERIVATIVE_CONTENT_TYPES:
+        return
+    from app.tasks import generate_derivatives
+    try:
+        generate_derivatives.delay(source_key, content_type, sha256)
+    except Exception:
+        pass
+
+
+def derivative_keys(source_key: str) -> list:
+    """Every derivative key that may exist for ``source_key``."""
+    return [derivative_key(source_key, name) for name in DERIVATIVE_SIZES]
@@ -0,0 +1,28 @@
+"""Shared thread pool for blocking filesystem calls."""
+
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.config import settings
+
+
+# Dedicated pool for disk I/O so a slow disk cannot starve the event loop
+# or the default executor used by other blocking calls.
+_DISK_EXECUTOR = ThreadPoolExecutor(max_workers=settings.local_io_workers, thread_name_prefix="disk")
+
+
+async def run_disk_io(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking filesystem call in the disk I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_DISK_EXECUTOR, fn, *args)
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read in upload-sized chunks; blocking, so run it via ``run_disk_io``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(settings.upload_chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,207 @@
+"""Authenticated file downloads with conditional and range requests."""
+
+import os
+import re
+import unicodedata
+import uuid
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Mapping, Optional, Tuple
+from urllib.parse import quote
+from fastapi import HTTPException
+from fastapi.responses import RedirectResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.config import settings
+from app.models.claim import Claim, ClaimFile
+from app.services.disk_io import run_disk_io
+from app.services.s3_client import get_s3_client
+
+
+# Content at a blob key never changes, so browsers may cache it indefinitely
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable"
+
+# Quotes, backslashes and control characters would end or split the header
+_UNSAFE_FILENAME = re.compile(r'[^\x20-\x7e]|["\\]')
+
+
+def content_disposition(filename: str, disposition: str = "inline") -> str:
+    """``Content-Disposition`` for any user-supplied filename.
+
+    Headers go out as latin-1, so the plain ``filename`` is an ASCII
+    fallback and the exact name travels in RFC 5987 ``filename*``.
+    """
+    ascii_name = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    ascii_name = _UNSAFE_FILENAME.sub("_", ascii_name).strip() or "download"
+    return f"{disposition}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive ``(start, end)``.
+
+    Returns ``None`` when the full body should be sent (no header, multiple
+    ranges or a malformed value). Raises 416 for an unsatisfiable range.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length == 0:
+                raise ValueError
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """Send ``path[start:end]`` without loading it into memory.
+
+    Uses the ASGI zero-copy send extension when the server offers it, so
+    the kernel copies file pages straight to the socket; otherwise reads
+    chunks in the disk I/O pool.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, start: int, end: int, status_code: int, headers: Mapping[str, str], media_type: str):
+        super().__init__(status_code=status_code, headers=dict(headers), media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        remaining = self.end - self.start + 1
+        handle = await run_disk_io(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": handle,
+                    "offset": self.start,
+                    "count": remaining,
+                    "more_body": False,
+                })
+                return
+            await run_disk_io(handle.seek, self.start)
+            while remaining > 0:
+                chunk = await run_disk_io(handle.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await run_disk_io(handle.close)
+
+
+class FileDownloadService:
+    """Serve claim files to their owner."""
+
+    def __init__(self, db: AsyncSession, s3_client: Optional[Any] = None):
+        self.db = db
+        self._s3 = s3_client
+
+    async def get_user_file(self, file_id: uuid.UUID, user_id: uuid.UUID) -> Optional[ClaimFile]:
+        """The file if its claim belongs to the user, in one indexed query."""
+        result = await self.db.execute(
+            select(ClaimFile)
+            .join(Claim, Claim.id == ClaimFile.claim_id)
+            .where(ClaimFile.id == file_id, Claim.user_id == user_id, Claim.deleted_at.is_(None))
+        )
+        return result.scalar_one_or_none()
+
+    def _s3_redirect(self, claim_file: ClaimFile) -> RedirectResponse:
+        """Short-lived presigned GET; S3 then handles Range and ETag itself."""
+        client = self._s3 or get_s3_client()
+        expires = settings.presigned_download_expires
+        url = client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": settings.s3_bucket_name,
+                "Key": claim_file.s3_key,
+                "ResponseContentType": claim_file.content_type,
+                "ResponseContentDisposition": content_disposition(claim_file.original_filename),
+            },
+            ExpiresIn=expires,
+        )
+        # Let the browser reuse the redirect for part of the URL's lifetime
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": f"private, max-age={expires // 2}"})
+
+    async def _local_response(self, claim_file: ClaimFile, request_headers: Mapping[str, str]) -> Response:
+        path = claim_file.s3_key
+        try:
+            stat = await run_disk_io(os.stat, path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found")
+
+        etag = f'"{claim_file.sha256}"' if claim_file.sha256 else f'W/"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        # Timestamps are stored as naive UTC
+        last_modified = format_datetime(claim_file.created_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": IMMUTABLE_CACHE if claim_file.sha256 else "private, no-cache",
+            "Content-Disposition": content_disposition(claim_file.original_filename),
+        }
+
+        if self._not_modified(request_headers, etag, claim_file):
+            return Response(status_code=304, headers=headers)
+
+        if settings.local_accel_redirect_prefix:
+            # The front proxy sends the file with sendfile and handles Range
+            headers["X-Accel-Redirect"] = settings.local_accel_redirect_prefix.rstrip("/") + "/" + path.replace(os.sep, "/")
+            return Response(status_code=200, headers=headers, media_type=claim_file.content_type)
+
+        size = stat.st_size
+        byte_range = None
+        if_range = request_headers.get("if-range")
+        if if_range is None or if_range == etag:
+            byte_range = parse_range(request_headers.get("range"), size)
+        if byte_range is None:
+            return RangeFileResponse(path, 0, size - 1, 200, headers, claim_file.content_type)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return RangeFileResponse(path, start, end, 206, headers, claim_file.content_type)
+
+    @staticmethod
+    def _not_modified(request_headers: Mapping[str, str], etag: str, claim_file: ClaimFile) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or etag.removeprefix("W/") in tags
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+            except (TypeError, ValueError):
+                return False
+            return claim_file.created_at.replace(tzinfo=None, microsecond=0) <= since
+        return False
+
+    async def download(self, file_id: uuid.UUID, user_id: uuid.UUID, request_headers: Mapping[str, str]) -> Response:
+        claim_file = await self.get_user_file(file_id, user_id)
+        if not claim_file:
+            raise HTTPException(status_code=404, detail="File not found")
+        if settings.aws_access_key_id and settings.aws_secret_access_key:
+            return self._s3_redirect(claim_file)
+        return await self._local_response(claim_file, request_headers)
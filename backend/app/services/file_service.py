@@ -1,38 +1,36 @@
 """File service for handling file uploads and storage."""
 
+import asyncio
+import hashlib
 import uuid
 import os
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import boto3
 from botocore.exceptions import ClientError
 from app.config import settings
 from app.models.claim import ClaimFile
-from app.schemas.claim import FileUploadResponse
+from app.schemas.claim import BatchUploadResponse, FileUploadResponse
+from app.services.batch_upload import run_batch_upload
+from app.services.blob_store import BlobStore, blob_key
+from app.services.derivatives import derivative_keys, enqueue_derivatives
+from app.services.s3_client import get_s3_client, run_s3
 
 
 class FileService:
     """Service for file-related operations."""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, s3_client: Optional[Any] = None):
         self.db = db
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=settings.aws_region
-        )
+        # Shared process-wide client; never construct one per request
+        self.s3_client = s3_client or get_s3_client()
     
     def _validate_file(self, file: UploadFile) -> None:
         """Validate uploaded file."""
         # Check file size
         if file.size and file.size > settings.max_file_size:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size exceeds maximum allowed size of {settings.max_file_size} bytes"
-            )
+            raise self._too_large()
         
         # Check file extension
         if file.filename:
@@ -43,68 +41,242 @@ class FileService:
                     detail=f"File type not allowed. Allowed types: {', '.join(settings.allowed_extensions)}"
                 )
     
-    def _generate_s3_key(self, claim_id: uuid.UUID, filename: str) -> str:
-        """Generate S3 key for file storage."""
-        file_extension = filename.split('.')[-1].lower()
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        return f"claims/{claim_id}/{unique_filename}"
+    def _generate_staging_key(self) -> str:
+        """Temporary S3 key for a multipart upload whose hash is not yet known."""
+        return f"staging/{uuid.uuid4()}"
     
-    async def upload_file(
-        self, 
-        claim_id: uuid.UUID, 
-        file: UploadFile
-    ) -> FileUploadResponse:
-        """Upload a file to S3 and save metadata to database."""
-        # Validate file
-        self._validate_file(file)
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum allowed size of {settings.max_file_size} bytes"
+        )
+    
+    async def _stream_to_s3(
+        self, file: UploadFile, s3_key: str, content_type: str
+    ) -> Tuple[int, str, Optional[bytes]]:
+        """Stream an upload to S3, returning its size, SHA-256 and body.
         
-        # Generate S3 key
-        s3_key = self._generate_s3_key(claim_id, file.filename)
+        Uploads below ``s3_multipart_threshold`` are kept in memory and
+        returned as the body so the caller can skip the PUT when the content
+        is already stored. Larger ones become a multipart upload to
+        ``s3_key`` (body ``None``) so at most one part is held in memory.
+        The size limit is enforced while reading because ``UploadFile.size``
+        is often unknown. S3 calls run in the shared bounded executor.
+        """
+        bucket = settings.s3_bucket_name
+        part_size = settings.s3_multipart_part_size
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        size = 0
+        upload_id: Optional[str] = None
+        parts: List[dict] = []
         
-        try:
-            # Upload to S3
-            file_content = await file.read()
-            self.s3_client.put_object(
-                Bucket=settings.s3_bucket_name,
+        async def flush_part(data: bytes) -> None:
+            part_number = len(parts) + 1
+            result = await run_s3(
+                self.s3_client.upload_part,
+                Bucket=bucket,
                 Key=s3_key,
-                Body=file_content,
-                ContentType=file.content_type or 'application/octet-stream'
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data,
             )
+            parts.append({"ETag": result["ETag"], "PartNumber": part_number})
+        
+        try:
+            while True:
+                chunk = await file.read(settings.upload_chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.max_file_size:
+                    raise self._too_large()
+                digest.update(chunk)
+                buffer.extend(chunk)
+                
+                if upload_id is None and len(buffer) >= settings.s3_multipart_threshold:
+                    created = await run_s3(
+                        self.s3_client.create_multipart_upload,
+                        Bucket=bucket,
+                        Key=s3_key,
+                        ContentType=content_type,
+                    )
+                    upload_id = created["UploadId"]
+                while upload_id is not None and len(buffer) >= part_size:
+                    await flush_part(bytes(buffer[:part_size]))
+                    del buffer[:part_size]
             
-            # Generate S3 URL
-            s3_url = f"https://{settings.s3_bucket_name}.s3.{settings.aws_region}.amazonaws.com/{s3_key}"
-            
-            # Save file metadata to database
-            claim_file = ClaimFile(
-                claim_id=claim_id,
-                filename=file.filename,
-                original_filename=file.filename,
-                file_size=len(file_content),
-                content_type=file.content_type or 'application/octet-stream',
-                s3_key=s3_key,
-                s3_url=s3_url
+            if upload_id is None:
+                return size, digest.hexdigest(), bytes(buffer)
+            if buffer:
+                await flush_part(bytes(buffer))
+            await run_s3(
+                self.s3_client.complete_multipart_upload,
+                Bucket=bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
             )
-            
-            self.db.add(claim_file)
-            await self.db.commit()
-            await self.db.refresh(claim_file)
-            
-            return FileUploadResponse(
-                id=claim_file.id,
-                filename=claim_file.filename,
-                original_filename=claim_file.original_filename,
-                file_size=claim_file.file_size,
-                content_type=claim_file.content_type,
-                s3_url=claim_file.s3_url,
-                created_at=claim_file.created_at
+        except BaseException:
+            if upload_id is not None:
+                await run_s3(
+                    self.s3_client.abort_multipart_upload,
+                    Bucket=bucket,
+                    Key=s3_key,
+                    UploadId=upload_id,
+                )
+            raise
+        
+        return size, digest.hexdigest(), None
+    
+    async def _place_blob(self, key: str, content_type: str, body: Optional[bytes], staging_key: str) -> None:
+        """Store new content at ``key``: PUT a buffered body, or copy a staged
+        multipart upload into place server-side."""
+        bucket = settings.s3_bucket_name
+        if body is not None:
+            await run_s3(
+                self.s3_client.put_object,
+                Bucket=bucket,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
             )
-            
-        except ClientError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to upload file to S3: {str(e)}"
+        else:
+            await run_s3(
+                self.s3_client.copy_object,
+                Bucket=bucket,
+                Key=key,
+                CopySource={"Bucket": bucket, "Key": staging_key},
+                ContentType=content_type,
+                MetadataDirective="REPLACE",
             )
     
+    async def _upload_one(
+        self,
+        claim_id: uuid.UUID,
+        file: UploadFile,
+        db_lock: asyncio.Lock,
+        placing: Dict[str, "asyncio.Future[None]"]
+    ) -> ClaimFile:
+        """Stream one upload and reference its blob; returns the unsaved row.
+        
+        Content is stored once per SHA-256 under ``blobs/``. Uploads run
+        concurrently in a batch, so session access is serialised by
+        ``db_lock`` and a file whose content another file in the batch is
+        still storing waits for it in ``placing``. On failure the blob
+        reference is released and an HTTPException is raised.
+        """
+        self._validate_file(file)
+        staging_key = self._generate_staging_key()
+        content_type = file.content_type or 'application/octet-stream'
+        try:
+            # Stream to S3 without buffering the whole upload
+            file_size, sha256, body = await self._stream_to_s3(file, staging_key, content_type)
+        except ClientError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to upload file to S3: {str(e)}")
+        
+        key = blob_key(sha256)
+        async with db_lock:
+            blob, created = await BlobStore(self.db).acquire(sha256, file_size, content_type, key)
+        try:
+            if created:
+                placed = placing[sha256] = asyncio.get_running_loop().create_future()
+                try:
+                    await self._place_blob(key, content_type, body, staging_key)
+                except BaseException as e:
+                    placed.set_exception(e)
+                    placed.exception()  # waiters re-raise it; don't log it as unretrieved
+                    raise
+                placed.set_result(None)
+            elif sha256 in placing:
+                await asyncio.shield(placing[sha256])
+            if body is None:
+                await run_s3(self.s3_client.delete_object, Bucket=settings.s3_bucket_name, Key=staging_key)
+        except ClientError as e:
+            async with db_lock:
+                await BlobStore(self.db).release(sha256)
+            raise HTTPException(status_code=500, detail=f"Failed to upload file to S3: {str(e)}")
+        
+        return ClaimFile(
+            claim_id=claim_id,
+            filename=file.filename,
+            original_filename=file.filename,
+            file_size=file_size,
+            content_type=content_type,
+            s3_key=blob.storage_key,
+            s3_url=f"https://{settings.s3_bucket_name}.s3.{settings.aws_region}.amazonaws.com/{blob.storage_key}",
+            sha256=sha256
+        )
+    
+    @staticmethod
+    def _response(claim_file: ClaimFile) -> FileUploadResponse:
+        return FileUploadResponse(
+            id=claim_file.id,
+            filename=claim_file.filename,
+            original_filename=claim_file.original_filename,
+            file_size=claim_file.file_size,
+            content_type=claim_file.content_type,
+            s3_url=claim_file.s3_url,
+            sha256=claim_file.sha256,
+            thumbnail_url=claim_file.thumbnail_url,
+            preview_url=claim_file.preview_url,
+            created_at=claim_file.created_at
+        )
+    
+    async def upload_file(
+        self, 
+        claim_id: uuid.UUID, 
+        file: UploadFile
+    ) -> FileUploadResponse:
+        """Upload a file to S3 and save metadata to database.
+        
+        Uploading bytes that already exist only adds a blob reference.
+        """
+        try:
+            claim_file = await self._upload_one(claim_id, file, asyncio.Lock(), {})
+        except HTTPException:
+            await self.db.rollback()
+            raise
+        
+        # Save file metadata to database
+        self.db.add(claim_file)
+        await self.db.commit()
+        await self.db.refresh(claim_file)
+        enqueue_derivatives(claim_file.s3_key, claim_file.content_type, claim_file.sha256)
+        
+        return self._response(claim_file)
+    
+    async def upload_files(self, claim_id: uuid.UUID, files: List[UploadFile]) -> BatchUploadResponse:
+        """Upload many files to one claim.
+        
+        Files stream to S3 concurrently (at most ``upload_batch_concurrency``
+        at a time) and all rows are inserted in one transaction. A failed
+        file is reported in its item and does not fail the others.
+        """
+        return await run_batch_upload(
+            self.db,
+            files,
+            lambda file, db_lock, placing: self._upload_one(claim_id, file, db_lock, placing),
+            self._response,
+        )
+    
+    async def attach_by_hash(
+        self,
+        claim_id: uuid.UUID,
+        user_id: uuid.UUID,
+        sha256: str,
+        filename: str
+    ) -> Optional[FileUploadResponse]:
+        """Attach content the user already uploaded, without re-sending it.
+        
+        Returns ``None`` when the user has no file with this hash; the
+        client then uploads normally.
+        """
+        claim_file = await BlobStore(self.db).attach_existing(claim_id, user_id, sha256, filename)
+        if not claim_file:
+            return None
+        return self._response(claim_file)
+    
     async def get_claim_files(self, claim_id: uuid.UUID) -> List[ClaimFile]:
         """Get all files for a claim."""
         result = await self.db.execute(
@@ -113,7 +285,7 @@ class FileService:
         return result.scalars().all()
     
     async def delete_file(self, file_id: uuid.UUID) -> bool:
-        """Delete a file from S3 and database."""
+        """Delete a file from the database, and its bytes once unreferenced."""
         # Get file from database
         result = await self.db.execute(select(ClaimFile).where(ClaimFile.id == file_id))
         claim_file = result.scalar_one_or_none()
@@ -121,12 +293,21 @@ class FileService:
         if not claim_file:
             return False
         
+        # Legacy per-claim objects have no blob row and are always removed
+        s3_key: Optional[str] = claim_file.s3_key
+        if claim_file.sha256 and claim_file.s3_key == blob_key(claim_file.sha256):
+            released = await BlobStore(self.db).release(claim_file.sha256)
+            s3_key = released.storage_key if released else None
+        
         try:
-            # Delete from S3
-            self.s3_client.delete_object(
-                Bucket=settings.s3_bucket_name,
-                Key=claim_file.s3_key
-            )
+            # Delete from S3 when this was the last reference
+            if s3_key:
+                for key in [s3_key, *derivative_keys(s3_key)]:
+                    await run_s3(
+                        self.s3_client.delete_object,
+                        Bucket=settings.s3_bucket_name,
+                        Key=key
+                    )
             
             # Delete from database
             await self.db.delete(claim_file)
@@ -0,0 +1,165 @@
+"""Perceptual hashes of evidence photos and near-duplicate lookups.
+
+A perceptual hash (pHash) is 64 bits taken from the low-frequency DCT
+coefficients of a 32x32 grayscale copy of the image. Re-encoding, resizing,
+light cropping or a colour tweak flip only a few bits, so the Hamming distance
+between two hashes says how alike the pictures are; unrelated photos sit
+around 32 bits apart.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+from PIL import Image
+
+T = TypeVar("T")
+
+HASH_BITS = 64
+_DCT_SIZE = 32
+_LOW_FREQ = 8  # 8x8 lowest frequencies -> 64 bits
+
+# Multi-index hashing: hashes are split into chunks with one table per chunk.
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def perceptual_hash(img: Image.Image) -> int:
+    """64-bit pHash of an image."""
+    small = img.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:_LOW_FREQ, :_LOW_FREQ].flatten()
+    # The DC term is overall brightness and would skew the median
+    bits = low > np.median(low[1:])
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def phash_bytes(data: bytes) -> str:
+    """pHash of encoded image bytes as 16 hex digits, the stored form."""
+    with Image.open(io.BytesIO(data)) as img:
+        # Only 32x32 pixels are needed, so let JPEG decode at 1/8 scale
+        img.draft("L", (_DCT_SIZE * 2, _DCT_SIZE * 2))
+        return format(perceptual_hash(img), "016x")
+
+
+def parse_phash(value: Optional[str]) -> Optional[int]:
+    return int(value, 16) if value else None
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> Tuple[int, ...]:
+    """Every CHUNK_BITS-bit mask with at most ``radius`` bits set."""
+    masks = [0]
+    for _ in range(radius):
+        masks = sorted({m | (1 << bit) for m in masks for bit in range(CHUNK_BITS)} | set(masks))
+    return tuple(masks)
+
+
+class HammingIndex:
+    """Radius lookups over 64-bit hashes by multi-index hashing.
+
+    Two hashes within distance ``r`` agree to within ``r // 4`` bits on at
+    least one of their four 16-bit chunks, so a query only visits, per chunk,
+    the buckets within that many bits of its own chunk, then checks the few
+    candidates found there exactly. With a million hashes a bucket holds about
+    fifteen entries and a radius-7 query checks around a thousand, where a
+    BK-tree at the same radius still walks a large part of the tree.
+    """
+
+    def __init__(self) -> None:
+        # Buckets hold distinct hash values; keys sharing a value are listed once in _keys
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(CHUNKS)]
+        self._keys: Dict[int, List[Hashable]] = {}
+        self._hashes: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._hashes
+
+    @staticmethod
+    def _chunks(value: int) -> Iterable[Tuple[int, int]]:
+        for i in range(CHUNKS):
+            yield i, (value >> (i * CHUNK_BITS)) & _CHUNK_MASK
+
+    def add(self, key: Hashable, value: int) -> None:
+        if key in self._hashes:
+            self.remove(key)
+        self._hashes[key] = value
+        keys = self._keys.get(value)
+        if keys is not None:
+            keys.append(key)
+            return
+        self._keys[value] = [key]
+        for i, chunk in self._chunks(value):
+            self._tables[i].setdefault(chunk, []).append(value)
+
+    def remove(self, key: Hashable) -> None:
+        value = self._hashes.pop(key)
+        keys = self._keys[value]
+        keys.remove(key)
+        if keys:
+            return
+        del self._keys[value]
+        for i, chunk in self._chunks(value):
+            bucket = self._tables[i][chunk]
+            bucket.remove(value)
+            if not bucket:
+                del self._tables[i][chunk]
+
+    def query(self, value: int, radius: int) -> List[Tuple[Hashable, int]]:
+        """``(key, distance)`` of every hash within ``radius`` bits, nearest first."""
+        masks = _flip_masks(radius // CHUNKS)
+        hits = set()
+        for i, chunk in self._chunks(value):
+            table = self._tables[i]
+            for mask in masks:
+                bucket = table.get(chunk ^ mask)
+                if bucket:
+                    hits.update([h for h in bucket if (h ^ value).bit_count() <= radius])
+        found = [(key, (h ^ value).bit_count()) for h in hits for key in self._keys[h]]
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+@dataclass
+class SyncedIndex:
+    """A HammingIndex kept between requests, and up to when it was synced."""
+
+    index: HammingIndex = field(default_factory=HammingIndex)
+    synced_at: Optional[datetime] = None
+
+
+def collapse_near_duplicates(items: Sequence[T], hash_of: Callable[[T], Optional[int]], radius: int) -> List[T]:
+    """Keep the first of every group of images within ``radius`` bits.
+
+    Items without a hash yet are always kept.
+    """
+    index = HammingIndex()
+    kept = []
+    for position, item in enumerate(items):
+        value = hash_of(item)
+        if value is not None:
+            if index.query(value, radius):
+                continue
+            index.add(position, value)
+        kept.append(item)
+    return kept
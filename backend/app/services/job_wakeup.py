@@ -0,0 +1,103 @@
+"""Wake idle workers when jobs are queued instead of polling on a timer.
+
+Within a process, enqueueing notifies an asyncio.Condition that idle workers
+wait on. With ``job_wakeup_redis`` enabled, enqueueing also pushes a token to
+a per-type Redis list, and workers in other processes block on it with BLPOP.
+Either way a worker wakes within milliseconds of new work. The wait timeout
+grows exponentially while a worker stays idle, so if a notification is lost,
+or Redis is down, the worker degrades to slow polling, never to stalling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+from typing import Callable, Sequence
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+WAKEUP_KEY = "jobs:wakeup:{}"
+WAKEUP_BACKLOG = 1000  # tokens kept per type while no worker is listening
+REDIS_RETRY_AFTER = 30.0  # seconds of plain polling after a Redis error
+
+_CONDITIONS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Condition]" = weakref.WeakKeyDictionary()
+_REDIS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def _condition() -> asyncio.Condition:
+    loop = asyncio.get_running_loop()
+    condition = _CONDITIONS.get(loop)
+    if condition is None:
+        condition = _CONDITIONS[loop] = asyncio.Condition()
+    return condition
+
+
+def _redis() -> aioredis.Redis:
+    # Connections belong to the loop that opened them
+    loop = asyncio.get_running_loop()
+    client = _REDIS.get(loop)
+    if client is None:
+        client = _REDIS[loop] = aioredis.Redis.from_url(settings.redis_url)
+    return client
+
+
+async def notify(queue_type: str) -> None:
+    """Wake workers waiting for ``queue_type``; never fails the enqueue."""
+    condition = _condition()
+    async with condition:
+        condition.notify_all()
+    if settings.job_wakeup_redis:
+        key = WAKEUP_KEY.format(queue_type)
+        try:
+            async with _redis().pipeline(transaction=False) as pipe:
+                await pipe.rpush(key, 1).ltrim(key, -WAKEUP_BACKLOG, -1).execute()
+        except (RedisError, OSError):
+            logger.warning("job wakeup publish failed; workers fall back to polling", exc_info=True)
+
+
+class Wakeup:
+    """Idle wait for one worker loop.
+
+    ``wait`` returns when one of ``queue_types`` may have work: on a
+    notification, or when the backoff timeout passes. Call ``reset`` after
+    the worker found work, so the next timeout starts small again.
+    """
+
+    def __init__(self, queue_types: Sequence[str], has_work: Callable[[], bool]) -> None:
+        self._keys = [WAKEUP_KEY.format(t) for t in queue_types]
+        self._has_work = has_work
+        self._delay = settings.worker_poll_min_interval
+        self._redis_down_until = 0.0
+
+    @property
+    def delay(self) -> float:
+        return self._delay
+
+    def reset(self) -> None:
+        self._delay = settings.worker_poll_min_interval
+
+    async def wait(self) -> None:
+        timeout = self._delay
+        self._delay = min(self._delay * 2, settings.worker_poll_max_interval)
+        if self._has_work():
+            return
+        if settings.job_wakeup_redis and time.monotonic() >= self._redis_down_until:
+            try:
+                await _redis().blpop(self._keys, timeout=timeout)
+                return
+            except (RedisError, OSError):
+                logger.warning("job wakeup BLPOP failed; polling for %ss", REDIS_RETRY_AFTER, exc_info=True)
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        condition = _condition()
+        async with condition:
+            try:
+                await asyncio.wait_for(condition.wait_for(self._has_work), timeout)
+            except asyncio.TimeoutError:
+                pass
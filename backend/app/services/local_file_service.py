@@ -1,15 +1,46 @@
 """Local file service for development (no AWS required)."""
 
+import asyncio
+import hashlib
 import uuid
 import os
-import shutil
-from typing import Optional, List
+from typing import BinaryIO, Dict, Optional, List, Tuple
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config import settings
 from app.models.claim import ClaimFile
-from app.schemas.claim import FileUploadResponse
+from app.schemas.claim import BatchUploadResponse, FileUploadResponse
+from app.services.batch_upload import run_batch_upload
+from app.services.blob_store import BlobStore, blob_key
+from app.services.derivatives import derivative_keys, enqueue_derivatives
+from app.services.disk_io import run_disk_io
+
+
+def _open_for_write(file_path: str) -> BinaryIO:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return open(file_path, "xb")
+
+
+def _close(handle: BinaryIO, fsync: bool) -> None:
+    try:
+        if fsync:
+            handle.flush()
+            os.fsync(handle.fileno())
+    finally:
+        handle.close()
+
+
+def _move_into_place(src: str, dst: str) -> None:
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(src, dst)
+
+
+def _remove_if_exists(file_path: str) -> None:
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
 
 
 class LocalFileService:
@@ -19,18 +50,18 @@ class LocalFileService:
         self.db = db
         self.upload_dir = "uploads"
         self.base_url = "http://localhost:8000/files"
-        
-        # Create upload directory if it doesn't exist
-        os.makedirs(self.upload_dir, exist_ok=True)
+    
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum allowed size of {settings.max_file_size} bytes"
+        )
     
     def _validate_file(self, file: UploadFile) -> None:
         """Validate uploaded file."""
         # Check file size
         if file.size and file.size > settings.max_file_size:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size exceeds maximum allowed size of {settings.max_file_size} bytes"
-            )
+            raise self._too_large()
         
         # Check file extension
         if file.filename:
@@ -41,73 +72,160 @@ class LocalFileService:
                     detail=f"File type not allowed. Allowed types: {', '.join(settings.allowed_extensions)}"
                 )
     
-    def _generate_file_path(self, claim_id: uuid.UUID, filename: str) -> tuple[str, str]:
-        """Generate file path and URL for local storage."""
-        file_extension = filename.split('.')[-1].lower()
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
+    def _generate_staging_path(self) -> str:
+        """Temporary path for an upload whose hash is not yet known."""
+        return os.path.join(self.upload_dir, "staging", str(uuid.uuid4()))
+    
+    def _blob_path(self, sha256: str) -> tuple[str, str]:
+        """File path and URL of the stored content for ``sha256``."""
+        key = blob_key(sha256)
+        return os.path.join(self.upload_dir, *key.split("/")), f"{self.base_url}/{key}"
+    
+    async def _write_chunks(self, file: UploadFile, file_path: str) -> Tuple[int, str]:
+        """Write an upload to disk in fixed-size chunks off the event loop.
+        
+        Returns the size and SHA-256 of the written bytes. Aborts with 413
+        and removes the partial file as soon as ``max_file_size`` is
+        exceeded, whether or not the client sent a size.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        handle = await run_disk_io(_open_for_write, file_path)
+        try:
+            while True:
+                chunk = await file.read(settings.upload_chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.max_file_size:
+                    raise self._too_large()
+                digest.update(chunk)
+                await run_disk_io(handle.write, chunk)
+        except BaseException:
+            await run_disk_io(handle.close)
+            await run_disk_io(_remove_if_exists, file_path)
+            raise
+        await run_disk_io(_close, handle, settings.local_upload_fsync)
+        return size, digest.hexdigest()
+    
+    async def _upload_one(
+        self,
+        claim_id: uuid.UUID,
+        file: UploadFile,
+        db_lock: asyncio.Lock,
+        placing: Dict[str, "asyncio.Future[None]"]
+    ) -> ClaimFile:
+        """Write one upload and reference its blob; returns the unsaved row.
         
-        # Create claim-specific directory
-        claim_dir = os.path.join(self.upload_dir, str(claim_id))
-        os.makedirs(claim_dir, exist_ok=True)
+        Content is stored once per SHA-256; duplicate uploads only add a
+        reference to the existing blob. Moving a new blob into place is
+        atomic, so ``placing`` is unused here.
+        """
+        self._validate_file(file)
+        staging_path = self._generate_staging_path()
+        content_type = file.content_type or 'application/octet-stream'
         
-        file_path = os.path.join(claim_dir, unique_filename)
-        file_url = f"{self.base_url}/{claim_id}/{unique_filename}"
+        try:
+            # Save file to local storage
+            file_size, sha256 = await self._write_chunks(file, staging_path)
+            blob_path, file_url = self._blob_path(sha256)
+            async with db_lock:
+                _, created = await BlobStore(self.db).acquire(sha256, file_size, content_type, blob_path)
+            if created:
+                try:
+                    await run_disk_io(_move_into_place, staging_path, blob_path)
+                except Exception:
+                    async with db_lock:
+                        await BlobStore(self.db).release(sha256)
+                    raise
+            else:
+                await run_disk_io(_remove_if_exists, staging_path)
+        except HTTPException:
+            raise
+        except Exception as e:
+            await run_disk_io(_remove_if_exists, staging_path)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload file: {str(e)}"
+            )
         
-        return file_path, file_url
+        return ClaimFile(
+            claim_id=claim_id,
+            filename=file.filename,
+            original_filename=file.filename,
+            file_size=file_size,
+            content_type=content_type,
+            s3_key=blob_path,  # Store local path in s3_key field
+            s3_url=file_url,
+            sha256=sha256
+        )
+    
+    @staticmethod
+    def _response(claim_file: ClaimFile) -> FileUploadResponse:
+        return FileUploadResponse(
+            id=claim_file.id,
+            filename=claim_file.filename,
+            original_filename=claim_file.original_filename,
+            file_size=claim_file.file_size,
+            content_type=claim_file.content_type,
+            s3_url=claim_file.s3_url,
+            sha256=claim_file.sha256,
+            thumbnail_url=claim_file.thumbnail_url,
+            preview_url=claim_file.preview_url,
+            created_at=claim_file.created_at
+        )
     
     async def upload_file(
-        self, 
-        claim_id: uuid.UUID, 
+        self,
+        claim_id: uuid.UUID,
         file: UploadFile
     ) -> FileUploadResponse:
         """Upload a file to local storage and save metadata to database."""
-        # Validate file
-        self._validate_file(file)
-        
-        # Generate file path
-        file_path, file_url = self._generate_file_path(claim_id, file.filename)
+        try:
+            claim_file = await self._upload_one(claim_id, file, asyncio.Lock(), {})
+        except HTTPException:
+            await self.db.rollback()
+            raise
         
         try:
-            # Save file to local storage
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
             # Save file metadata to database
-            claim_file = ClaimFile(
-                claim_id=claim_id,
-                filename=file.filename,
-                original_filename=file.filename,
-                file_size=file_size,
-                content_type=file.content_type or 'application/octet-stream',
-                s3_key=file_path,  # Store local path in s3_key field
-                s3_url=file_url
-            )
-            
             self.db.add(claim_file)
             await self.db.commit()
             await self.db.refresh(claim_file)
-            
-            return FileUploadResponse(
-                id=claim_file.id,
-                filename=claim_file.filename,
-                original_filename=claim_file.original_filename,
-                file_size=claim_file.file_size,
-                content_type=claim_file.content_type,
-                s3_url=claim_file.s3_url,
-                created_at=claim_file.created_at
-            )
-            
         except Exception as e:
-            # Clean up file if database save fails
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            # Clean up the blob if nothing references it after the rollback
+            await self.db.rollback()
+            if not await BlobStore(self.db).exists(claim_file.sha256):
+                await run_disk_io(_remove_if_exists, claim_file.s3_key)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to upload file: {str(e)}"
             )
+        enqueue_derivatives(claim_file.s3_key, claim_file.content_type, claim_file.sha256)
+        
+        return self._response(claim_file)
+    
+    async def upload_files(self, claim_id: uuid.UUID, files: List[UploadFile]) -> BatchUploadResponse:
+        """Upload many files to one claim concurrently, committing once."""
+        return await run_batch_upload(
+            self.db,
+            files,
+            lambda file, db_lock, placing: self._upload_one(claim_id, file, db_lock, placing),
+            self._response,
+        )
+    
+    async def attach_by_hash(
+        self,
+        claim_id: uuid.UUID,
+        user_id: uuid.UUID,
+        sha256: str,
+        filename: str
+    ) -> Optional[FileUploadResponse]:
+        """Attach content the user already uploaded, without re-sending it."""
+        claim_file = await BlobStore(self.db).attach_existing(claim_id, user_id, sha256, filename)
+        if not claim_file:
+            return None
+        return self._response(claim_file)
     
     async def get_claim_files(self, claim_id: uuid.UUID) -> List[ClaimFile]:
         """Get all files for a claim."""
@@ -117,7 +235,7 @@ class LocalFileService:
         return result.scalars().all()
     
     async def delete_file(self, file_id: uuid.UUID) -> bool:
-        """Delete a file from local storage and database."""
+        """Delete a file from the database, and its bytes once unreferenced."""
         # Get file from database
         result = await self.db.execute(select(ClaimFile).where(ClaimFile.id == file_id))
         claim_file = result.scalar_one_or_none()
@@ -125,17 +243,24 @@ class LocalFileService:
         if not claim_file:
             return False
         
+        # Legacy per-claim files have no blob row and are always removed
+        file_path: Optional[str] = claim_file.s3_key
+        if claim_file.sha256 and claim_file.s3_key == self._blob_path(claim_file.sha256)[0]:
+            released = await BlobStore(self.db).release(claim_file.sha256)
+            file_path = released.storage_key if released else None
+        
         try:
-            # Delete from local storage
-            if os.path.exists(claim_file.s3_key):
-                os.remove(claim_file.s3_key)
+            # Delete from local storage when this was the last reference
+            if file_path:
+                for path in [file_path, *derivative_keys(file_path)]:
+                    await run_disk_io(_remove_if_exists, path)
             
             # Delete from database
             await self.db.delete(claim_file)
             await self.db.commit()
             
             return True
-            
+        
         except Exception:
             # If file deletion fails, still delete from database
             await self.db.delete(claim_file)
@@ -0,0 +1,37 @@
+"""In-process latency counters shared by storage and scanner metrics."""
+
+from collections import deque
+from typing import Deque, Dict
+
+
+class LatencyStats:
+    """Latency counters for one operation."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent: Deque[float] = deque(maxlen=512)
+
+    def observe(self, elapsed_ms: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += int(failed)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent.append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self.recent)
+
+        def pct(p: float) -> float:
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 2) if recent else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(self.max_ms, 2),
+        }
@@ -1,8 +1,167 @@
+"""OCR for receipts, photos and scanned policies.
+
+Rendering a page and running Tesseract on it is CPU-bound, so each page is
+a separate task in a process pool and a multi-page PDF keeps every worker
+busy. Workers open the file themselves and load only their page, so a task
+never carries document bytes across the process boundary. Results are
+cached by content hash and engine version.
+"""
+
 from __future__ import annotations
 
+import asyncio
+import mimetypes
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 
-class OCRService:
-    async def extract_text(self, file_path: str) -> str | None:
-        # Stub returns None for MVP
+import pypdfium2 as pdfium
+import pytesseract
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.disk_io import hash_file, run_disk_io
+
+
+OCR_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "application/pdf"}
+OCR_DPI = 300  # Tesseract is tuned for ~300 DPI input
+PAGE_SEPARATOR = "\f"  # Tesseract's own page break
+
+# PDFium is not thread-safe; serializes callers sharing a process
+PDFIUM_LOCK = threading.Lock()
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_CACHE: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+
+class OCRError(Exception):
+    """Tesseract failed or is not installed."""
+
+
+@lru_cache(maxsize=1)
+def engine_version() -> str:
+    """Identifies the engine, version and languages that produced cached text."""
+    return f"tesseract-{pytesseract.get_tesseract_version()}-{settings.ocr_languages}"
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    # One Tesseract thread per process; the pool provides the parallelism
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    if memory_limit_mb:
+        import resource
+
+        limit = memory_limit_mb * 1024 * 1024
+        # Inherited by the tesseract child, so it bounds the whole task
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def page_count(path: str, content_type: str) -> int:
+    if content_type == "application/pdf":
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(path)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+
+def _render_page(path: str, content_type: str, index: int) -> Image.Image:
+    if content_type == "application/pdf":
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(path)
+            try:
+                page = pdf[index]
+                image = page.render(scale=OCR_DPI / 72, grayscale=True).to_pil()
+                page.close()
+                return image
+            finally:
+                pdf.close()
+    with Image.open(path) as img:
+        img.seek(index)
+        return ImageOps.exif_transpose(img).convert("L")
+
+
+def _recognize(image: Image.Image, languages: str) -> str:
+    try:
+        return pytesseract.image_to_string(image, lang=languages, config="--oem 1 --psm 3")
+    except (pytesseract.TesseractError, pytesseract.TesseractNotFoundError) as e:
+        # pytesseract's exceptions cannot be unpickled in the parent and
+        # would break the whole pool
+        raise OCRError(str(e)) from None
+
+
+def ocr_page(path: str, content_type: str, index: int, languages: str) -> str:
+    """Render one page and OCR it; runs inside a pool worker."""
+    return _recognize(_render_page(path, content_type, index), languages).strip()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _POOL
+    # Zero workers, or a daemonic process (Celery prefork child), means inline
+    if settings.ocr_workers <= 0 or multiprocessing.current_process().daemon:
         return None
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(
+            max_workers=settings.ocr_workers,
+            # Spawned workers are recycled after a number of pages, returning
+            # memory that large scans fragment; fork cannot recycle workers
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=settings.ocr_max_tasks_per_child or None,
+            initializer=_init_worker,
+            initargs=(settings.ocr_worker_memory_mb,),
+        )
+    return _POOL
+
+
+def shutdown_ocr() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True)
+        _POOL = None
+
+
+class OCRService:
+    def cached_text(self, sha256: str) -> Optional[str]:
+        """OCR text already produced for this content by the current engine."""
+        return _CACHE.get((sha256, engine_version()))
+
+    async def ocr_pages(self, file_path: str, content_type: str, pages: Iterable[int]) -> List[str]:
+        """OCR the given pages in parallel; returns their text in page order."""
+        pool = _get_pool()
+        languages = settings.ocr_languages
+        if pool is None:
+            return [ocr_page(file_path, content_type, index, languages) for index in pages]
+        loop = asyncio.get_running_loop()
+        return list(
+            await asyncio.gather(
+                *(loop.run_in_executor(pool, ocr_page, file_path, content_type, index, languages) for index in pages)
+            )
+        )
+
+    async def extract_text(
+        self,
+        file_path: str,
+        content_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> str | None:
+        """Text of every page, separated by form feeds; None if not OCR-able."""
+        content_type = content_type or mimetypes.guess_type(file_path)[0]
+        if content_type not in OCR_CONTENT_TYPES:
+            return None
+        key = (sha256 or await run_disk_io(hash_file, file_path), engine_version())
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
 
+        count = min(await run_disk_io(page_count, file_path, content_type), settings.ocr_max_pages)
+        text = PAGE_SEPARATOR.join(await self.ocr_pages(file_path, content_type, range(count)))
+        _CACHE[key] = text
+        while len(_CACHE) > settings.ocr_cache_size:
+            _CACHE.popitem(last=False)
+        return text
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
-from typing import Optional
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
-from app.config import Settings
+from app.config import Settings, settings
 from app.repositories.claims_repo import ClaimsRepo
 from app.repositories.jobs_repo import JobsRepo
 
 
-# Simple in-memory map claim_id -> url
-_PDF_URLS: dict[str, str] = {}
+# In-memory map claim_id -> (url, created), oldest first; bounded by pdf_url_ttl/pdf_url_max
+_PDF_URLS: "OrderedDict[str, Tuple[str, datetime]]" = OrderedDict()
+
+
+def expire_pdf_urls(now: Optional[datetime] = None) -> int:
+    """Drop URLs older than ``pdf_url_ttl``; returns how many."""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=settings.pdf_url_ttl)
+    removed = 0
+    while _PDF_URLS and next(iter(_PDF_URLS.values()))[1] <= cutoff:
+        _PDF_URLS.popitem(last=False)
+        removed += 1
+    return removed
 
 
 class PDFService:
@@ -26,11 +38,15 @@ class PDFService:
             self._jobs = JobsRepo()
         job = await self._jobs.enqueue(user_id, "pdf_generation", {"claim_id": claim_id})
         # Generate a fake URL immediately for MVP
-        _PDF_URLS[claim_id] = f"https://storage.fake/pdfs/{claim_id}.pdf"
-        await self._jobs.succeed(job["id"], {"url": _PDF_URLS[claim_id]})
+        url = f"https://storage.fake/pdfs/{claim_id}.pdf"
+        _PDF_URLS.pop(claim_id, None)
+        _PDF_URLS[claim_id] = (url, datetime.utcnow())
+        while len(_PDF_URLS) > settings.pdf_url_max:
+            _PDF_URLS.popitem(last=False)
+        await self._jobs.succeed(job["id"], {"url": url})
         return job
 
     async def get_pdf(self, user_id: str, claim_id: str) -> dict:
-        url = _PDF_URLS.get(claim_id)
-        return {"url": url}
+        entry = _PDF_URLS.get(claim_id)
+        return {"url": entry[0] if entry else None}
 
@@ -0,0 +1,131 @@
+"""Capture time, GPS position and camera from photo EXIF headers.
+
+Only the first EXIF_HEAD_BYTES of a file are read: EXIF lives in a single
+APP1 segment (at most 64KB) before the compressed image data, so the JPEG
+marker walk below finds it without decoding a single pixel, and a 20MB photo
+costs one small read.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+from app.domain.models.core import Claim
+from app.repositories.files_repo import FilesRepo
+
+
+EXIF_HEAD_BYTES = 128 * 1024  # APP0 + APP1 (<= 64KB) fit with room to spare
+EXIF_CONTENT_TYPES = {"image/jpeg"}
+
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_MAKE, _MODEL, _ORIENTATION, _DATETIME = 0x010F, 0x0110, 0x0112, 0x0132
+_DATETIME_ORIGINAL, _OFFSET_TIME_ORIGINAL = 0x9003, 0x9011
+_GPS_LAT_REF, _GPS_LAT, _GPS_LON_REF, _GPS_LON = 1, 2, 3, 4
+
+
+def exif_segment(head: bytes) -> Optional[bytes]:
+    """The APP1 Exif payload of a JPEG, if it lies within ``head``."""
+    if head[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):  # end of image / start of scan: no more metadata
+            return None
+        length = int.from_bytes(head[pos + 2:pos + 4], "big")
+        if marker == 0xE1 and head[pos + 4:pos + 10] == b"Exif\x00\x00":
+            end = pos + 2 + length
+            return head[pos + 4:end] if end <= len(head) else None
+        pos += 2 + length
+    return None
+
+
+def _degrees(value: Any, ref: Any) -> Optional[float]:
+    try:
+        d, m, s = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    degrees = d + m / 60 + s / 3600
+    return -degrees if ref in ("S", "W") else degrees
+
+
+def _taken_at(stamp: Any, offset: Any) -> Optional[str]:
+    try:
+        taken = datetime.strptime(str(stamp).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    iso = taken.isoformat()
+    return f"{iso}{offset}" if isinstance(offset, str) and len(offset) == 6 else iso
+
+
+def read_photo_metadata(head: bytes) -> Dict[str, Any]:
+    """Parse capture time, GPS and camera from the first bytes of a JPEG."""
+    segment = exif_segment(head)
+    if segment is None:
+        return {}
+    exif = Image.Exif()
+    try:
+        exif.load(segment)
+        details = exif.get_ifd(_EXIF_IFD)
+        gps = exif.get_ifd(_GPS_IFD)
+    except Exception:  # noqa: BLE001 - malformed EXIF is common and never fatal
+        return {}
+
+    metadata: Dict[str, Any] = {}
+    taken_at = _taken_at(details.get(_DATETIME_ORIGINAL) or exif.get(_DATETIME), details.get(_OFFSET_TIME_ORIGINAL))
+    if taken_at:
+        metadata["taken_at"] = taken_at
+    lat = _degrees(gps.get(_GPS_LAT), gps.get(_GPS_LAT_REF))
+    lon = _degrees(gps.get(_GPS_LON), gps.get(_GPS_LON_REF))
+    if lat is not None and lon is not None:
+        metadata["gps"] = {"lat": round(lat, 6), "lon": round(lon, 6)}
+    camera = " ".join(str(exif[tag]).strip("\x00 ") for tag in (_MAKE, _MODEL) if exif.get(tag))
+    if camera:
+        metadata["camera"] = camera
+    if exif.get(_ORIENTATION):
+        metadata["orientation"] = int(exif[_ORIENTATION])
+    return metadata
+
+
+def merge_photo_metadata(claim: Claim, file_id: str, metadata: Dict[str, Any]) -> None:
+    """Record a photo's metadata on the claim and fill blank incident fields.
+
+    Values the user entered are never overwritten; filled fields are listed
+    under ``incident_metadata["autofilled"]`` so the UI can mark them.
+    """
+    if not metadata:
+        return
+    claim.incident_metadata.setdefault("photos", {})[file_id] = metadata
+    autofilled = claim.incident_metadata.setdefault("autofilled", [])
+    photos = claim.incident_metadata["photos"].values()
+    if not claim.incident_occurred_at or "incident_occurred_at" in autofilled:
+        # The earliest shot is closest to the incident
+        times = sorted(p["taken_at"] for p in photos if "taken_at" in p)
+        if times:
+            claim.incident_occurred_at = times[0]
+            if "incident_occurred_at" not in autofilled:
+                autofilled.append("incident_occurred_at")
+    if not claim.incident_location or "incident_location" in autofilled:
+        located = [p for p in photos if "gps" in p]
+        if located:
+            first = min(located, key=lambda p: p.get("taken_at", "~"))
+            claim.incident_location = f"{first['gps']['lat']},{first['gps']['lon']}"
+            if "incident_location" not in autofilled:
+                autofilled.append("incident_location")
+
+
+async def apply_attachment_metadata(claim: Claim, files: FilesRepo) -> None:
+    """Merge metadata of attachments whose extraction already finished."""
+    for file_id in claim.attachments:
+        f = await files.find(file_id)
+        if f and f.user_id == claim.user_id and f.photo_metadata:
+            merge_photo_metadata(claim, file_id, f.photo_metadata)
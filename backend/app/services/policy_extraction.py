@@ -0,0 +1,133 @@
+"""Policy details from the embedded text of policy PDFs.
+
+Pages are loaded one at a time, so memory stays flat on long policies, and
+the walk stops as soon as the policy number, a coverage limit and a
+deductible have been found; those usually sit on the declarations page near
+the front. Only pages without a text layer (scans) go through OCR.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import pypdfium2 as pdfium
+
+from app.config import settings
+from app.domain.models.core import PolicyFields
+from app.services.disk_io import hash_file, run_disk_io
+from app.services.ocr_service import PDFIUM_LOCK, OCRService
+
+
+# Bump when the patterns change so cached results are re-extracted.
+EXTRACTOR_VERSION = "1"
+MIN_PAGE_CHARS = 20  # fewer extracted characters means an image-only page
+
+POLICY_NUMBER_RE = re.compile(r"policy\s*(?:number|no\.?|#)\s*[:#.]?\s*([A-Z0-9][A-Z0-9\-/]{4,})", re.I)
+AMOUNT_RE = re.compile(r"\$\s?\d[\d,]*(?:\.\d{2})?|\b\d{1,3}(?:,\d{3})+(?:\.\d{2})?\b")
+LABEL_RE = re.compile(r"[^A-Za-z /&'-]+")
+
+_CACHE: "OrderedDict[Tuple[str, str], PolicyFields]" = OrderedDict()
+
+
+def _label(text: str) -> str:
+    label = " ".join(LABEL_RE.sub(" ", text).split()).strip(" -/&'").lower()
+    return label or "general"
+
+
+def parse_policy_text(text: str, fields: PolicyFields) -> None:
+    """Add any policy number, limits and deductibles found in ``text``."""
+    for line in text.splitlines():
+        if fields.policy_number is None:
+            match = POLICY_NUMBER_RE.search(line)
+            if match:
+                fields.policy_number = match.group(1).upper()
+        amount = AMOUNT_RE.search(line)
+        if not amount:
+            continue
+        lowered = line.lower()
+        if "deductible" in lowered:
+            label = _label(line[: lowered.index("deductible")])
+            fields.deductibles.setdefault(label, amount.group(0).replace(" ", ""))
+        elif "limit" in lowered:
+            label = _label(line[: lowered.index("limit")])
+            fields.coverage_limits.setdefault(label, amount.group(0).replace(" ", ""))
+
+
+def _open(path: str) -> pdfium.PdfDocument:
+    with PDFIUM_LOCK:
+        return pdfium.PdfDocument(path)
+
+
+def _close(pdf: pdfium.PdfDocument) -> None:
+    with PDFIUM_LOCK:
+        pdf.close()
+
+
+def _page_count(pdf: pdfium.PdfDocument) -> int:
+    with PDFIUM_LOCK:
+        return len(pdf)
+
+
+def _page_text(pdf: pdfium.PdfDocument, index: int) -> str:
+    """Text layer of one page; the page is released before returning."""
+    with PDFIUM_LOCK:
+        page = pdf[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                return textpage.get_text_range()
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+
+
+class PolicyExtractor:
+    def __init__(self, ocr: Optional[OCRService] = None) -> None:
+        self._ocr = ocr or OCRService()
+
+    async def _ocr_into(self, path: str, pages: List[int], fields: PolicyFields) -> None:
+        for text in await self._ocr.ocr_pages(path, "application/pdf", pages):
+            parse_policy_text(text, fields)
+        fields.ocr_pages.extend(pages)
+
+    async def extract(self, path: str, sha256: Optional[str] = None) -> PolicyFields:
+        key = (sha256 or await run_disk_io(hash_file, path), EXTRACTOR_VERSION)
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
+
+        fields = PolicyFields()
+        pdf = await run_disk_io(_open, path)
+        try:
+            fields.page_count = await run_disk_io(_page_count, pdf)
+            # Image-only pages are OCR'd in batches that fill the OCR pool
+            scanned: List[int] = []
+            batch = max(1, settings.ocr_workers)
+            for index in range(fields.page_count):
+                text = await run_disk_io(_page_text, pdf, index)
+                fields.pages_read = index + 1
+                if len(text.strip()) < MIN_PAGE_CHARS:
+                    if len(fields.ocr_pages) + len(scanned) < settings.ocr_max_pages:
+                        scanned.append(index)
+                    if len(scanned) >= batch:
+                        await self._ocr_into(path, scanned, fields)
+                        scanned = []
+                else:
+                    if scanned:
+                        await self._ocr_into(path, scanned, fields)
+                        scanned = []
+                    parse_policy_text(text, fields)
+                if fields.complete:
+                    break
+            if scanned and not fields.complete:
+                await self._ocr_into(path, scanned, fields)
+        finally:
+            await run_disk_io(_close, pdf)
+
+        _CACHE[key] = fields
+        while len(_CACHE) > settings.policy_extract_cache_size:
+            _CACHE.popitem(last=False)
+        return fields
@@ -0,0 +1,192 @@
+"""Versioned prompt templates with precompiled rendering and token accounting."""
+
+import hashlib
+import math
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+
+# Rough OpenAI tokenizer ratio for English prose; good enough for budgeting.
+CHARS_PER_TOKEN = 4
+# Per-message overhead the chat format adds around each message.
+MESSAGE_TOKEN_OVERHEAD = 4
+# Flat estimate for one image part sent to the vision model.
+IMAGE_TOKEN_ESTIMATE = 765
+TRUNCATION_MARKER = "\n[... truncated ...]"
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the token count of a piece of text."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim text so it fits in roughly ``max_tokens`` tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER))
+    return text[:keep].rstrip() + TRUNCATION_MARKER
+
+
+@dataclass
+class PromptTemplate:
+    """A named, versioned prompt compiled once into literal/field segments."""
+
+    name: str
+    version: str
+    system: str
+    user: str
+    _segments: List[Tuple[str, Optional[str]]] = field(default_factory=list, repr=False)
+    _static_tokens: int = field(default=0, repr=False)
+
+    def __post_init__(self) -> None:
+        self._segments = [
+            (literal, field_name) for literal, field_name, _, _ in Formatter().parse(self.user)
+        ]
+        static_user = "".join(literal for literal, _ in self._segments)
+        message_count = 2 if self.system else 1
+        self._static_tokens = (
+            estimate_tokens(self.system) + estimate_tokens(static_user) + message_count * MESSAGE_TOKEN_OVERHEAD
+        )
+
+    @property
+    def fields(self) -> List[str]:
+        return [name for _, name in self._segments if name]
+
+    @property
+    def static_tokens(self) -> int:
+        """Tokens in the system prompt and the literal parts of the user prompt."""
+        return self._static_tokens
+
+    def render_user(self, **values: object) -> str:
+        parts: List[str] = []
+        for literal, name in self._segments:
+            parts.append(literal)
+            if name:
+                value = values.get(name)
+                parts.append("" if value is None else str(value))
+        return "".join(parts)
+
+    def messages(self, **values: object) -> List[Dict[str, object]]:
+        """Build chat messages for the rendered template."""
+        messages: List[Dict[str, object]] = []
+        if self.system:
+            messages.append({"role": "system", "content": self.system})
+        messages.append({"role": "user", "content": self.render_user(**values)})
+        return messages
+
+    def estimate(self, values: Dict[str, object], images: int = 0) -> int:
+        """Estimate prompt tokens for the given field values and image count."""
+        dynamic = sum(estimate_tokens(None if v is None else str(v)) for v in values.values())
+        return self._static_tokens + dynamic + images * IMAGE_TOKEN_ESTIMATE
+
+    def fit(self, values: Dict[str, object], budget: int, trim_field: str, images: int = 0) -> Dict[str, object]:
+        """Trim ``trim_field`` so the estimated prompt fits within ``budget`` tokens."""
+        text = values.get(trim_field)
+        if not isinstance(text, str):
+            return values
+        others = {k: v for k, v in values.items() if k != trim_field}
+        available = budget - self.estimate(others, images=images)
+        if estimate_tokens(text) <= available:
+            return values
+        return {**values, trim_field: trim_to_tokens(text, max(available, 0))}
+
+    def cache_key(self, **values: object) -> str:
+        """Cache key that changes whenever the template version or inputs change."""
+        raw = "\x1f".join([self.name, self.version, self.render_user(**values)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PromptRegistry:
+    """Registry of compiled prompt templates keyed by name."""
+
+    def __init__(self) -> None:
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def versions(self) -> Dict[str, str]:
+        return {name: t.version for name, t in self._templates.items()}
+
+
+CLAIM_ANALYSIS_SYSTEM = """You are an expert insurance claim analyst. Your job is to analyze incident details and images to create an optimized insurance claim that maximizes reimbursement potential.
+
+Analyze the provided information and generate:
+1. An optimized incident description that highlights key details
+2. A comprehensive damage assessment
+3. A strong claim justification
+4. A realistic requested amount
+5. A strength score (0-100) for the claim
+
+Focus on:
+- Clear, detailed descriptions
+- Professional language
+- Highlighting all claimable damages
+- Supporting evidence from images
+- Legal and policy compliance
+- Maximizing claim value while being realistic
+
+Return your response as a JSON object with these fields:
+{
+    "optimized_description": "...",
+    "damage_assessment": "...",
+    "claim_justification": "...",
+    "requested_amount": 12345.67,
+    "strength_score": 85
+}"""
+
+CLAIM_ANALYSIS_USER = """
+Claim Type: {claim_type}
+Insurance Provider: {insurance_provider}
+Policy Number: {policy_number}
+Incident Date: {incident_date}
+Incident Location: {incident_location}
+
+Policy Details (from the uploaded policy document):
+{policy_details}
+
+Original Incident Description:
+{incident_description}
+
+Please analyze this claim and the attached images to create an optimized version.
+"""
+
+# The summary prompt has always been sent as a single user message.
+CLAIM_SUMMARY_SYSTEM = ""
+
+CLAIM_SUMMARY_USER = """
+        Generate a brief 2-3 sentence summary of this insurance claim:
+
+        Type: {claim_type}
+        Provider: {insurance_provider}
+        Description: {incident_description}
+
+        Focus on the key incident details and claim type.
+        """
+
+CLAIM_SUMMARY_BATCH_SYSTEM = """You write brief, factual 2-3 sentence summaries of insurance claims, focused on the key incident details and claim type.
+
+You receive a JSON array of claims, each with an "id". Return a JSON object of the form:
+{"summaries": [{"id": "...", "summary": "..."}]}
+with exactly one entry per input claim and the same ids."""
+
+CLAIM_SUMMARY_BATCH_USER = """Claims:
+{claims}
+"""
+
+
+# Compiled once at import (application startup).
+prompts = PromptRegistry()
+prompts.register(PromptTemplate("claim_analysis", "2024-02", CLAIM_ANALYSIS_SYSTEM, CLAIM_ANALYSIS_USER))
+prompts.register(PromptTemplate("claim_summary", "2024-01", CLAIM_SUMMARY_SYSTEM, CLAIM_SUMMARY_USER))
+prompts.register(
+    PromptTemplate("claim_summary_batch", "2024-01", CLAIM_SUMMARY_BATCH_SYSTEM, CLAIM_SUMMARY_BATCH_USER)
+)
@@ -0,0 +1,81 @@
+"""Retention sweeps and size gauges for the in-process stores.
+
+Finished jobs, claim drafts and generated PDF URLs live in module-level
+dicts. Each store enforces its size cap on write; the sweeper drops entries
+past their TTL so a long-running process stays flat in memory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import resource
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.repositories.claims_repo import ClaimsRepo
+from app.repositories.jobs_repo import JobsRepo
+from app.services import pdf_service
+
+logger = logging.getLogger(__name__)
+
+_LAST_SWEEP: Dict[str, Any] = {}
+_SWEEPER: Optional[asyncio.Task] = None
+
+
+def rss_bytes() -> int:
+    """Current resident set size; peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def sweep_memory_stores(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Expire old entries from every store; returns how many each dropped."""
+    removed = {
+        "jobs": await JobsRepo().expire_finished(now),
+        "claim_drafts": await ClaimsRepo().expire_drafts(now),
+        "pdf_urls": pdf_service.expire_pdf_urls(now),
+    }
+    _LAST_SWEEP.update(at=(now or datetime.utcnow()).isoformat(), removed=removed)
+    return removed
+
+
+async def memory_gauges() -> Dict[str, Any]:
+    jobs = await JobsRepo().counts()
+    return {
+        "rss_bytes": rss_bytes(),
+        "jobs": jobs["jobs"],
+        "queued_jobs": jobs["queued"],
+        "finished_jobs": jobs["finished"],
+        "claim_drafts": await ClaimsRepo().draft_count(),
+        "pdf_urls": len(pdf_service._PDF_URLS),
+        "last_sweep": dict(_LAST_SWEEP),
+    }
+
+
+async def _sweep_forever() -> None:
+    while True:
+        await asyncio.sleep(settings.memory_sweep_interval)
+        try:
+            await sweep_memory_stores()
+        except Exception:  # noqa: BLE001 - the next sweep retries
+            logger.exception("memory retention sweep failed")
+
+
+def start_sweeper() -> None:
+    global _SWEEPER
+    if _SWEEPER is None or _SWEEPER.done():
+        _SWEEPER = asyncio.get_running_loop().create_task(_sweep_forever())
+
+
+def stop_sweeper() -> None:
+    global _SWEEPER
+    if _SWEEPER is not None:
+        _SWEEPER.cancel()
+        _SWEEPER = None
@@ -0,0 +1,167 @@
+"""Declarative claim validation rules evaluated in batch over columnar data.
+
+Rules are plain data (field, op, argument) scoped to claim types and
+providers. ``RuleEngine`` compiles them once into NumPy predicates; each
+evaluation turns a list of claims into columns and checks every rule against
+every claim with array operations.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.domain.models.core import Claim, ValidationIssue
+
+WILDCARD = "*"
+SEVERITIES = ("error", "warning")
+
+# Claim string fields exposed as columns.
+TEXT_FIELDS = (
+    "provider_id",
+    "provider_name",
+    "policy_number",
+    "incident_description",
+    "incident_occurred_at",
+    "incident_location",
+)
+
+
+@dataclass(frozen=True)
+class Rule:
+    code: str
+    message: str
+    severity: str
+    # Fields the op applies to; "missing" fires only when all are missing.
+    fields: Tuple[str, ...]
+    op: str  # missing | min_length | min_digits
+    arg: int = 0
+    claim_types: Tuple[str, ...] = (WILDCARD,)
+    providers: Tuple[str, ...] = (WILDCARD,)
+
+
+DEFAULT_RULES: List[Rule] = [
+    Rule("POLICY_MISSING", "Policy number missing", "error", ("policy_number",), "missing"),
+    Rule("PROVIDER_MISSING", "Provider not selected", "error", ("provider_id", "provider_name"), "missing"),
+    Rule("DESCRIPTION_MISSING", "Incident description missing", "error", ("incident_description",), "missing"),
+    Rule("POLICY_TOO_SHORT", "Policy number too short", "warning", ("policy_number",), "min_digits", 6),
+    Rule(
+        "DESCRIPTION_TOO_SHORT",
+        "Incident description is very short",
+        "warning",
+        ("incident_description",),
+        "min_length",
+        40,
+    ),
+    Rule("INCIDENT_DATE_MISSING", "Incident date missing", "warning", ("incident_occurred_at",), "missing"),
+    Rule(
+        "INCIDENT_LOCATION_MISSING",
+        "Incident location missing",
+        "warning",
+        ("incident_location",),
+        "missing",
+        claim_types=("auto", "home"),
+    ),
+    Rule(
+        "PROVIDER_DATE_REQUIRED",
+        "Zen Assurance requires the incident date",
+        "error",
+        ("incident_occurred_at",),
+        "missing",
+        providers=("prov_xyz",),
+    ),
+]
+
+
+class ClaimColumns:
+    """Column-oriented view over a batch of claims."""
+
+    def __init__(self, claims: Sequence[Claim]) -> None:
+        self.size = len(claims)
+        self.claim_type = np.array([c.claim_type for c in claims], dtype=object)
+        self.provider_id = np.array([c.provider_id or "" for c in claims], dtype=object)
+        self.length: Dict[str, np.ndarray] = {}
+        self.digits: Dict[str, np.ndarray] = {}
+        for name in TEXT_FIELDS:
+            values = [(getattr(c, name) or "").strip() for c in claims]
+            self.length[name] = np.fromiter((len(v) for v in values), dtype=np.int64, count=self.size)
+            if name == "policy_number":
+                self.digits[name] = np.fromiter(
+                    (sum(ch.isdigit() for ch in v) for v in values), dtype=np.int64, count=self.size
+                )
+
+
+Predicate = Callable[[ClaimColumns], np.ndarray]
+
+
+def _compile_predicate(rule: Rule) -> Predicate:
+    fields = rule.fields
+    if rule.op == "missing":
+        return lambda cols: np.logical_and.reduce([cols.length[f] == 0 for f in fields])
+    if rule.op == "min_length":
+        # Only flag present values; absence is the job of a "missing" rule.
+        return lambda cols: np.logical_or.reduce(
+            [(cols.length[f] > 0) & (cols.length[f] < rule.arg) for f in fields]
+        )
+    if rule.op == "min_digits":
+        return lambda cols: np.logical_or.reduce(
+            [(cols.length[f] > 0) & (cols.digits[f] < rule.arg) for f in fields]
+        )
+    raise ValueError(f"Unknown rule op: {rule.op}")
+
+
+def _compile_scope(rule: Rule) -> Predicate:
+    types = None if WILDCARD in rule.claim_types else list(rule.claim_types)
+    providers = None if WILDCARD in rule.providers else list(rule.providers)
+
+    def scope(cols: ClaimColumns) -> np.ndarray:
+        mask = np.ones(cols.size, dtype=bool)
+        if types is not None:
+            mask &= np.isin(cols.claim_type, types)
+        if providers is not None:
+            mask &= np.isin(cols.provider_id, providers)
+        return mask
+
+    return scope
+
+
+class RuleEngine:
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        for rule in rules:
+            if rule.severity not in SEVERITIES:
+                raise ValueError(f"Unknown severity for {rule.code}: {rule.severity}")
+        self.rules = list(rules)
+        # Rules sharing a claim type/provider scope share one compiled mask.
+        scope_keys = [(r.claim_types, r.providers) for r in self.rules]
+        self._scopes: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], Predicate] = {
+            key: _compile_scope(rule) for key, rule in zip(scope_keys, self.rules)
+        }
+        self._compiled: List[Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], Predicate]] = [
+            (key, _compile_predicate(rule)) for key, rule in zip(scope_keys, self.rules)
+        ]
+
+    def evaluate_matrix(self, cols: ClaimColumns) -> np.ndarray:
+        """Boolean ``(n_claims, n_rules)`` matrix of fired rules."""
+        masks = {key: scope(cols) for key, scope in self._scopes.items()}
+        matrix = np.zeros((cols.size, len(self.rules)), dtype=bool)
+        for j, (key, predicate) in enumerate(self._compiled):
+            matrix[:, j] = masks[key] & predicate(cols)
+        return matrix
+
+    def evaluate(self, claims: Sequence[Claim]) -> List[List[ValidationIssue]]:
+        """Issues for each claim, in input order."""
+        issues: List[List[ValidationIssue]] = [[] for _ in claims]
+        if not claims:
+            return issues
+        matrix = self.evaluate_matrix(ClaimColumns(claims))
+        catalog = [ValidationIssue(code=r.code, severity=r.severity, message=r.message) for r in self.rules]
+        rows, cols = np.nonzero(matrix)
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            issues[i].append(catalog[j])
+        return issues
+
+
+# Compiled once at import.
+default_engine = RuleEngine(DEFAULT_RULES)
@@ -0,0 +1,84 @@
+"""Process-wide S3 client, bounded executor and per-operation latency metrics."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import boto3
+from botocore.config import Config
+
+from app.config import settings
+from app.services.metrics import LatencyStats
+
+
+_client: Optional[Any] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_STATS: Dict[str, LatencyStats] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.s3_max_concurrency,
+            thread_name_prefix="s3",
+        )
+    return _executor
+
+
+def init_s3() -> None:
+    """Create the shared client and executor; called once at startup."""
+    global _client
+    _get_executor()
+    if _client is None:
+        _client = boto3.client(
+            's3',
+            aws_access_key_id=settings.aws_access_key_id,
+            aws_secret_access_key=settings.aws_secret_access_key,
+            region_name=settings.aws_region,
+            config=Config(
+                # One pooled connection per executor thread
+                max_pool_connections=settings.s3_max_concurrency,
+                connect_timeout=settings.s3_connect_timeout,
+                read_timeout=settings.s3_read_timeout,
+                retries={"max_attempts": 3, "mode": "adaptive"},
+            ),
+        )
+
+
+def shutdown_s3() -> None:
+    """Stop the executor; in-flight calls are allowed to finish."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def get_s3_client() -> Any:
+    """Return the shared S3 client, creating it on first use."""
+    if _client is None:
+        init_s3()
+    return _client
+
+
+async def run_s3(fn: Callable[..., Any], **kwargs: Any) -> Any:
+    """Run a blocking S3 call in the bounded executor and time it."""
+    executor = _get_executor()
+    name = getattr(fn, "__name__", "s3")
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    failed = False
+    try:
+        return await loop.run_in_executor(executor, lambda: fn(**kwargs))
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _STATS.setdefault(name, LatencyStats()).observe(elapsed_ms, failed)
+
+
+def s3_metrics() -> Dict[str, Dict[str, float]]:
+    """Latency metrics per S3 operation since process start."""
+    return {name: stats.snapshot() for name, stats in _STATS.items()}
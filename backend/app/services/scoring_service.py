@@ -0,0 +1,124 @@
+"""Local heuristic claim-strength scoring.
+
+Gives an instant ``strength_score`` from claim features before (or without)
+the LLM analysis. Features are extracted per claim and scored as one matrix,
+so batches of thousands of claims score in a few milliseconds.
+"""
+
+import re
+import uuid
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.domain.dto.requests import PolicyValidationRequest
+from app.models.claim import Claim, ClaimFile
+from app.repositories.providers_repo import ProvidersRepo
+
+
+HEURISTIC_SOURCE = "heuristic"
+AI_SOURCE = "ai"
+
+# Terms adjusters look for in a well-documented claim, per claim type.
+CLAIM_KEYWORDS: Dict[str, List[str]] = {
+    "auto": ["collision", "vehicle", "damage", "police", "report", "repair", "estimate", "injury", "bumper", "driver"],
+    "home": ["damage", "water", "fire", "roof", "repair", "estimate", "storm", "leak", "contractor", "receipt"],
+    "health": ["treatment", "doctor", "hospital", "diagnosis", "prescription", "receipt", "injury", "bill", "visit"],
+    "renters": ["theft", "damage", "landlord", "police", "report", "receipt", "stolen", "water", "property"],
+    "other": ["damage", "receipt", "report", "estimate", "date", "loss", "repair", "cost"],
+}
+
+FEATURE_NAMES = [
+    "description_length",
+    "keyword_coverage",
+    "photo_count",
+    "has_document",
+    "policy_valid",
+    "has_incident_date",
+    "has_incident_location",
+    "has_provider",
+]
+
+# Logistic model over the features above (all scaled to 0..1).
+WEIGHTS = np.array([1.6, 1.4, 1.2, 0.4, 0.9, 0.5, 0.5, 0.3], dtype=np.float64)
+BIAS = -2.9
+# Normalisation caps: features at or above the cap count as fully satisfied.
+DESCRIPTION_WORDS_CAP = 150.0
+PHOTO_COUNT_CAP = 5.0
+
+_WORD_RE = re.compile(r"[a-z]+")
+_POLICY_CLAIM_TYPES = {"auto", "home", "health", "travel", "other"}
+
+
+def apply_ai_score(claim: Claim, score: Optional[int]) -> None:
+    """Record the AI's score; without one the heuristic score stays in place."""
+    if score is None:
+        return
+    claim.strength_score = score
+    claim.strength_score_source = AI_SOURCE
+
+
+class ClaimScoringService:
+    """Feature extraction and vectorized scoring for claim strength."""
+
+    def __init__(self, providers_repo: Optional[ProvidersRepo] = None):
+        self.providers = providers_repo or ProvidersRepo()
+
+    async def _policy_valid(self, claim: Claim) -> bool:
+        if not claim.policy_number:
+            return False
+        claim_type = claim.claim_type.value if hasattr(claim.claim_type, "value") else str(claim.claim_type)
+        result = await self.providers.validate_policy(
+            PolicyValidationRequest(
+                claim_type=claim_type if claim_type in _POLICY_CLAIM_TYPES else "other",
+                policy_number=claim.policy_number,
+            )
+        )
+        return result.valid
+
+    async def extract_features(
+        self,
+        claims: Sequence[Claim],
+        files_by_claim: Optional[Mapping[uuid.UUID, Sequence[ClaimFile]]] = None,
+    ) -> np.ndarray:
+        """Build the raw ``(n_claims, n_features)`` feature matrix."""
+        files_by_claim = files_by_claim or {}
+        rows = np.zeros((len(claims), len(FEATURE_NAMES)), dtype=np.float64)
+        for i, claim in enumerate(claims):
+            claim_type = claim.claim_type.value if hasattr(claim.claim_type, "value") else str(claim.claim_type)
+            words = _WORD_RE.findall((claim.incident_description or "").lower())
+            keywords = CLAIM_KEYWORDS.get(claim_type, CLAIM_KEYWORDS["other"])
+            vocabulary = set(words)
+            files = files_by_claim.get(claim.id, ())
+            content_types = [f.content_type or "" for f in files]
+            rows[i] = (
+                len(words),
+                sum(1 for k in keywords if k in vocabulary) / len(keywords),
+                sum(1 for ct in content_types if ct.startswith("image/")),
+                any(ct == "application/pdf" for ct in content_types),
+                await self._policy_valid(claim),
+                claim.incident_date is not None,
+                bool(claim.incident_location),
+                bool(claim.insurance_provider),
+            )
+        return rows
+
+    @staticmethod
+    def score_features(features: np.ndarray) -> np.ndarray:
+        """Score a raw feature matrix; returns integer scores in 0..100."""
+        x = features.copy()
+        x[:, 0] = np.minimum(x[:, 0] / DESCRIPTION_WORDS_CAP, 1.0)
+        x[:, 2] = np.minimum(x[:, 2] / PHOTO_COUNT_CAP, 1.0)
+        logits = x @ WEIGHTS + BIAS
+        return np.rint(100.0 / (1.0 + np.exp(-logits))).astype(np.int64)
+
+    async def score_claims(
+        self,
+        claims: Sequence[Claim],
+        files_by_claim: Optional[Mapping[uuid.UUID, Sequence[ClaimFile]]] = None,
+    ) -> List[int]:
+        """Heuristic strength scores for ``claims``, in order."""
+        if not claims:
+            return []
+        features = await self.extract_features(claims, files_by_claim)
+        return self.score_features(features).tolist()
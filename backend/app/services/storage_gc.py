@@ -0,0 +1,218 @@
+"""Garbage collection of stored objects that no claim file references.
+
+Deleting a claim cascades its ``claim_files`` rows but leaves their bytes,
+and an upload that fails between staging and commit can leave its staging
+object behind. The collector walks the storage prefixes one listing page at
+a time, checks each page against ``claim_files`` with a single query, and
+deletes orphans in batches, so memory stays flat however large the bucket.
+"""
+
+import asyncio
+import math
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.blob import Blob
+from app.models.claim import ClaimFile
+from app.services.derivatives import DERIVATIVE_SIZES, derivative_keys
+from app.services.disk_io import run_disk_io
+from app.services.s3_client import get_s3_client, run_s3
+
+
+# Legacy per-claim objects, content-addressed blobs, and uploads in flight
+GC_PREFIXES = ("claims/", "blobs/", "staging/")
+DELETE_BATCH = 1000  # S3 DeleteObjects accepts at most 1000 keys
+REPORT_SAMPLE = 20  # orphan keys listed in the report
+_SUFFIXES = tuple(f".{name}.jpg" for name in DERIVATIVE_SIZES) + (".tmp",)
+
+# (key, size in bytes, last modified as a unix timestamp)
+StoredObject = Tuple[str, int, float]
+
+
+@dataclass
+class GCReport:
+    dry_run: bool
+    scanned: int = 0
+    orphans: int = 0
+    deleted: int = 0
+    bytes_reclaimed: int = 0
+    sample: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def source_key(key: str) -> str:
+    """The original object a derivative or temp file belongs to."""
+    for suffix in _SUFFIXES:
+        if key.endswith(suffix):
+            return key[: -len(suffix)]
+    return key
+
+
+def _sha_of(blob_object_key: str) -> str:
+    return source_key(blob_object_key).replace(os.sep, "/").rsplit("/", 1)[-1]
+
+
+def _walk_local(root: str, page_size: int) -> Iterator[List[StoredObject]]:
+    page: List[StoredObject] = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            page.append((path, info.st_size, info.st_mtime))
+            if len(page) >= page_size:
+                yield page
+                page = []
+    if page:
+        yield page
+
+
+def _unlink_older_than(paths: List[str], cutoff: float) -> List[str]:
+    """Remove files not modified since ``cutoff``; returns the removed paths."""
+    removed = []
+    for path in paths:
+        try:
+            # A re-upload of the same content may have rewritten it meanwhile
+            if os.stat(path).st_mtime <= cutoff:
+                os.remove(path)
+                removed.append(path)
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+class StorageGarbageCollector:
+    """Find and delete objects under GC_PREFIXES that no claim file uses.
+
+    Objects younger than ``storage_gc_min_age`` are never touched, which
+    covers uploads whose row is not committed yet. With ``dry_run`` nothing
+    is deleted and the report shows what would be reclaimed.
+    """
+
+    def __init__(self, db: AsyncSession, s3_client: Optional[Any] = None, upload_dir: str = "uploads"):
+        self.db = db
+        self._use_s3 = s3_client is not None or bool(settings.aws_access_key_id and settings.aws_secret_access_key)
+        self._s3 = s3_client
+        self.upload_dir = upload_dir
+
+    def _client(self) -> Any:
+        if self._s3 is None:
+            self._s3 = get_s3_client()
+        return self._s3
+
+    def _blob_prefix(self) -> str:
+        return "blobs/" if self._use_s3 else os.path.join(self.upload_dir, "blobs") + os.sep
+
+    def _staging_prefix(self) -> str:
+        return "staging/" if self._use_s3 else os.path.join(self.upload_dir, "staging") + os.sep
+
+    async def _pages(self, prefix: str) -> AsyncIterator[List[StoredObject]]:
+        if not self._use_s3:
+            pages = _walk_local(os.path.join(self.upload_dir, *prefix.strip("/").split("/")), DELETE_BATCH)
+            while True:
+                page = await run_disk_io(next, pages, None)
+                if page is None:
+                    return
+                yield page
+        token = None
+        while True:
+            kwargs = {"Bucket": settings.s3_bucket_name, "Prefix": prefix, "MaxKeys": DELETE_BATCH}
+            if token:
+                kwargs["ContinuationToken"] = token
+            result = await run_s3(self._client().list_objects_v2, **kwargs)
+            yield [
+                (item["Key"], item["Size"], item["LastModified"].timestamp())
+                for item in result.get("Contents", [])
+            ]
+            if not result.get("IsTruncated"):
+                return
+            token = result["NextContinuationToken"]
+
+    async def _referenced(self, keys: Set[str]) -> Set[str]:
+        if not keys:
+            return set()
+        result = await self.db.execute(select(ClaimFile.s3_key).where(ClaimFile.s3_key.in_(keys)))
+        return set(result.scalars().all())
+
+    async def _drop_blob_rows(self, orphans: List[StoredObject]) -> Set[str]:
+        """Delete the blob rows of orphaned blobs; returns the keys safe to remove.
+
+        The DELETE re-checks claim_files, and a blob attached again since the
+        listing keeps both its row and its bytes.
+        """
+        blob_prefix = self._blob_prefix()
+        shas = {_sha_of(key) for key, _, _ in orphans if key.startswith(blob_prefix)}
+        if not shas:
+            return {key for key, _, _ in orphans}
+        await self.db.execute(
+            delete(Blob)
+            .where(Blob.sha256.in_(shas), ~exists().where(ClaimFile.sha256 == Blob.sha256))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        result = await self.db.execute(select(Blob.sha256).where(Blob.sha256.in_(shas)))
+        kept = set(result.scalars().all())
+        return {key for key, _, _ in orphans if not key.startswith(blob_prefix) or _sha_of(key) not in kept}
+
+    async def _delete(self, keys: List[str], cutoff: float) -> List[str]:
+        if not self._use_s3:
+            return await run_disk_io(_unlink_older_than, keys, cutoff)
+        result = await run_s3(
+            self._client().delete_objects,
+            Bucket=settings.s3_bucket_name,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        failed = {error["Key"] for error in result.get("Errors", [])}
+        return [key for key in keys if key not in failed]
+
+    async def delete_objects(self, keys: List[str]) -> int:
+        """Delete objects and their derivatives in DeleteObjects-sized batches.
+
+        Unlike ``collect`` this checks nothing; the caller knows the objects
+        are unreferenced. Returns the number of delete requests that succeeded.
+        """
+        keys = [k for key in keys for k in (key, *derivative_keys(key))]
+        removed = 0
+        for start in range(0, len(keys), DELETE_BATCH):
+            removed += len(await self._delete(keys[start:start + DELETE_BATCH], math.inf))
+        return removed
+
+    async def collect(self, dry_run: bool = False, prefixes: Tuple[str, ...] = GC_PREFIXES) -> GCReport:
+        report = GCReport(dry_run=dry_run)
+        cutoff = time.time() - settings.storage_gc_min_age
+        staging = self._staging_prefix()
+        for prefix in prefixes:
+            async for page in self._pages(prefix):
+                report.scanned += len(page)
+                old = [obj for obj in page if obj[2] <= cutoff]
+                # Staging objects are never referenced; anything old there is a failed upload
+                referenced = await self._referenced({source_key(key) for key, _, _ in old if not key.startswith(staging)})
+                orphans = [obj for obj in old if source_key(obj[0]) not in referenced]
+                if not orphans:
+                    continue
+                report.orphans += len(orphans)
+                report.sample.extend(key for key, _, _ in orphans[: REPORT_SAMPLE - len(report.sample)])
+                if dry_run:
+                    report.bytes_reclaimed += sum(size for _, size, _ in orphans)
+                    continue
+                started = time.monotonic()
+                removable = await self._drop_blob_rows(orphans)
+                sizes = {key: size for key, size, _ in orphans if key in removable}
+                deleted = await self._delete(list(sizes), cutoff) if sizes else []
+                report.deleted += len(deleted)
+                report.bytes_reclaimed += sum(sizes[key] for key in deleted)
+                # Stay under the configured delete rate so production traffic keeps its share
+                pause = len(orphans) / settings.storage_gc_delete_rate - (time.monotonic() - started)
+                if pause > 0:
+                    await asyncio.sleep(pause)
+        return report
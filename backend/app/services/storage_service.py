@@ -1,24 +1,165 @@
 from __future__ import annotations
 
-from typing import Optional
+import hashlib
+import hmac
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Optional
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
 
 from app.config import Settings
-from app.domain.dto.requests import CreateFileRequest
-from app.domain.dto.responses import CreateFileResponse, FileResponse
-from app.domain.models.core import File
+from app.domain.dto.requests import CreateFileRequest, CreateUploadSessionRequest
+from app.domain.dto.responses import CreateFileResponse, FileResponse, UploadSessionResponse
+from app.domain.models.core import File, UploadSession
+from app.repositories.claims_repo import ClaimsRepo
 from app.repositories.files_repo import FilesRepo
 from app.repositories.jobs_repo import JobsRepo
+from app.services.derivatives import enqueue_derivatives
+from app.services.disk_io import run_disk_io
+from app.services.ocr_service import OCR_CONTENT_TYPES, OCRService
+from app.services.photo_metadata import (
+    EXIF_CONTENT_TYPES,
+    EXIF_HEAD_BYTES,
+    merge_photo_metadata,
+    read_photo_metadata,
+)
+from app.services.policy_extraction import PolicyExtractor
+from app.services.s3_client import get_s3_client, run_s3
+from app.services.virus_scan_service import ScannerError, VirusScanService
 from app.utils.ids import new_id
 
 
+# Content types clients may upload directly; mirrors settings.allowed_extensions.
+ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "application/pdf"}
+
+
+def _open_new(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, "wb")
+
+
+def _open_at(path: str, offset: int):
+    """Open a partial upload for appending at ``offset``, dropping any torn tail."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle = open(path, "ab")
+    handle.truncate(offset)
+    return handle
+
+
+def _remove_if_exists(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _move_into_place(src: str, dst: str) -> None:
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(src, dst)
+
+
+def _read_head(path: str, size: int) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read(size)
+
+
+def _drop_head(path: str, size: int) -> None:
+    """Cut the first ``size`` bytes off a partial upload once they are stored elsewhere."""
+    with open(path, "rb") as handle:
+        handle.seek(size)
+        rest = handle.read()
+    with open(path + ".tmp", "wb") as handle:
+        handle.write(rest)
+    os.replace(path + ".tmp", path)
+
+
+def _temp_path() -> str:
+    fd, path = tempfile.mkstemp(prefix="file-")
+    os.close(fd)
+    return path
+
+
+def _staging_key(key: str) -> str:
+    # Direct S3 uploads land here; the storage collector removes leftovers
+    return f"staging/{key}"
+
+
+def _size_if_exists(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+
 class StorageService:
-    def __init__(self, settings: Settings, files_repo: FilesRepo, jobs_repo: JobsRepo) -> None:
+    """Upload slots for direct-to-storage uploads.
+
+    With AWS credentials configured, clients get a presigned S3 POST whose
+    policy pins a staging key, content type and size range, so upload bytes
+    never pass through the API; completing copies the object to its final
+    key, out of reach of the still-valid POST. Otherwise uploads go to a local endpoint guarded by
+    an HMAC-signed URL with the same constraints. Large files can instead
+    use a resumable upload session.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        files_repo: FilesRepo,
+        jobs_repo: JobsRepo,
+        s3_client: Optional[Any] = None,
+        scanner: Optional[VirusScanService] = None,
+        ocr: Optional[OCRService] = None,
+        claims_repo: Optional[ClaimsRepo] = None,
+    ) -> None:
         self._settings = settings
         self._files = files_repo
         self._jobs = jobs_repo
+        self._scanner = scanner or VirusScanService()
+        self._ocr = ocr or OCRService()
+        self._claims = claims_repo or ClaimsRepo()
+        self._use_s3 = s3_client is not None or bool(settings.aws_access_key_id and settings.aws_secret_access_key)
+        self._s3 = s3_client
+        self._upload_dir = "uploads"
+
+    def _s3_client(self) -> Any:
+        if self._s3 is None:
+            self._s3 = get_s3_client()
+        return self._s3
+
+    def _local_path(self, key: str) -> str:
+        return os.path.join(self._upload_dir, *key.split("/"))
+
+    def _max_bytes(self, declared: Optional[int]) -> int:
+        # A declared size becomes the hard limit for the upload
+        return min(declared, self._settings.max_file_size) if declared else self._settings.max_file_size
+
+    def _sign(self, file_id: str, content_type: str, max_bytes: int, expires: int) -> str:
+        message = f"{file_id}:{content_type}:{max_bytes}:{expires}".encode()
+        return hmac.new(self._settings.secret_key.encode(), message, hashlib.sha256).hexdigest()
+
+    def _check_upload(self, content_type: str, size: Optional[int]) -> None:
+        if content_type not in ALLOWED_CONTENT_TYPES:
+            raise HTTPException(status_code=415, detail=f"Content type not allowed: {content_type}")
+        if size is not None and size > self._settings.max_file_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds maximum allowed size of {self._settings.max_file_size} bytes",
+            )
 
     async def create_upload_slot(self, user_id: str, payload: CreateFileRequest, idempotency_key: Optional[str]) -> CreateFileResponse:
+        self._check_upload(payload.content_type, payload.bytes)
+
         file_id = new_id("file")
+        key = f"uploads/{user_id}/{file_id}"
+        max_bytes = self._max_bytes(payload.bytes)
+        expires_in = self._settings.presigned_upload_expires
         rec = File(
             id=file_id,
             user_id=user_id,
@@ -27,30 +168,418 @@ class StorageService:
             filename=payload.filename,
             size=payload.bytes,
             status="pending",
+            storage_key=key,
         )
         await self._files.create(rec)
-        # Fake presigned URL for demo
-        upload_url = f"https://storage.fake/{self._settings.supabase_storage_bucket}/{file_id}"
-        return CreateFileResponse(file_id=file_id, upload_url=upload_url, headers={"x-up": "1"})
+
+        if self._use_s3:
+            # Signed locally by botocore; no network round trip
+            post = self._s3_client().generate_presigned_post(
+                Bucket=self._settings.s3_bucket_name,
+                Key=_staging_key(key),
+                Fields={"Content-Type": payload.content_type},
+                Conditions=[
+                    {"Content-Type": payload.content_type},
+                    ["content-length-range", 1, max_bytes],
+                ],
+                ExpiresIn=expires_in,
+            )
+            return CreateFileResponse(
+                file_id=file_id,
+                upload_url=post["url"],
+                method="POST",
+                fields=post["fields"],
+                expires_in=expires_in,
+            )
+
+        expires = int(time.time()) + expires_in
+        signature = self._sign(file_id, payload.content_type, max_bytes, expires)
+        upload_url = (
+            f"{self._settings.public_base_url}/v1/files/{file_id}/content"
+            f"?max_bytes={max_bytes}&expires={expires}&signature={signature}"
+        )
+        return CreateFileResponse(
+            file_id=file_id,
+            upload_url=upload_url,
+            method="PUT",
+            headers={"Content-Type": payload.content_type},
+            expires_in=expires_in,
+        )
+
+    async def receive_local_upload(
+        self,
+        file_id: str,
+        content_type: Optional[str],
+        max_bytes: int,
+        expires: int,
+        signature: str,
+        body: AsyncIterator[bytes],
+    ) -> None:
+        """Store a body PUT to a locally signed upload URL (filesystem backend)."""
+        f = await self._files.find(file_id)
+        if not f or self._use_s3:
+            raise HTTPException(status_code=404, detail="file_not_found")
+        expected = self._sign(file_id, f.content_type, max_bytes, expires)
+        if not hmac.compare_digest(expected, signature) or expires < time.time():
+            raise HTTPException(status_code=403, detail="Invalid or expired upload URL")
+        if f.status != "pending":
+            # The URL outlives completion; never replace bytes that are being or were scanned
+            raise HTTPException(status_code=409, detail="Upload already completed")
+        if content_type != f.content_type:
+            raise HTTPException(status_code=415, detail="Content-Type does not match the upload slot")
+
+        path = self._local_path(f.storage_key)
+        size = 0
+        digest = hashlib.sha256()
+        handle = await run_disk_io(_open_new, path)
+        try:
+            async for chunk in body:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                await run_disk_io(handle.write, chunk)
+        except BaseException:
+            await run_disk_io(handle.close)
+            await run_disk_io(_remove_if_exists, path)
+            raise
+        await run_disk_io(handle.close)
+        # Lets the scanner consult its verdict cache without rereading the file
+        await self._files.update(file_id, sha256=digest.hexdigest())
+
+    # Resumable uploads: create a session, PATCH chunks at offsets, query the
+    # offset after a dropped connection, then complete. Chunks are appended to
+    # a partial file on disk, so a retry resends at most one chunk instead of
+    # the whole file. With S3 the partial file only holds the tail: every full
+    # part is sent as a multipart part and cut off, since parts must be >= 5MB
+    # but chunks that size would make most uploads a single chunk.
+
+    def _chunk_size(self) -> int:
+        # Advisory; chunks of any size are accepted
+        return min(self._settings.upload_chunk_size, self._settings.s3_multipart_part_size)
+
+    def _partial_path(self, session_id: str) -> str:
+        return os.path.join(self._upload_dir, "partial", session_id)
+
+    def _session_response(self, session: UploadSession) -> UploadSessionResponse:
+        return UploadSessionResponse(
+            session_id=session.id,
+            file_id=session.file_id,
+            offset=session.offset,
+            size=session.size,
+            chunk_size=self._chunk_size(),
+            expires_at=session.expires_at,
+        )
+
+    async def _live_session(self, user_id: str, session_id: str) -> UploadSession:
+        session = await self._files.get_session(user_id, session_id)
+        if session.expires_at <= datetime.utcnow():
+            raise HTTPException(status_code=410, detail="Upload session expired")
+        return session
+
+    async def create_upload_session(self, user_id: str, payload: CreateUploadSessionRequest) -> UploadSessionResponse:
+        self._check_upload(payload.content_type, payload.bytes)
+        file_id = new_id("file")
+        key = f"uploads/{user_id}/{file_id}"
+        await self._files.create(
+            File(
+                id=file_id,
+                user_id=user_id,
+                purpose=payload.purpose,
+                content_type=payload.content_type,
+                filename=payload.filename,
+                size=payload.bytes,
+                status="pending",
+                storage_key=key,
+            )
+        )
+        session = UploadSession(
+            id=new_id("upl"),
+            user_id=user_id,
+            file_id=file_id,
+            size=payload.bytes,
+            expires_at=datetime.utcnow() + timedelta(seconds=self._settings.upload_session_ttl),
+        )
+        if self._use_s3:
+            created = await run_s3(
+                self._s3_client().create_multipart_upload,
+                Bucket=self._settings.s3_bucket_name,
+                Key=key,
+                ContentType=payload.content_type,
+            )
+            session.s3_upload_id = created["UploadId"]
+        await self._files.create_session(session)
+        return self._session_response(session)
+
+    async def get_upload_session(self, user_id: str, session_id: str) -> UploadSessionResponse:
+        return self._session_response(await self._live_session(user_id, session_id))
+
+    async def _append_partial(self, session: UploadSession, body: AsyncIterator[bytes]) -> None:
+        handle = await run_disk_io(_open_at, self._partial_path(session.id), session.offset - session.uploaded)
+        try:
+            async for chunk in body:
+                if session.offset + len(chunk) > session.size:
+                    raise HTTPException(status_code=413, detail="Chunk runs past the declared size")
+                await run_disk_io(handle.write, chunk)
+                # Bytes written before a disconnect still count on resume
+                session.offset += len(chunk)
+        finally:
+            await run_disk_io(handle.close)
+
+    async def _upload_parts(self, session: UploadSession, final: bool = False) -> None:
+        """Send buffered bytes to S3 in full parts; with ``final`` the short tail too."""
+        part_size = self._settings.s3_multipart_part_size
+        path = self._partial_path(session.id)
+        key = (await self._files.find(session.file_id)).storage_key
+        while session.offset - session.uploaded >= part_size or (final and session.offset > session.uploaded):
+            part = await run_disk_io(_read_head, path, part_size)
+            part_number = len(session.parts) + 1
+            result = await run_s3(
+                self._s3_client().upload_part,
+                Bucket=self._settings.s3_bucket_name,
+                Key=key,
+                UploadId=session.s3_upload_id,
+                PartNumber=part_number,
+                Body=part,
+            )
+            session.parts.append({"ETag": result["ETag"], "PartNumber": part_number})
+            session.uploaded += len(part)
+            await run_disk_io(_drop_head, path, len(part))
+
+    async def append_upload_chunk(
+        self, user_id: str, session_id: str, offset: int, body: AsyncIterator[bytes]
+    ) -> UploadSessionResponse:
+        session = await self._live_session(user_id, session_id)
+        if session.busy or offset != session.offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload is at offset {session.offset}",
+                headers={"Upload-Offset": str(session.offset)},
+            )
+        session.busy = True
+        try:
+            await self._append_partial(session, body)
+            if self._use_s3:
+                # A failed part stays buffered and is retried by the next chunk or completion
+                await self._upload_parts(session)
+        finally:
+            session.busy = False
+            session.expires_at = datetime.utcnow() + timedelta(seconds=self._settings.upload_session_ttl)
+        return self._session_response(session)
+
+    async def complete_upload_session(self, user_id: str, session_id: str) -> FileResponse:
+        session = await self._live_session(user_id, session_id)
+        if session.busy or session.offset != session.size:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload is at offset {session.offset} of {session.size}",
+                headers={"Upload-Offset": str(session.offset)},
+            )
+        f = await self._files.get(user_id, session.file_id)
+        if self._use_s3:
+            await self._upload_parts(session, final=True)
+            await run_disk_io(_remove_if_exists, self._partial_path(session.id))
+            await run_s3(
+                self._s3_client().complete_multipart_upload,
+                Bucket=self._settings.s3_bucket_name,
+                Key=f.storage_key,
+                UploadId=session.s3_upload_id,
+                MultipartUpload={"Parts": session.parts},
+            )
+        else:
+            await run_disk_io(_move_into_place, self._partial_path(session.id), self._local_path(f.storage_key))
+        await self._files.delete_session(session.id)
+        return await self._complete(f, f.storage_key)
+
+    async def expire_upload_sessions(self, now: Optional[datetime] = None) -> int:
+        """Drop idle sessions and their partial data; returns how many."""
+        expired = await self._files.expired_sessions(now or datetime.utcnow())
+        for session in expired:
+            if session.s3_upload_id:
+                f = await self._files.find(session.file_id)
+                try:
+                    await run_s3(
+                        self._s3_client().abort_multipart_upload,
+                        Bucket=self._settings.s3_bucket_name,
+                        Key=f.storage_key,
+                        UploadId=session.s3_upload_id,
+                    )
+                except ClientError:
+                    pass  # already aborted or completed; S3 lifecycle rules clean up the rest
+            await run_disk_io(_remove_if_exists, self._partial_path(session.id))
+            await self._files.update(session.file_id, status="failed")
+            await self._files.delete_session(session.id)
+        return len(expired)
+
+    async def _stored_size(self, f: File, key: str) -> Optional[int]:
+        """Size of the uploaded object at ``key``, or None if nothing was uploaded."""
+        if not self._use_s3:
+            return await run_disk_io(_size_if_exists, self._local_path(key))
+        try:
+            head = await run_s3(self._s3_client().head_object, Bucket=self._settings.s3_bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        if head.get("ContentType") != f.content_type:
+            return None
+        return head["ContentLength"]
 
     async def mark_complete_and_queue_scan(self, user_id: str, file_id: str) -> FileResponse:
         f = await self._files.get(user_id, file_id)
-        await self._files.update(file_id, status="scanning", virus_scan="unknown")
-        # Enqueue a job that a worker would process; for MVP we will instantly mark clean
+        return await self._complete(f, _staging_key(f.storage_key) if self._use_s3 else f.storage_key)
+
+    async def _complete(self, f: File, uploaded_key: str) -> FileResponse:
+        user_id, file_id = f.user_id, f.id
+        if f.status != "pending":
+            raise HTTPException(status_code=409, detail="Upload already completed")
+        # Trust the store, not the client: the object must exist and fit the slot
+        size = await self._stored_size(f, uploaded_key)
+        if size is None:
+            raise HTTPException(status_code=409, detail="Upload not found in storage")
+        if size > self._max_bytes(f.size):
+            await self._files.update(file_id, status="failed")
+            raise HTTPException(status_code=413, detail="Uploaded object exceeds the declared size")
+        if uploaded_key != f.storage_key:
+            # Server-side copy; a later POST to the staging key never reaches the scanned object
+            bucket = self._settings.s3_bucket_name
+            await run_s3(
+                self._s3_client().copy_object,
+                Bucket=bucket,
+                Key=f.storage_key,
+                CopySource={"Bucket": bucket, "Key": uploaded_key},
+            )
+            await run_s3(self._s3_client().delete_object, Bucket=bucket, Key=uploaded_key)
+        await self._files.update(file_id, size=size, status="scanning", virus_scan="unknown")
         await self._jobs.enqueue(user_id, "file_scan", {"file_id": file_id})
-        # Simulate scan done
-        await self._files.update(file_id, status="ready", virus_scan="clean")
-        f = await self._files.get(user_id, file_id)
-        return FileResponse(
-            id=f.id,
-            purpose=f.purpose,
-            content_type=f.content_type,
-            filename=f.filename,
-            size=f.size,
-            status=f.status,
-            virus_scan=f.virus_scan,
-            ocr_text=f.ocr_text,
+        return await self.get_file(user_id, file_id)
+
+    async def _read_object(self, f: File) -> AsyncIterator[bytes]:
+        chunk_size = self._settings.upload_chunk_size
+        if not self._use_s3:
+            handle = await run_disk_io(open, self._local_path(f.storage_key), "rb")
+            try:
+                while True:
+                    chunk = await run_disk_io(handle.read, chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                await run_disk_io(handle.close)
+            return
+        obj = await run_s3(self._s3_client().get_object, Bucket=self._settings.s3_bucket_name, Key=f.storage_key)
+        try:
+            while True:
+                chunk = await run_s3(obj["Body"].read, amt=chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            obj["Body"].close()
+
+    async def scan_file(self, file_id: str, final_attempt: bool = True) -> Optional[File]:
+        """Worker stage for ``file_scan`` jobs: scan an uploaded file and publish the verdict.
+
+        Content seen before under the current signatures is not streamed to
+        the scanner again. Derivatives and the EXIF, OCR and policy stages
+        are only queued for clean files. A ScannerError leaves the file
+        "scanning" for a retry unless this is the ``final_attempt``.
+        """
+        f = await self._files.find(file_id)
+        if f is None or f.status != "scanning":
+            return f
+        if f.sha256 is None:
+            # Direct S3 and resumable uploads arrive without a hash; hashing
+            # is far cheaper than a scan and makes re-uploads cache hits.
+            digest = hashlib.sha256()
+            async for chunk in self._read_object(f):
+                digest.update(chunk)
+            f = await self._files.update(file_id, sha256=digest.hexdigest())
+        try:
+            verdict = await self._scanner.scan_stream(f.sha256, self._read_object(f))
+        except ScannerError:
+            if final_attempt:
+                await self._files.update(file_id, status="failed")
+            raise
+        if verdict.status != "clean":
+            return await self._files.update(file_id, status="failed", virus_scan=verdict.status)
+        f = await self._files.update(file_id, status="ready", virus_scan="clean")
+        enqueue_derivatives(f.storage_key if self._use_s3 else self._local_path(f.storage_key), f.content_type)
+        if f.purpose == "policy_pdf" and f.content_type == "application/pdf":
+            # The text layer has what we need; OCR only runs for scanned pages
+            await self._jobs.enqueue(f.user_id, "policy_extract", {"file_id": file_id})
+        elif f.content_type in OCR_CONTENT_TYPES:
+            await self._jobs.enqueue(f.user_id, "file_ocr", {"file_id": file_id})
+        if f.content_type in EXIF_CONTENT_TYPES:
+            await self._jobs.enqueue(f.user_id, "file_exif", {"file_id": file_id})
+        return f
+
+    @asynccontextmanager
+    async def _local_file(self, f: File) -> AsyncIterator[str]:
+        """A local path to the file's bytes; S3 objects go to a temp file."""
+        if not self._use_s3:
+            yield self._local_path(f.storage_key)
+            return
+        path = await run_disk_io(_temp_path)
+        try:
+            handle = await run_disk_io(open, path, "wb")
+            try:
+                async for chunk in self._read_object(f):
+                    await run_disk_io(handle.write, chunk)
+            finally:
+                await run_disk_io(handle.close)
+            yield path
+        finally:
+            await run_disk_io(_remove_if_exists, path)
+
+    async def ocr_file(self, file_id: str) -> Optional[File]:
+        """Worker stage for ``file_ocr`` jobs: store the file's text in ``ocr_text``."""
+        f = await self._files.find(file_id)
+        if f is None or f.status != "ready" or f.content_type not in OCR_CONTENT_TYPES:
+            return f
+        text = self._ocr.cached_text(f.sha256) if f.sha256 else None
+        if text is None:
+            async with self._local_file(f) as path:
+                text = await self._ocr.extract_text(path, f.content_type, f.sha256)
+        return await self._files.update(file_id, ocr_text=text)
+
+    async def extract_policy(self, file_id: str) -> Optional[File]:
+        """Worker stage for ``policy_extract`` jobs: store policy number, limits and deductibles."""
+        f = await self._files.find(file_id)
+        if f is None or f.status != "ready" or f.content_type != "application/pdf":
+            return f
+        async with self._local_file(f) as path:
+            policy = await PolicyExtractor(self._ocr).extract(path, f.sha256)
+        return await self._files.update(file_id, policy=policy)
+
+    async def _head(self, f: File, size: int) -> bytes:
+        if not self._use_s3:
+            return await run_disk_io(_read_head, self._local_path(f.storage_key), size)
+        obj = await run_s3(
+            self._s3_client().get_object,
+            Bucket=self._settings.s3_bucket_name,
+            Key=f.storage_key,
+            Range=f"bytes=0-{size - 1}",
         )
+        try:
+            return await run_s3(obj["Body"].read)
+        finally:
+            obj["Body"].close()
+
+    async def extract_photo_metadata(self, file_id: str) -> Optional[File]:
+        """Worker stage for ``file_exif`` jobs: read EXIF from the header bytes only.
+
+        The result is stored on the file and merged into the incident
+        metadata of every claim that already attaches it.
+        """
+        f = await self._files.find(file_id)
+        if f is None or f.status != "ready" or f.content_type not in EXIF_CONTENT_TYPES:
+            return f
+        metadata = await run_disk_io(read_photo_metadata, await self._head(f, EXIF_HEAD_BYTES))
+        f = await self._files.update(file_id, photo_metadata=metadata)
+        for claim in await self._claims.with_attachment(f.user_id, file_id):
+            merge_photo_metadata(claim, file_id, metadata)
+        return f
 
     async def get_file(self, user_id: str, file_id: str) -> FileResponse:
         f = await self._files.get(user_id, file_id)
@@ -63,5 +592,5 @@ class StorageService:
             status=f.status,
             virus_scan=f.virus_scan,
             ocr_text=f.ocr_text,
+            policy=asdict(f.policy) if f.policy else None,
         )
-
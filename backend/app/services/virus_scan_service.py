@@ -1,8 +1,227 @@
+"""Virus scanning against a clamd-compatible daemon.
+
+File bytes are streamed with INSTREAM over pooled IDSESSION connections, so
+a scan pays no connection setup and clamd never needs access to our storage.
+Verdicts are cached by content hash and signature-database version: the same
+bytes are scanned again only after clamd loads new signatures.
+"""
+
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import struct
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.disk_io import run_disk_io
+from app.services.metrics import LatencyStats
+
+
+MAX_FRAME = 64 * 1024  # bytes per INSTREAM frame; well under clamd's StreamMaxLength
+VERSION_CHECK_INTERVAL = 60.0  # seconds the signature-DB version is trusted
+IDLE_REUSE_LIMIT = 20.0  # seconds; clamd drops idle sessions after IdleTimeout (30s default)
+
+
+class ScannerError(Exception):
+    """clamd was unreachable, timed out or answered with an error."""
+
+
+@dataclass
+class ScanVerdict:
+    status: str  # clean|infected
+    signature: Optional[str] = None
+    cached: bool = False
+
+
+class _Session:
+    """One clamd connection in IDSESSION mode; replies come back in order."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.used_at = time.monotonic()
+
+    async def command(self, name: str, chunks: Optional[AsyncIterator[bytes]] = None) -> str:
+        self.writer.write(b"z" + name.encode() + b"\0")
+        if chunks is not None:
+            async for chunk in chunks:
+                for start in range(0, len(chunk), MAX_FRAME):
+                    frame = chunk[start:start + MAX_FRAME]
+                    self.writer.write(struct.pack("!L", len(frame)) + frame)
+                    await self.writer.drain()
+            self.writer.write(struct.pack("!L", 0))
+        await self.writer.drain()
+        reply = await self.reader.readuntil(b"\0")
+        self.used_at = time.monotonic()
+        # Session replies carry the request number: "3: stream: OK"
+        return reply[:-1].decode(errors="replace").split(": ", 1)[-1]
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ClamdPool:
+    """A bounded pool of clamd sessions for one event loop."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.loop = asyncio.get_running_loop()
+        self.idle: List[_Session] = []
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> _Session:
+        if settings.clamd_socket:
+            reader, writer = await asyncio.open_unix_connection(settings.clamd_socket)
+        else:
+            reader, writer = await asyncio.open_connection(settings.clamd_host, settings.clamd_port)
+        writer.write(b"zIDSESSION\0")
+        await writer.drain()
+        return _Session(reader, writer)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[_Session]:
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        conn = None
+        try:
+            while self.idle and conn is None:
+                candidate = self.idle.pop()
+                if time.monotonic() - candidate.used_at < IDLE_REUSE_LIMIT:
+                    conn = candidate
+                else:
+                    candidate.close()
+            if conn is None:
+                conn = await self._connect()
+            yield conn
+        except BaseException:
+            # The session may be mid-reply; never hand it out again
+            if conn is not None:
+                conn.close()
+            raise
+        else:
+            self.idle.append(conn)
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+
+_POOL: Optional[ClamdPool] = None
+_VERDICTS: "OrderedDict[Tuple[str, str], ScanVerdict]" = OrderedDict()
+_VERSION: Tuple[float, str] = (0.0, "")
+_STATS = {"hits": 0, "misses": 0}
+_LATENCY = LatencyStats()
+
+
+def _get_pool() -> ClamdPool:
+    global _POOL
+    # Streams and semaphores belong to the loop that created them
+    if _POOL is None or _POOL.loop is not asyncio.get_running_loop():
+        _POOL = ClamdPool(settings.clamd_pool_size)
+    return _POOL
+
+
+def _remember(key: Tuple[str, str], verdict: ScanVerdict) -> None:
+    _VERDICTS[key] = verdict
+    _VERDICTS.move_to_end(key)
+    while len(_VERDICTS) > settings.scan_verdict_cache_size:
+        _VERDICTS.popitem(last=False)
+
+
+async def _read_file(path: str, chunk_size: int) -> AsyncIterator[bytes]:
+    handle = await run_disk_io(open, path, "rb")
+    try:
+        while True:
+            chunk = await run_disk_io(handle.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await run_disk_io(handle.close)
+
 
 class VirusScanService:
+    async def _run(self, name: str, chunks: Optional[AsyncIterator[bytes]] = None) -> str:
+        try:
+            async with _get_pool().session() as conn:
+                reply = await asyncio.wait_for(conn.command(name, chunks), settings.clamd_timeout)
+                if reply.endswith("ERROR"):
+                    # e.g. "INSTREAM size limit exceeded"; clamd ends the session
+                    raise ScannerError(f"clamd {name}: {reply}")
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            raise ScannerError(f"clamd {name} failed: {e!r}") from e
+        return reply
+
+    async def db_version(self) -> str:
+        """Signature-database version, e.g. "27100" from "ClamAV 1.2.1/27100/<date>"."""
+        global _VERSION
+        checked_at, version = _VERSION
+        if not version or time.monotonic() - checked_at > VERSION_CHECK_INTERVAL:
+            reply = await self._run("VERSION")
+            parts = reply.split("/")
+            version = parts[1] if len(parts) > 1 else parts[0]
+            _VERSION = (time.monotonic(), version)
+        return version
+
+    async def scan_stream(self, sha256: str, chunks: AsyncIterator[bytes]) -> ScanVerdict:
+        """Scan content with hash ``sha256``; ``chunks`` is only read on a cache miss."""
+        key = (sha256, await self.db_version())
+        cached = _VERDICTS.get(key)
+        if cached is not None:
+            _STATS["hits"] += 1
+            _VERDICTS.move_to_end(key)
+            return replace(cached, cached=True)
+        _STATS["misses"] += 1
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            reply = await self._run("INSTREAM", chunks)
+            failed = False
+        finally:
+            _LATENCY.observe((time.perf_counter() - started) * 1000, failed)
+
+        # "stream: OK" or "stream: Eicar-Signature FOUND"
+        result = reply.split(": ", 1)[-1]
+        if result == "OK":
+            verdict = ScanVerdict(status="clean")
+        elif result.endswith(" FOUND"):
+            verdict = ScanVerdict(status="infected", signature=result[: -len(" FOUND")])
+        else:
+            raise ScannerError(f"Unexpected clamd reply: {reply}")
+        _remember(key, verdict)
+        return verdict
+
     async def scan(self, file_path: str) -> str:
-        # Stub always clean
-        return "clean"
+        """Scan a local file; returns "clean" or "infected"."""
+        digest = hashlib.sha256()
+        async for chunk in _read_file(file_path, settings.upload_chunk_size):
+            digest.update(chunk)
+        verdict = await self.scan_stream(digest.hexdigest(), _read_file(file_path, settings.upload_chunk_size))
+        return verdict.status
+
 
+def scan_metrics() -> Dict[str, Dict[str, float]]:
+    """Scan latency, verdict-cache and connection-pool counters for this process."""
+    pool = _POOL
+    return {
+        "latency": _LATENCY.snapshot(),
+        "cache": {"hits": _STATS["hits"], "misses": _STATS["misses"], "size": len(_VERDICTS)},
+        "pool": {
+            "size": settings.clamd_pool_size,
+            "active": pool.active if pool else 0,
+            "idle": len(pool.idle) if pool else 0,
+            # Scans waiting for a free connection
+            "waiting": pool.waiting if pool else 0,
+        },
+    }
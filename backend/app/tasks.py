@@ -1,14 +1,20 @@
 """Celery background tasks."""
 
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 from app.celery_app import celery_app
+from app.config import settings
 from app.database import AsyncSessionLocal
-from app.models.claim import Claim, ClaimProcessingJob, ProcessingStatus, ClaimStatus
-from app.services.ai_service import AIService
+from app.models.claim import Claim, ClaimFile, ClaimProcessingJob, ProcessingStatus, ClaimStatus
+from app.services.ai_service import AIService, summary_fingerprint
+from app.services.claim_service import ClaimService
+from app.services.derivatives import DerivativeService
+from app.services.scoring_service import apply_ai_score
+from app.services.storage_gc import StorageGarbageCollector
 
 
 @celery_app.task(bind=True)
@@ -24,7 +30,7 @@ def process_claim_ai(self, claim_id: str, job_id: str):
                 result = await db.execute(
                     select(Claim)
                     .options(selectinload(Claim.files))
-                    .where(Claim.id == claim_uuid)
+                    .where(Claim.id == claim_uuid, Claim.deleted_at.is_(None))
                 )
                 claim = result.scalar_one_or_none()
                 
@@ -51,7 +57,7 @@ def process_claim_ai(self, claim_id: str, job_id: str):
                 claim.damage_assessment = ai_result.get("damage_assessment")
                 claim.claim_justification = ai_result.get("claim_justification")
                 claim.requested_amount = ai_result.get("requested_amount")
-                claim.strength_score = ai_result.get("strength_score")
+                apply_ai_score(claim, ai_result.get("strength_score"))
                 claim.status = ClaimStatus.COMPLETED
                 claim.updated_at = datetime.utcnow()
                 
@@ -99,3 +105,113 @@ def process_claim_ai(self, claim_id: str, job_id: str):
     # Run the async function
     import asyncio
     return asyncio.run(_process())
+
+
+@celery_app.task(bind=True)
+def summarize_claims(self, claim_ids: List[str]):
+    """Build list-view summaries for claims whose summary inputs changed."""
+    claim_uuids = [uuid.UUID(claim_id) for claim_id in claim_ids]
+    
+    async def _summarize():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Claim).where(Claim.id.in_(claim_uuids)))
+            stale = [
+                claim for claim in result.scalars().all()
+                if claim.summary_fingerprint != summary_fingerprint(claim)
+            ]
+            
+            ai_service = AIService()
+            updated = 0
+            # Persist chunk by chunk so progress survives a failure mid-batch
+            chunk_size = settings.ai_summary_batch_size
+            for start in range(0, len(stale), chunk_size):
+                chunk = stale[start:start + chunk_size]
+                summaries = await ai_service.summarize_claims(chunk, fallback=False)
+                for claim in chunk:
+                    summary = summaries.get(str(claim.id))
+                    if summary is None:
+                        # Show the fallback meanwhile, but leave the fingerprint stale so a later list view retries
+                        claim.summary = claim.summary or ai_service.fallback_summary(claim)
+                        continue
+                    claim.summary = summary
+                    claim.summary_fingerprint = summary_fingerprint(claim)
+                    updated += 1
+                await db.commit()
+            
+            return {"status": "completed", "summarized": updated}
+    
+    import asyncio
+    return asyncio.run(_summarize())
+
+
+@celery_app.task(bind=True, ignore_result=True)
+def generate_derivatives(self, source_key: str, content_type: str, sha256: Optional[str] = None):
+    """Render thumbnail and preview images and the perceptual hash for a stored upload.
+    
+    Idempotent: existing derivatives are kept, so re-running for the same
+    content only costs a few existence checks.
+    """
+    async def _generate():
+        service = DerivativeService()
+        urls = await service.ensure(source_key, content_type)
+        if urls and sha256:
+            phash = await service.phash(source_key)
+            async with AsyncSessionLocal() as db:
+                # Every file sharing this blob gets the same derivatives
+                await db.execute(
+                    update(ClaimFile)
+                    .where(ClaimFile.sha256 == sha256, ClaimFile.s3_key == source_key)
+                    .values(thumbnail_url=urls["thumb"], preview_url=urls["medium"], phash=phash, phash_at=datetime.utcnow())
+                )
+                await db.commit()
+        return {"status": "completed", "derivatives": urls}
+    
+    import asyncio
+    return asyncio.run(_generate())
+
+
+@celery_app.task(bind=True)
+def collect_storage_garbage(self, dry_run: bool = False):
+    """Delete stored objects that no claim file references.
+    
+    Runs on the beat schedule; trigger it by hand with ``dry_run=True`` to
+    see what would be reclaimed.
+    """
+    async def _collect():
+        async with AsyncSessionLocal() as db:
+            report = await StorageGarbageCollector(db).collect(dry_run=dry_run)
+        return {"status": "completed", **report.as_dict()}
+    
+    import asyncio
+    return asyncio.run(_collect())
+
+
+@celery_app.task(bind=True)
+def purge_claim(self, claim_id: str):
+    """Remove a soft-deleted claim's rows and stored files."""
+    async def _purge():
+        async with AsyncSessionLocal() as db:
+            result = await ClaimService(db).purge_claim(uuid.UUID(claim_id))
+        return {"status": "completed", **result}
+    
+    import asyncio
+    return asyncio.run(_purge())
+
+
+@celery_app.task(bind=True)
+def purge_deleted_claims(self):
+    """Purge soft-deleted claims whose purge_claim task never ran (e.g. broker outage)."""
+    async def _sweep():
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.claim_purge_sweep_interval)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Claim.id).where(Claim.deleted_at.is_not(None), Claim.deleted_at < cutoff)
+            )
+            claim_ids = result.scalars().all()
+            service = ClaimService(db)
+            for claim_id in claim_ids:
+                await service.purge_claim(claim_id)
+        return {"status": "completed", "purged": len(claim_ids)}
+    
+    import asyncio
+    return asyncio.run(_sweep())
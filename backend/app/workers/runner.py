@@ -1,32 +1,291 @@
 from __future__ import annotations
 
 import asyncio
+import signal
+import time
+from functools import partial
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 
-from app.repositories.jobs_repo import JobsRepo
+from app.config import settings
+from app.domain.models.core import Job
+from app.repositories.claims_repo import ClaimsRepo
+from app.repositories.files_repo import FilesRepo
+from app.repositories.jobs_repo import JobsRepo, has_queued
+from app.repositories.providers_repo import ProvidersRepo
 from app.services.ai_drafting_service import AIDraftingService
+from app.services.job_wakeup import Wakeup
+from app.services.retention import sweep_memory_stores
+from app.services.storage_service import StorageService
+from app.services.virus_scan_service import ScannerError
 
+UPLOAD_SWEEP_INTERVAL = 300  # seconds between expired upload-session sweeps
+OCR_FILES_IN_FLIGHT = 2  # pages of each file already fan out over the OCR pool
+EXIF_FILES_IN_FLIGHT = 16  # one small header read each
 
-async def run_once(jobs: JobsRepo, ai: AIDraftingService):
-    job = await jobs.claim_next(queue_type="draft_generation")
-    if not job:
-        return False
-    try:
-        await jobs.start(job.id)
-        # In this MVP, assume job.result includes claim_id; but our enqueue immediately processes.
-        await jobs.succeed(job.id, result={"ok": True})
-    except Exception as e:  # noqa: BLE001
-        await jobs.fail(job.id, str(e))
-    return True
+Handler = Callable[[Job], Awaitable[dict]]
+
+
+class RetryJob(Exception):
+    """Raised by a handler for a transient failure; the job runs again later."""
+
+
+def retry_delay(attempt: int) -> float:
+    return settings.job_retry_delay * 2 ** (attempt - 1)
+
+
+def final_attempt(job: Job) -> bool:
+    return job.attempts >= settings.job_max_attempts
+
+
+def draft_handler(ai: AIDraftingService) -> Handler:
+    async def draft(job: Job) -> dict:
+        return await ai.draft_claim(job.id, job.user_id, job.payload["claim_id"])
+
+    return draft
+
+
+def scan_handler(storage: StorageService) -> Handler:
+    async def scan(job: Job) -> dict:
+        try:
+            f = await storage.scan_file(job.payload["file_id"], final_attempt=final_attempt(job))
+        except ScannerError as e:
+            if final_attempt(job):
+                raise
+            # clamd down or timing out: the file stays "scanning" until a later attempt
+            raise RetryJob(str(e)) from e
+        return {"virus_scan": f.virus_scan if f else None}
+
+    return scan
+
+
+def ocr_handler(storage: StorageService) -> Handler:
+    async def ocr(job: Job) -> dict:
+        f = await storage.ocr_file(job.payload["file_id"])
+        return {"characters": len(f.ocr_text or "") if f else 0}
+
+    return ocr
+
+
+def policy_handler(storage: StorageService) -> Handler:
+    async def extract(job: Job) -> dict:
+        f = await storage.extract_policy(job.payload["file_id"])
+        return {"policy_number": f.policy.policy_number if f and f.policy else None}
+
+    return extract
+
+
+def photo_metadata_handler(storage: StorageService) -> Handler:
+    async def extract(job: Job) -> dict:
+        f = await storage.extract_photo_metadata(job.payload["file_id"])
+        return {"photo_metadata": f.photo_metadata if f else None}
+
+    return extract
+
+
+def concurrency_limits() -> Dict[str, int]:
+    """Jobs in flight per type for one worker process."""
+    limits = {
+        "draft_generation": settings.worker_draft_concurrency,
+        # One scan per pooled clamd session
+        "file_scan": settings.clamd_pool_size,
+        "file_ocr": OCR_FILES_IN_FLIGHT,
+        "policy_extract": OCR_FILES_IN_FLIGHT,
+        "file_exif": EXIF_FILES_IN_FLIGHT,
+    }
+    limits.update(settings.worker_concurrency)
+    return limits
+
+
+async def run_once(jobs: JobsRepo, ai: AIDraftingService) -> bool:
+    return bool(await run_stage(jobs, "draft_generation", draft_handler(ai), 1))
+
+
+async def run_stage(
+    jobs: JobsRepo,
+    queue_type: str,
+    handle: Handler,
+    limit: int,
+) -> int:
+    """Claim up to ``limit`` jobs of one type and run them concurrently."""
+    claimed = []
+    while len(claimed) < limit:
+        job = await jobs.claim_next(queue_type=queue_type)
+        if not job:
+            break
+        claimed.append((job, job.attempts))
+
+    async def run(job: Job, attempt: int) -> None:
+        try:
+            await jobs.succeed(job.id, result=await handle(job), attempt=attempt)
+        except RetryJob as e:
+            await jobs.defer(job.id, attempt, retry_delay(attempt), str(e))
+        except Exception as e:  # noqa: BLE001
+            await jobs.fail(job.id, str(e), attempt=attempt)
+
+    await asyncio.gather(*(run(job, attempt) for job, attempt in claimed))
+    return len(claimed)
+
+
+async def run_scans(jobs: JobsRepo, storage: StorageService, limit: int) -> int:
+    return await run_stage(jobs, "file_scan", scan_handler(storage), limit)
+
+
+async def run_ocr(jobs: JobsRepo, storage: StorageService, limit: int) -> int:
+    return await run_stage(jobs, "file_ocr", ocr_handler(storage), limit)
+
+
+async def run_policy_extraction(jobs: JobsRepo, storage: StorageService, limit: int) -> int:
+    return await run_stage(jobs, "policy_extract", policy_handler(storage), limit)
+
+
+async def run_photo_metadata(jobs: JobsRepo, storage: StorageService, limit: int) -> int:
+    return await run_stage(jobs, "file_exif", photo_metadata_handler(storage), limit)
+
+
+class JobPool:
+    """Runs queued jobs as tasks, up to a limit per job type.
+
+    Every claimed job is leased. ``heartbeat`` renews the leases of the jobs
+    in flight and cancels any whose claim was lost; a job whose worker died
+    is requeued by ``JobsRepo.reclaim_expired`` once its lease passes.
+    ``drain`` lets jobs in flight finish and gives back the ones that do not
+    finish in time.
+    """
+
+    def __init__(self, jobs: JobsRepo, handlers: Dict[str, Handler], limits: Dict[str, int]) -> None:
+        self._jobs = jobs
+        self._handlers = handlers
+        self._limits = {queue_type: max(1, limits.get(queue_type, 1)) for queue_type in handlers}
+        # Task -> (job, the attempt number it was claimed as), per type
+        self._in_flight: Dict[str, Dict[asyncio.Task, Tuple[Job, int]]] = {t: {} for t in handlers}
+        self._freed = asyncio.Event()
+
+    @property
+    def queue_types(self) -> Tuple[str, ...]:
+        return tuple(self._handlers)
+
+    def in_flight(self, queue_type: Optional[str] = None) -> int:
+        if queue_type is not None:
+            return len(self._in_flight[queue_type])
+        return sum(len(running) for running in self._in_flight.values())
+
+    def has_work(self) -> bool:
+        """Whether some type with a free slot has queued jobs."""
+        return has_queued(t for t, running in self._in_flight.items() if len(running) < self._limits[t])
+
+    async def fill(self) -> int:
+        """Claim jobs into every free slot; returns how many were started."""
+        self._freed.clear()
+        started = 0
+        for queue_type, running in self._in_flight.items():
+            while len(running) < self._limits[queue_type]:
+                job = await self._jobs.claim_next(queue_type)
+                if not job:
+                    break
+                task = asyncio.create_task(self._run(job, job.attempts, self._handlers[queue_type]))
+                running[task] = (job, job.attempts)
+                task.add_done_callback(partial(self._done, queue_type))
+                started += 1
+        return started
+
+    def _done(self, queue_type: str, task: asyncio.Task) -> None:
+        self._in_flight[queue_type].pop(task, None)
+        self._freed.set()
+
+    async def _run(self, job: Job, attempt: int, handle: Handler) -> None:
+        try:
+            result = await handle(job)
+        except asyncio.CancelledError:
+            # Shutdown or a lost lease; a job this claim still holds goes back to its queue
+            await self._jobs.release(job.id, attempt)
+            raise
+        except RetryJob as e:
+            await self._jobs.defer(job.id, attempt, retry_delay(attempt), str(e))
+        except Exception as e:  # noqa: BLE001
+            await self._jobs.fail(job.id, str(e), attempt=attempt)
+        else:
+            # Dropped if the lease was lost meanwhile; the job's new claim reports instead
+            await self._jobs.succeed(job.id, result=result, attempt=attempt)
+
+    async def heartbeat(self) -> int:
+        """Renew the lease of every job in flight; returns how many were lost and cancelled."""
+        lost = 0
+        for running in self._in_flight.values():
+            for task, (job, attempt) in list(running.items()):
+                if not await self._jobs.heartbeat(job.id, attempt):
+                    task.cancel()
+                    lost += 1
+        return lost
+
+    async def wait(self, wakeup: Wakeup, stop: asyncio.Event) -> None:
+        """Until a job may be claimable, a slot frees up, or ``stop`` is set."""
+        waiters = [asyncio.ensure_future(w) for w in (wakeup.wait(), self._freed.wait(), stop.wait())]
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def drain(self, grace: float) -> int:
+        """Wait up to ``grace`` seconds for jobs in flight, renewing their leases.
+
+        Jobs still running after that are cancelled and released back to
+        their queue. Returns how many were released.
+        """
+        deadline = time.monotonic() + grace
+        while True:
+            tasks = [task for running in self._in_flight.values() for task in running]
+            remaining = deadline - time.monotonic()
+            if not tasks or remaining <= 0:
+                break
+            await asyncio.wait(tasks, timeout=min(remaining, settings.job_heartbeat_interval))
+            await self.heartbeat()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return len(tasks)
 
 
 async def main():
     jobs = JobsRepo()
-    ai = AIDraftingService.__new__(AIDraftingService)  # Not actually used in MVP loop
-    while True:
-        did = await run_once(jobs, ai)  # noqa: F841
-        await asyncio.sleep(1)
+    files = FilesRepo()
+    ai = AIDraftingService(settings, ClaimsRepo(), files, ProvidersRepo(), jobs)
+    storage = StorageService(settings=settings, files_repo=files, jobs_repo=jobs)
+    handlers = {
+        "draft_generation": draft_handler(ai),
+        "file_scan": scan_handler(storage),
+        "file_ocr": ocr_handler(storage),
+        "policy_extract": policy_handler(storage),
+        "file_exif": photo_metadata_handler(storage),
+    }
+    pool = JobPool(jobs, handlers, concurrency_limits())
+    wakeup = Wakeup(pool.queue_types, pool.has_work)
+
+    # SIGTERM stops claiming; jobs in flight get worker_shutdown_grace to finish
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    last_sweep = last_memory_sweep = last_heartbeat = 0.0
+    while not stop.is_set():
+        if await pool.fill():
+            wakeup.reset()
+        else:
+            # Sleeps until a job is queued or finishes, or the backoff timeout passes
+            await pool.wait(wakeup, stop)
+        if time.monotonic() - last_heartbeat >= settings.job_heartbeat_interval:
+            await pool.heartbeat()
+            await jobs.reclaim_expired()
+            last_heartbeat = time.monotonic()
+        if time.monotonic() - last_sweep >= UPLOAD_SWEEP_INTERVAL:
+            await storage.expire_upload_sessions()
+            last_sweep = time.monotonic()
+        if time.monotonic() - last_memory_sweep >= settings.memory_sweep_interval:
+            await sweep_memory_stores()
+            last_memory_sweep = time.monotonic()
+    await pool.drain(settings.worker_shutdown_grace)
 
 
 if __name__ == "__main__":
     asyncio.run(main())
-
@@ -0,0 +1 @@
+"""Standalone throughput benchmarks. Run with ``python -m benchmarks.<name>``."""
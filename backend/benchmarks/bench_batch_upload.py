@@ -0,0 +1,101 @@
+"""Wall time for attaching N files: one request per file vs one batch request.
+
+Storage is an in-memory S3 stand-in with a fixed per-call latency; the
+database is SQLite in memory. The per-file path repeats what
+``POST /claims/{id}/files`` does for every file (full claim load, upload,
+commit); the batch path checks ownership once and commits once.
+
+Usage: python -m benchmarks.bench_batch_upload [n_files] [s3_latency_ms]
+"""
+
+import asyncio
+import io
+import os
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.datastructures import Headers
+from fastapi import UploadFile
+
+import app.models  # noqa: F401  (register tables)
+import app.services.batch_upload as batch_upload
+import app.services.file_service as file_service
+from app.database import Base
+from app.models.claim import Claim, ClaimType
+from app.models.user import User
+from app.services.claim_service import ClaimService
+from app.services.file_service import FileService
+
+FILE_SIZE = 256 * 1024
+
+
+class SlowS3:
+    """Stores objects in memory, sleeping ``latency`` seconds per call."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        time.sleep(self.latency + len(Body) / 50e6)  # ~50MB/s per connection
+        self.objects[Key] = Body
+
+
+def make_files(n: int, tag: str):
+    return [
+        UploadFile(
+            file=io.BytesIO(tag.encode() + os.urandom(FILE_SIZE)),
+            filename=f"photo{i}.jpg",
+            headers=Headers({"content-type": "image/jpeg"}),
+        )
+        for i in range(n)
+    ]
+
+
+async def main(n: int, latency_ms: float) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    s3 = SlowS3(latency_ms / 1000)
+
+    async with sessions() as db:
+        user = User(email="bench@example.com", hashed_password="x", full_name="Bench", is_active=True)
+        db.add(user)
+        await db.flush()
+        claim = Claim(
+            user_id=user.id,
+            incident_description="Benchmark",
+            insurance_provider="Acme",
+            policy_number="POL-1",
+            claim_type=ClaimType.AUTO,
+        )
+        db.add(claim)
+        await db.commit()
+
+        # Derivative jobs are irrelevant here and need a broker
+        batch_upload.enqueue_derivatives = file_service.enqueue_derivatives = lambda *args: None
+
+        start = time.perf_counter()
+        for file in make_files(n, "single"):
+            await ClaimService(db).get_claim_by_id(claim.id, user.id)
+            await FileService(db, s3_client=s3).upload_file(claim.id, file)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert await ClaimService(db).owns_claim(claim.id, user.id)
+        batch = await FileService(db, s3_client=s3).upload_files(claim.id, make_files(n, "batch"))
+        batched = time.perf_counter() - start
+        assert batch.uploaded == n
+
+    await engine.dispose()
+    print(f"files:             {n} x {FILE_SIZE // 1024}KB, {latency_ms:.0f}ms S3 latency")
+    print(f"one request each   {sequential:8.3f}s")
+    print(f"single batch       {batched:8.3f}s")
+    print(f"speedup            {sequential / batched:8.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if args else 20, float(args[1]) if len(args) > 1 else 40.0))
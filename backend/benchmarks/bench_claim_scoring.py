@@ -0,0 +1,61 @@
+"""Throughput benchmark for the local heuristic claim scorer.
+
+Usage: python -m benchmarks.bench_claim_scoring [n_claims]
+"""
+
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.models.claim import ClaimType
+from app.services.scoring_service import CLAIM_KEYWORDS, ClaimScoringService
+
+
+def make_claims(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    types = list(ClaimType)
+    claims, files = [], {}
+    for _ in range(n):
+        claim_type = rng.choice(types)
+        words = CLAIM_KEYWORDS[claim_type.value] + ["the", "and", "then", "car", "house", "we"]
+        claim = SimpleNamespace(
+            id=uuid.uuid4(),
+            claim_type=claim_type,
+            incident_description=" ".join(rng.choices(words, k=rng.randint(0, 250))),
+            policy_number=rng.choice([None, "PO-12", "POL-12345678"]),
+            incident_date=rng.choice([None, datetime(2024, 1, 1)]),
+            incident_location=rng.choice([None, "Main St"]),
+            insurance_provider=rng.choice(["", "Acme Insurance"]),
+        )
+        files[claim.id] = [
+            SimpleNamespace(content_type=rng.choice(["image/jpeg", "application/pdf"]))
+            for _ in range(rng.randint(0, 8))
+        ]
+        claims.append(claim)
+    return claims, files
+
+
+async def main(n: int) -> None:
+    claims, files = make_claims(n)
+    scorer = ClaimScoringService()
+
+    start = time.perf_counter()
+    features = await scorer.extract_features(claims, files)
+    extracted = time.perf_counter()
+    scores = scorer.score_features(features)
+    scored = time.perf_counter()
+
+    total = scored - start
+    print(f"claims:            {n}")
+    print(f"feature extraction {extracted - start:8.3f}s")
+    print(f"model scoring      {scored - extracted:8.4f}s")
+    print(f"throughput         {n / total:,.0f} claims/s end to end")
+    print(f"mean score         {scores.mean():.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,58 @@
+"""Throughput of I/O-bound jobs in one worker process: one at a time vs the pool.
+
+Each job awaits a fixed delay standing in for an LLM or storage call. The
+serial run claims and finishes one job before the next, as the runner did
+before ``JobPool``; the pool keeps ``limit`` jobs in flight.
+
+Usage: python -m benchmarks.bench_job_pool [n_jobs] [io_ms] [limit]
+"""
+
+import asyncio
+import sys
+import time
+
+from app.repositories.jobs_repo import JobsRepo
+from app.services.job_wakeup import Wakeup
+from app.workers.runner import JobPool, run_stage
+
+
+async def fill_queue(jobs: JobsRepo, queue_type: str, n: int) -> None:
+    for _ in range(n):
+        await jobs.enqueue("bench", queue_type)
+
+
+async def main(n: int, io_ms: float, limit: int) -> None:
+    jobs = JobsRepo()
+
+    async def handle(job):
+        await asyncio.sleep(io_ms / 1000)
+        return {}
+
+    await fill_queue(jobs, "bench_serial", n)
+    start = time.perf_counter()
+    while await run_stage(jobs, "bench_serial", handle, 1):
+        pass
+    serial = time.perf_counter() - start
+
+    await fill_queue(jobs, "bench_pool", n)
+    pool = JobPool(jobs, {"bench_pool": handle}, {"bench_pool": limit})
+    wakeup, stop = Wakeup(pool.queue_types, pool.has_work), asyncio.Event()
+    start = time.perf_counter()
+    while await pool.fill() or pool.in_flight():
+        # Until a job finishes and frees its slot
+        await pool.wait(wakeup, stop)
+    pooled = time.perf_counter() - start
+
+    print(f"jobs:              {n} x {io_ms:.0f} ms I/O")
+    print(f"one at a time      {serial:8.2f} s  {n / serial:8.0f} jobs/s")
+    print(f"pool of {limit:<10} {pooled:8.2f} s  {n / pooled:8.0f} jobs/s")
+    print(f"speedup            {serial / pooled:8.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if args else 500,
+        float(args[1]) if len(args) > 1 else 20.0,
+        int(args[2]) if len(args) > 2 else 32,
+    ))
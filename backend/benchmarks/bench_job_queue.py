@@ -0,0 +1,63 @@
+"""Job claim latency with a large history of finished jobs.
+
+Fills the jobs store with finished jobs of several types, then times
+``claim_next`` on freshly queued work against the previous implementation,
+a scan over every job ever created.
+
+Usage: python -m benchmarks.bench_job_queue [n_finished] [n_claims]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from app.domain.models.core import Job
+from app.repositories import jobs_repo
+from app.repositories.jobs_repo import JobsRepo
+
+TYPES = ["file_scan", "file_ocr", "file_exif", "draft_generation"]
+
+
+def linear_claim_next(queue_type: str):
+    for job in jobs_repo._JOBS.values():
+        if job.type == queue_type and job.status == "queued":
+            job.status = "running"
+            return job
+    return None
+
+
+async def main(n_finished: int, n_claims: int) -> None:
+    for i in range(n_finished):
+        job_id = f"job_hist{i}"
+        jobs_repo._JOBS[job_id] = Job(id=job_id, user_id="user_a", type=TYPES[i % len(TYPES)], status="succeeded")
+    repo = JobsRepo()
+
+    for _ in range(n_claims):
+        await repo.enqueue("user_a", "file_scan")
+    timings = []
+    for _ in range(n_claims):
+        start = time.perf_counter()
+        assert await repo.claim_next("file_scan")
+        timings.append((time.perf_counter() - start) * 1e6)
+    start = time.perf_counter()
+    assert await repo.claim_next("file_scan") is None
+    idle = (time.perf_counter() - start) * 1e6
+
+    linear_claims = min(n_claims, 20)
+    for _ in range(linear_claims):
+        await repo.enqueue("user_a", "file_scan")
+    start = time.perf_counter()
+    for _ in range(linear_claims):
+        assert linear_claim_next("file_scan")
+    linear = (time.perf_counter() - start) / linear_claims * 1000
+
+    print(f"finished jobs:     {n_finished:,}")
+    print(f"claim_next:        p50 {statistics.median(timings):.2f} us  max {max(timings):.2f} us")
+    print(f"empty poll:        {idle:.2f} us")
+    print(f"linear scan:       {linear:.1f} ms per claim")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if args else 1_000_000, int(args[1]) if len(args) > 1 else 10_000))
@@ -0,0 +1,66 @@
+"""Job pickup latency: event-driven wakeup versus the old one-second poll.
+
+A worker loop claims jobs of one type while a producer enqueues them at
+random intervals. The latency is the time from enqueue to claim. The
+polling worker mirrors the old runner (claim, then sleep 1s when idle);
+the event-driven one waits on ``Wakeup``.
+
+Usage: python -m benchmarks.bench_job_wakeup [n_jobs]
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from app.repositories.jobs_repo import JobsRepo, has_queued
+from app.services.job_wakeup import Wakeup
+
+
+async def polling_worker(jobs: JobsRepo, queue_type: str, picked: dict, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        job = await jobs.claim_next(queue_type)
+        if job:
+            picked[job.id] = time.perf_counter()
+            continue
+        await asyncio.sleep(1)
+
+
+async def wakeup_worker(jobs: JobsRepo, queue_type: str, picked: dict, stop: asyncio.Event) -> None:
+    wakeup = Wakeup([queue_type], lambda: has_queued([queue_type]))
+    while not stop.is_set():
+        job = await jobs.claim_next(queue_type)
+        if job:
+            picked[job.id] = time.perf_counter()
+            wakeup.reset()
+            continue
+        await wakeup.wait()
+
+
+async def measure(worker, queue_type: str, n: int) -> list:
+    jobs, picked, queued, stop = JobsRepo(), {}, {}, asyncio.Event()
+    rng = random.Random(3)
+    task = asyncio.create_task(worker(jobs, queue_type, picked, stop))
+    for _ in range(n):
+        await asyncio.sleep(rng.uniform(0.05, 1.0))
+        job = await jobs.enqueue("user_bench", queue_type)
+        queued[job["id"]] = time.perf_counter()
+    while len(picked) < n:
+        await asyncio.sleep(0.01)
+    stop.set()
+    task.cancel()
+    return [(picked[job_id] - queued[job_id]) * 1000 for job_id in queued]
+
+
+async def main(n: int) -> None:
+    for name, worker in (("1s polling", polling_worker), ("event wakeup", wakeup_worker)):
+        latencies = await measure(worker, f"bench_{worker.__name__}", n)
+        print(
+            f"{name:<14} avg {statistics.mean(latencies):8.2f} ms  "
+            f"p50 {statistics.median(latencies):8.2f} ms  max {max(latencies):8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
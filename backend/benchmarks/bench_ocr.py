@@ -0,0 +1,76 @@
+"""OCR throughput in pages/sec, with one worker and with a pool per core.
+
+Builds a synthetic multi-page scanned PDF (text rendered to page images),
+then OCRs it through OCRService with the pool at each size. Workers are
+warmed up before timing so process spawn and model load are not counted.
+Needs the tesseract binary on PATH.
+
+Usage: python -m benchmarks.bench_ocr [pages] [workers] [memory_mb]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.config import settings
+from app.services import ocr_service
+from app.services.ocr_service import OCRService
+
+PAGE_SIZE = (1240, 1754)  # A4 at 150 DPI; rendered at 300 DPI for OCR
+LINE = "Invoice 4471 - replacement windshield, labour 2.5h, total USD 1,284.00"
+
+
+def make_scan(path: str, pages: int) -> None:
+    font = ImageFont.load_default(size=22)
+    images = []
+    for page in range(pages):
+        img = Image.new("L", PAGE_SIZE, 255)
+        draw = ImageDraw.Draw(img)
+        for row in range(40):
+            draw.text((80, 80 + row * 40), f"{page:03d}.{row:02d} {LINE}", fill=0, font=font)
+        images.append(img)
+    images[0].save(path, "PDF", resolution=150, save_all=True, append_images=images[1:])
+
+
+async def measure(path: str, pages: int, workers: int) -> float:
+    ocr_service.shutdown_ocr()
+    ocr_service._CACHE.clear()
+    settings.ocr_workers = workers
+    service = OCRService()
+    # Start every worker and load the model before timing
+    await service.ocr_pages(path, "application/pdf", range(min(workers, pages)))
+    start = time.perf_counter()
+    await service.extract_text(path, "application/pdf", sha256=f"bench-{workers}")
+    elapsed = time.perf_counter() - start
+    ocr_service.shutdown_ocr()
+    return pages / elapsed
+
+
+async def main(pages: int, workers: int, memory_mb: int) -> None:
+    settings.ocr_max_pages = pages
+    settings.ocr_worker_memory_mb = memory_mb
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scan.pdf")
+        make_scan(path, pages)
+        single = await measure(path, pages, 1)
+        pooled = await measure(path, pages, workers)
+
+    print(f"pages:             {pages}, engine {ocr_service.engine_version()}, {memory_mb}MB cap per worker")
+    print(f"1 worker           {single:8.2f} pages/s")
+    print(f"{workers:<2} workers         {pooled:8.2f} pages/s  ({pooled / workers:.2f} pages/s per core)")
+    print(f"speedup            {pooled / single:8.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(
+        main(
+            int(args[0]) if args else 24,
+            int(args[1]) if len(args) > 1 else os.cpu_count() or 2,
+            int(args[2]) if len(args) > 2 else settings.ocr_worker_memory_mb,
+        )
+    )
@@ -0,0 +1,66 @@
+"""Near-duplicate lookups against a large perceptual-hash index.
+
+Fills a HammingIndex with random 64-bit hashes, plants a few near copies of
+the query hashes, and times radius queries against a linear scan over the
+same hashes. Random hashes spread evenly over the chunk buckets; real pHashes
+cluster somewhat, so expect buckets, and query times, a few times larger.
+
+Usage: python -m benchmarks.bench_phash_index [n_hashes] [radius] [n_queries]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from app.services.image_hash import HammingIndex
+
+
+def near(value: int, bits: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+def percentile(samples: list, pct: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main(n: int, radius: int, n_queries: int) -> None:
+    rng = random.Random(42)
+    index = HammingIndex()
+    hashes = [rng.getrandbits(64) for _ in range(n)]
+    start = time.perf_counter()
+    for key, value in enumerate(hashes):
+        index.add(key, value)
+    build = time.perf_counter() - start
+
+    queries = [rng.getrandbits(64) for _ in range(n_queries)]
+    for i, value in enumerate(queries):
+        index.add(("planted", i), near(value, rng.randint(0, radius), rng))
+
+    timings = []
+    for value in queries:
+        start = time.perf_counter()
+        found = index.query(value, radius)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert any(key[0] == "planted" for key, _ in found if isinstance(key, tuple))
+
+    start = time.perf_counter()
+    for value in queries[:5]:
+        [h for h in hashes if (h ^ value).bit_count() <= radius]
+    linear = (time.perf_counter() - start) / 5 * 1000
+
+    print(f"hashes:         {n:,} (built in {build:.1f} s)")
+    print(f"radius:         {radius} bits")
+    print(f"index query:    p50 {statistics.median(timings):.3f} ms  p99 {percentile(timings, 0.99):.3f} ms")
+    print(f"linear scan:    {linear:.1f} ms")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if args else 1_000_000,
+        int(args[1]) if len(args) > 1 else 6,
+        int(args[2]) if len(args) > 2 else 1000,
+    )
@@ -0,0 +1,52 @@
+"""Soak test: RSS while a million jobs flow through the in-memory stores.
+
+Each job is enqueued, claimed and finished, and one in ten also saves a
+claim draft and a PDF URL, as the drafting and PDF stages do. The sweeper
+runs every 10k jobs. RSS should level off once the retention caps are
+reached. Pass --no-retention to lift the caps and watch it climb instead.
+
+Usage: python -m benchmarks.soak_memory_retention [n_jobs] [--no-retention]
+"""
+
+import asyncio
+import sys
+
+from app.config import settings
+from app.repositories.claims_repo import ClaimsRepo
+from app.repositories.jobs_repo import JobsRepo
+from app.services.pdf_service import PDFService
+from app.services.retention import memory_gauges, rss_bytes, sweep_memory_stores
+
+TYPES = ["file_scan", "file_ocr", "file_exif", "draft_generation"]
+
+
+async def main(n: int, retain: bool) -> None:
+    if not retain:
+        settings.job_retention_max = settings.claim_draft_max = settings.pdf_url_max = n * 2
+        settings.job_retention_seconds = settings.claim_draft_ttl = settings.pdf_url_ttl = 10**9
+    jobs, claims, pdfs = JobsRepo(), ClaimsRepo(), PDFService(settings)
+    start_rss = rss_bytes()
+    print(f"{'jobs':>10} {'rss MB':>8} {'kept jobs':>10} {'drafts':>8} {'pdf urls':>9}")
+    for i in range(1, n + 1):
+        job_type = TYPES[i % len(TYPES)]
+        job = await jobs.enqueue("user_soak", job_type, {"file_id": f"file_{i}"})
+        await jobs.claim_next(job_type)
+        await jobs.succeed(job["id"], {"ok": True})
+        if i % 10 == 0:
+            claim_id = f"clm_soak{i}"
+            await claims.save_draft(claim_id, {"summary": "x" * 200}, 0.7, [])
+            await pdfs.enqueue_pdf_job("user_soak", claim_id)
+        if i % 10_000 == 0:
+            await sweep_memory_stores()
+        if i % (n // 10) == 0:
+            gauges = await memory_gauges()
+            print(
+                f"{i:>10,} {gauges['rss_bytes'] / 1e6:>8.1f} {gauges['jobs']:>10,} "
+                f"{gauges['claim_drafts']:>8,} {gauges['pdf_urls']:>9,}"
+            )
+    print(f"RSS growth: {(rss_bytes() - start_rss) / 1e6:.1f} MB over {n:,} jobs")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    asyncio.run(main(int(args[0]) if args else 1_000_000, "--no-retention" not in sys.argv))
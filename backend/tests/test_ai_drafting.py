@@ -0,0 +1,57 @@
+"""Test incremental section-level redrafting."""
+
+from app.domain.dto.requests import CreateClaimRequest, UpdateClaimRequest
+from app.repositories.claims_repo import ClaimsRepo
+from app.repositories.files_repo import FilesRepo
+from app.repositories.jobs_repo import JobsRepo
+from app.repositories.providers_repo import ProvidersRepo
+from app.services.ai_drafting_service import SECTION_INPUTS, AIDraftingService
+
+
+def make_service() -> AIDraftingService:
+    return AIDraftingService(
+        settings=None,
+        claims_repo=ClaimsRepo(),
+        files_repo=FilesRepo(),
+        providers_repo=ProvidersRepo(),
+        jobs_repo=JobsRepo(),
+    )
+
+
+async def test_first_draft_renders_every_section():
+    ai = make_service()
+    claim = await ClaimsRepo().create("user_a", CreateClaimRequest(claim_type="auto", incident_description="Rear-ended"))
+
+    job = await ai.enqueue_draft_job("user_a", claim.id, payload=None)
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["sections_regenerated"] == list(SECTION_INPUTS)
+    assert job["result"]["sections_reused"] == []
+
+
+async def test_redraft_only_regenerates_changed_sections():
+    ai = make_service()
+    claims = ClaimsRepo()
+    claim = await claims.create("user_a", CreateClaimRequest(claim_type="auto", incident_description="Rear-ended"))
+    await ai.enqueue_draft_job("user_a", claim.id, payload=None)
+
+    await claims.update("user_a", claim.id, UpdateClaimRequest(incident_location="Main St"))
+    job = await ai.enqueue_draft_job("user_a", claim.id, payload=None)
+
+    assert job["result"]["sections_regenerated"] == ["Incident"]
+    assert "summary" in job["result"]["sections_reused"]
+    draft = await claims.get_draft(claim.id)
+    incident = next(s for s in draft.content["sections"] if s["title"] == "Incident")
+    assert "Location: Main St" in incident["text"]
+    assert draft.content["summary"] == "Rear-ended"
+
+
+async def test_unchanged_claim_reuses_whole_draft():
+    ai = make_service()
+    claim = await ClaimsRepo().create("user_a", CreateClaimRequest(claim_type="home", incident_description="Leak"))
+    await ai.enqueue_draft_job("user_a", claim.id, payload=None)
+
+    job = await ai.enqueue_draft_job("user_a", claim.id, payload=None)
+
+    assert job["result"]["sections_regenerated"] == []
+    assert job["result"]["compute_saved_seconds"] >= 0
@@ -0,0 +1,97 @@
+"""Test soft-deleting claims and purging their rows and stored files."""
+
+import os
+
+from sqlalchemy import select
+
+from app.models.blob import Blob
+from app.models.claim import Claim, ClaimFile, ClaimProcessingJob, ClaimType
+from app.services.claim_service import ClaimService
+from app.services.storage_gc import StorageGarbageCollector
+
+SHARED_SHA, OWN_SHA = "c" * 64, "d" * 64
+
+
+def stored(tmp_path, name):
+    path = tmp_path / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"bytes")
+    return str(path)
+
+
+def claim_file(claim, key, sha256=None):
+    return ClaimFile(
+        claim_id=claim.id, filename="f", original_filename="f", file_size=5,
+        content_type="image/jpeg", s3_key=key, sha256=sha256,
+    )
+
+
+async def test_delete_hides_claim_and_purge_removes_rows_and_unshared_files(
+    db_session, test_user, test_claim, tmp_path, monkeypatch
+):
+    queued = []
+    monkeypatch.setattr(ClaimService, "_enqueue_purge", lambda self, claim_id: queued.append(claim_id))
+    other = Claim(
+        user_id=test_user.id, incident_description="Other", insurance_provider="X",
+        policy_number="P1", claim_type=ClaimType.HOME,
+    )
+    db_session.add(other)
+    await db_session.flush()
+    shared, own = stored(tmp_path, "blobs/shared"), stored(tmp_path, "blobs/own")
+    own_thumb, legacy = stored(tmp_path, "blobs/own.thumb.jpg"), stored(tmp_path, "claims/legacy.jpg")
+    db_session.add_all([
+        *(claim_file(test_claim, own, OWN_SHA) for _ in range(150)),
+        claim_file(test_claim, shared, SHARED_SHA),
+        claim_file(test_claim, legacy),
+        claim_file(other, shared, SHARED_SHA),
+        ClaimProcessingJob(claim_id=test_claim.id),
+        ClaimProcessingJob(claim_id=other.id),
+        Blob(sha256=SHARED_SHA, storage_key=shared, size=5, content_type="image/jpeg", ref_count=2),
+        Blob(sha256=OWN_SHA, storage_key=own, size=5, content_type="image/jpeg", ref_count=150),
+    ])
+    await db_session.commit()
+    service = ClaimService(db_session)
+
+    assert await service.delete_claim(test_claim.id, test_user.id)
+    assert not await service.delete_claim(test_claim.id, test_user.id)
+    assert queued == [str(test_claim.id)]
+    assert await service.get_claim_by_id(test_claim.id, test_user.id) is None
+    assert not await service.owns_claim(test_claim.id, test_user.id)
+
+    result = await service.purge_claim(test_claim.id, StorageGarbageCollector(db_session, upload_dir=str(tmp_path)))
+
+    assert result["purged"] and result["files"] == 152
+    assert not os.path.exists(own) and not os.path.exists(own_thumb) and not os.path.exists(legacy)
+    assert os.path.exists(shared)
+    blobs = (await db_session.execute(select(Blob.sha256, Blob.ref_count))).all()
+    assert blobs == [(SHARED_SHA, 1)]
+    remaining = (await db_session.execute(select(ClaimFile.claim_id))).scalars().all()
+    assert remaining == [other.id]
+    jobs = (await db_session.execute(select(ClaimProcessingJob.claim_id))).scalars().all()
+    assert jobs == [other.id]
+    # A claim that was never soft-deleted is left alone, files and jobs included
+    assert not (await service.purge_claim(other.id))["purged"]
+    remaining = (await db_session.execute(select(ClaimFile.claim_id))).scalars().all()
+    assert remaining == [other.id]
+    jobs = (await db_session.execute(select(ClaimProcessingJob.claim_id))).scalars().all()
+    assert jobs == [other.id]
+    assert (await db_session.execute(select(Blob.ref_count))).scalars().all() == [1]
+    assert os.path.exists(shared)
+
+
+async def test_purge_keeps_references_not_committed_yet(db_session, test_user, test_claim, tmp_path, monkeypatch):
+    monkeypatch.setattr(ClaimService, "_enqueue_purge", lambda self, claim_id: None)
+    shared = stored(tmp_path, "blobs/pending")
+    # An upload acquired the blob (ref_count 2) but its claim file is not committed yet
+    db_session.add_all([
+        claim_file(test_claim, shared, SHARED_SHA),
+        Blob(sha256=SHARED_SHA, storage_key=shared, size=5, content_type="image/jpeg", ref_count=2),
+    ])
+    await db_session.commit()
+    service = ClaimService(db_session)
+    await service.delete_claim(test_claim.id, test_user.id)
+
+    await service.purge_claim(test_claim.id, StorageGarbageCollector(db_session, upload_dir=str(tmp_path)))
+
+    assert (await db_session.execute(select(Blob.ref_count))).scalars().all() == [1]
+    assert os.path.exists(shared)
@@ -0,0 +1,108 @@
+"""Test heuristic claim-strength scoring and its precedence over AI scores."""
+
+import uuid
+from datetime import datetime
+
+import numpy as np
+from fastapi import status
+
+from app.models.claim import Claim, ClaimFile, ClaimType
+from app.services.claim_service import ClaimService
+from app.services.scoring_service import (
+    AI_SOURCE,
+    CLAIM_KEYWORDS,
+    FEATURE_NAMES,
+    HEURISTIC_SOURCE,
+    ClaimScoringService,
+    apply_ai_score,
+)
+
+
+def strong_claim() -> Claim:
+    return Claim(
+        id=uuid.uuid4(),
+        claim_type=ClaimType.AUTO,
+        incident_description="Collision damaged the vehicle bumper; police report and repair estimate attached",
+        insurance_provider="Acme",
+        policy_number="POL123456",
+        incident_date=datetime(2024, 5, 1),
+        incident_location="Main St",
+    )
+
+
+def weak_claim() -> Claim:
+    return Claim(
+        id=uuid.uuid4(), claim_type=ClaimType.HOME, incident_description="", insurance_provider="", policy_number="X1",
+    )
+
+
+def attachment(claim: Claim, content_type: str) -> ClaimFile:
+    return ClaimFile(claim_id=claim.id, content_type=content_type)
+
+
+async def test_extract_features():
+    strong, weak = strong_claim(), weak_claim()
+    files = {strong.id: [attachment(strong, "image/jpeg"), attachment(strong, "image/png"), attachment(strong, "application/pdf")]}
+
+    features = await ClaimScoringService().extract_features([strong, weak], files)
+
+    assert features.shape == (2, len(FEATURE_NAMES))
+    row = dict(zip(FEATURE_NAMES, features[0]))
+    assert row["description_length"] == 11
+    assert row["keyword_coverage"] == 7 / len(CLAIM_KEYWORDS["auto"])
+    assert (row["photo_count"], row["has_document"], row["policy_valid"]) == (2, 1, 1)
+    assert (row["has_incident_date"], row["has_incident_location"], row["has_provider"]) == (1, 1, 1)
+    assert features[1].tolist() == [0.0] * len(FEATURE_NAMES)
+
+
+async def test_scores_stay_in_range_and_order_claims():
+    rng = np.random.default_rng(0)
+    features = rng.uniform(0, 400, size=(1000, len(FEATURE_NAMES)))
+    features[0], features[1] = 0, 10**6
+
+    scores = ClaimScoringService.score_features(features)
+
+    assert scores.dtype == np.int64
+    assert scores.min() >= 0 and scores.max() <= 100
+    strong, weak = await ClaimScoringService().score_claims([strong_claim(), weak_claim()])
+    assert strong > 50 > weak
+
+
+async def test_ai_scores_take_precedence(db_session, test_user, test_claim):
+    scored_by_ai = Claim(
+        user_id=test_user.id, incident_description="x", insurance_provider="X", policy_number="P",
+        claim_type=ClaimType.OTHER, strength_score=91, strength_score_source=AI_SOURCE,
+    )
+    db_session.add(scored_by_ai)
+    await db_session.commit()
+
+    scores = await ClaimService(db_session).score_claims(test_user.id, [test_claim.id, scored_by_ai.id])
+
+    by_id = {s.claim_id: s for s in scores}
+    assert (by_id[scored_by_ai.id].strength_score, by_id[scored_by_ai.id].strength_score_source) == (91, AI_SOURCE)
+    assert by_id[test_claim.id].strength_score_source == HEURISTIC_SOURCE
+
+
+def test_missing_ai_score_keeps_the_heuristic():
+    claim = strong_claim()
+    claim.strength_score, claim.strength_score_source = 64, HEURISTIC_SOURCE
+
+    apply_ai_score(claim, None)
+    assert (claim.strength_score, claim.strength_score_source) == (64, HEURISTIC_SOURCE)
+
+    apply_ai_score(claim, 80)
+    assert (claim.strength_score, claim.strength_score_source) == (80, AI_SOURCE)
+
+
+def test_score_claims_endpoint(client, auth_headers, test_claim):
+    response = client.post(
+        "/api/v1/claims/scores",
+        json={"claim_ids": [str(test_claim.id), str(uuid.uuid4())]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    scores = response.json()["scores"]
+    assert [s["claim_id"] for s in scores] == [str(test_claim.id)]
+    assert 0 <= scores[0]["strength_score"] <= 100
+    assert scores[0]["strength_score_source"] == HEURISTIC_SOURCE
@@ -0,0 +1,92 @@
+"""Test batched claim summarization."""
+
+import json
+import uuid
+from collections import OrderedDict
+
+from app.config import settings
+from app.models.claim import Claim, ClaimType
+from app.services import claim_service
+from app.services.ai_service import AIService, summary_fingerprint
+from app.services.claim_service import _mark_summaries_queued
+
+
+def make_claim(description: str) -> Claim:
+    return Claim(
+        id=uuid.uuid4(),
+        incident_description=description,
+        insurance_provider="Test Insurance",
+        policy_number="POL123",
+        claim_type=ClaimType.AUTO,
+    )
+
+
+async def test_summarize_claims_packs_chunks_into_single_requests(monkeypatch):
+    claims = [make_claim(f"Incident {i}") for i in range(45)]
+    calls = []
+
+    async def fake_request(self, messages, template=None, estimated_tokens=0):
+        batch = json.loads(messages[-1]["content"].split("Claims:\n", 1)[1])
+        calls.append(len(batch))
+        return json.dumps({"summaries": [{"id": c["id"], "summary": f"Summary of {c['description']}"} for c in batch]})
+
+    monkeypatch.setattr(AIService, "_make_openai_request", fake_request)
+
+    summaries = await AIService().summarize_claims(claims)
+
+    assert calls == [20, 20, 5]
+    assert summaries[str(claims[7].id)] == "Summary of Incident 7"
+
+
+async def test_summarize_claims_falls_back_for_missing_entries(monkeypatch):
+    claims = [make_claim("Hail damage"), make_claim("Flooded basement")]
+
+    async def fake_request(self, messages, template=None, estimated_tokens=0):
+        return json.dumps({"summaries": [{"id": str(claims[0].id), "summary": "Hail."}]})
+
+    monkeypatch.setattr(AIService, "_make_openai_request", fake_request)
+
+    summaries = await AIService().summarize_claims(claims)
+
+    assert summaries[str(claims[0].id)] == "Hail."
+    assert summaries[str(claims[1].id)] == "auto claim with Test Insurance"
+
+
+async def test_summarize_claims_without_fallback_leaves_failures_out(monkeypatch):
+    claims = [make_claim("Hail damage"), make_claim("Flooded basement")]
+
+    async def fake_request(self, messages, template=None, estimated_tokens=0):
+        return json.dumps({"summaries": [{"id": str(claims[0].id), "summary": "Hail."}]})
+
+    monkeypatch.setattr(AIService, "_make_openai_request", fake_request)
+    assert await AIService().summarize_claims(claims, fallback=False) == {str(claims[0].id): "Hail."}
+
+    async def failing_request(self, messages, template=None, estimated_tokens=0):
+        raise RuntimeError("rate limited")
+
+    monkeypatch.setattr(AIService, "_make_openai_request", failing_request)
+    assert await AIService().summarize_claims(claims, fallback=False) == {}
+
+
+def test_stale_claims_are_queued_once_until_the_marker_expires(monkeypatch):
+    monkeypatch.setattr(claim_service, "_SUMMARIES_QUEUED", OrderedDict())
+    monkeypatch.setattr(settings, "ai_summary_requeue_after", 300)
+
+    assert _mark_summaries_queued({"a": "f1", "b": "f1"}) == ["a", "b"]
+    assert _mark_summaries_queued({"a": "f1", "b": "f1"}) == []
+    # Edited again while queued: the new inputs need their own summary
+    assert _mark_summaries_queued({"a": "f2", "b": "f1"}) == ["a"]
+
+    monkeypatch.setattr(settings, "ai_summary_requeue_after", 0)
+    assert _mark_summaries_queued({"b": "f1"}) == ["b"]
+
+
+def test_fingerprint_only_changes_with_summary_inputs():
+    claim = make_claim("Hail damage")
+    before = summary_fingerprint(claim)
+
+    claim.policy_number = "POL999"
+    assert summary_fingerprint(claim) == before
+
+    claim.incident_description = "Hail damage to roof"
+    assert summary_fingerprint(claim) != before
@@ -0,0 +1,52 @@
+"""Test thumbnail/preview generation for uploaded images."""
+
+import io
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.services import derivatives
+from app.services.derivatives import DerivativeService, derivative_key, render_derivatives
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def test_render_derivatives_fits_each_size():
+    rendered = render_derivatives(make_jpeg(4000, 3000))
+
+    sizes = {name: Image.open(io.BytesIO(data)).size for name, data in rendered.items()}
+    assert sizes == {"medium": (1024, 768), "thumb": (256, 192)}
+
+
+async def test_ensure_is_idempotent(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    source = tmp_path / "uploads" / "blobs" / "ab" / "cd" / "abcd"
+    source.parent.mkdir(parents=True)
+    source.write_bytes(make_jpeg(1600, 1200))
+    renders = []
+    original = derivatives.render_in_pool
+
+    async def counting(data):
+        renders.append(len(data))
+        return await original(data)
+
+    monkeypatch.setattr(derivatives, "render_in_pool", counting)
+    service = DerivativeService()
+
+    urls = await service.ensure(str(source), "image/jpeg")
+    again = await service.ensure(str(source), "image/jpeg")
+
+    assert len(renders) == 1 and urls == again
+    assert urls["thumb"].endswith("/files/blobs/ab/cd/abcd.thumb.jpg")
+    assert (tmp_path / "uploads" / "blobs" / "ab" / "cd" / "abcd.medium.jpg").exists()
+    assert derivative_key(str(source), "thumb").endswith(".thumb.jpg")
+
+
+@pytest.mark.parametrize("content_type", ["application/pdf", "text/plain"])
+async def test_non_images_have_no_derivatives(content_type):
+    assert await DerivativeService().ensure("uploads/whatever", content_type) == {}
@@ -0,0 +1,128 @@
+"""Test authenticated file downloads: ownership, ranges and conditional requests."""
+
+import hashlib
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.models.claim import ClaimFile
+from app.services.file_download import FileDownloadService, content_disposition, parse_range
+
+
+DATA = bytes(range(256)) * 40
+
+
+async def collect(response, method="GET"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await response({"type": "http", "method": method}, None, send)
+    return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.fixture
+async def stored_file(db_session, test_claim, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    path = tmp_path / "blob"
+    path.write_bytes(DATA)
+    claim_file = ClaimFile(
+        claim_id=test_claim.id,
+        filename="photo.jpg",
+        original_filename="photo.jpg",
+        file_size=len(DATA),
+        content_type="image/jpeg",
+        s3_key=str(path),
+        s3_url="http://localhost:8000/files/blob",
+        sha256=hashlib.sha256(DATA).hexdigest(),
+    )
+    db_session.add(claim_file)
+    await db_session.commit()
+    return claim_file
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(HTTPException) as exc:
+        parse_range("bytes=100-", 100)
+    assert exc.value.status_code == 416
+
+
+async def test_full_and_ranged_download(db_session, test_claim, stored_file):
+    service = FileDownloadService(db_session)
+
+    full = await service.download(stored_file.id, test_claim.user_id, {})
+    assert full.headers["etag"] == f'"{stored_file.sha256}"'
+    assert await collect(full) == (200, DATA)
+
+    ranged = await service.download(stored_file.id, test_claim.user_id, {"range": "bytes=100-199"})
+    assert ranged.headers["content-range"] == f"bytes 100-199/{len(DATA)}"
+    assert await collect(ranged) == (206, DATA[100:200])
+
+
+async def test_conditional_download(db_session, test_claim, stored_file):
+    service = FileDownloadService(db_session)
+    first = await service.download(stored_file.id, test_claim.user_id, {})
+
+    cached = await service.download(stored_file.id, test_claim.user_id, {"if-none-match": first.headers["etag"]})
+    assert cached.status_code == 304
+
+    since = await service.download(
+        stored_file.id, test_claim.user_id, {"if-modified-since": first.headers["last-modified"]}
+    )
+    assert since.status_code == 304
+
+    # A stale If-Range falls back to the whole file
+    stale = await service.download(
+        stored_file.id, test_claim.user_id, {"range": "bytes=0-9", "if-range": '"other"'}
+    )
+    assert await collect(stale) == (200, DATA)
+
+
+async def test_download_requires_ownership(db_session, stored_file):
+    with pytest.raises(HTTPException) as exc:
+        await FileDownloadService(db_session).download(stored_file.id, uuid.uuid4(), {})
+    assert exc.value.status_code == 404
+
+
+async def test_s3_download_redirects_to_presigned_url(db_session, test_claim, stored_file, monkeypatch):
+    class FakeS3:
+        def generate_presigned_url(self, method, Params, ExpiresIn):
+            return f"https://bucket.s3.amazonaws.com/{Params['Key']}?sig=1"
+
+    monkeypatch.setattr(settings, "aws_access_key_id", "key")
+    monkeypatch.setattr(settings, "aws_secret_access_key", "secret")
+
+    response = await FileDownloadService(db_session, s3_client=FakeS3()).download(stored_file.id, test_claim.user_id, {})
+
+    assert response.status_code == 307
+    assert response.headers["location"].endswith("?sig=1")
+
+
+@pytest.mark.parametrize("name, header", [
+    ("事故.jpg", "inline; filename=\".jpg\"; filename*=UTF-8''%E4%BA%8B%E6%95%85.jpg"),
+    ('a"b\r\n.jpg', "inline; filename=\"a_b__.jpg\"; filename*=UTF-8''a%22b%0D%0A.jpg"),
+    ("café.jpg", "inline; filename=\"cafe.jpg\"; filename*=UTF-8''caf%C3%A9.jpg"),
+])
+def test_content_disposition_is_a_safe_header(name, header):
+    assert content_disposition(name) == header
+
+
+async def test_download_with_non_latin1_and_quoted_filenames(db_session, test_claim, stored_file):
+    service = FileDownloadService(db_session)
+    for name in ("事故.jpg", 'say "cheese".jpg'):
+        stored_file.original_filename = name
+        await db_session.commit()
+
+        response = await service.download(stored_file.id, test_claim.user_id, {})
+
+        assert response.headers["content-disposition"] == content_disposition(name)
+        assert await collect(response) == (200, DATA)
@@ -0,0 +1,257 @@
+"""Test streaming, deduplicated uploads to S3 (via an in-memory stand-in) and local disk."""
+
+import hashlib
+import io
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.config import settings
+from app.models.claim import Claim, ClaimType
+from app.models.user import User
+from app.services.blob_store import BlobStore, blob_key
+from app.services.file_service import FileService
+from app.services.local_file_service import LocalFileService
+from app.services.s3_client import s3_metrics
+
+
+class FakeS3:
+    """Minimal in-memory stand-in for the boto3 S3 client calls we use."""
+
+    def __init__(self):
+        self.objects = {}
+        self.multipart = {}
+        self.calls = []
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.calls.append("put_object")
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None):
+        self.calls.append("create_multipart_upload")
+        upload_id = f"upload-{len(self.multipart)}"
+        self.multipart[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append("upload_part")
+        self.multipart[UploadId][PartNumber] = Body
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        parts = self.multipart.pop(UploadId)
+        self.objects[Key] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append("abort_multipart_upload")
+        self.multipart.pop(UploadId, None)
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self.calls.append("copy_object")
+        self.objects[Key] = self.objects[CopySource["Key"]]
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append("delete_object")
+        self.objects.pop(Key, None)
+
+
+@pytest.fixture(autouse=True)
+def no_derivatives(monkeypatch):
+    queued = []
+    monkeypatch.setattr("app.services.file_service.enqueue_derivatives", lambda *args: queued.append(args))
+    monkeypatch.setattr("app.services.local_file_service.enqueue_derivatives", lambda *args: queued.append(args))
+    monkeypatch.setattr("app.services.batch_upload.enqueue_derivatives", lambda *args: queued.append(args))
+    return queued
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    monkeypatch.setattr(settings, "upload_chunk_size", 16 * 1024)
+    monkeypatch.setattr(settings, "s3_multipart_threshold", 64 * 1024)
+    monkeypatch.setattr(settings, "s3_multipart_part_size", 64 * 1024)
+    monkeypatch.setattr(settings, "max_file_size", 256 * 1024)
+
+
+def make_upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="photo.jpg", headers=Headers({"content-type": "image/jpeg"}))
+
+
+async def test_small_upload_uses_single_put(db_session, test_claim, small_parts, no_derivatives):
+    s3 = FakeS3()
+    data = b"x" * 10_000
+
+    response = await FileService(db_session, s3_client=s3).upload_file(test_claim.id, make_upload(data))
+
+    assert s3.calls == ["put_object"]
+    assert no_derivatives == [(blob_key(response.sha256), "image/jpeg", response.sha256)]
+    assert response.file_size == len(data)
+    assert response.sha256 == hashlib.sha256(data).hexdigest()
+    assert s3_metrics()["put_object"]["count"] >= 1
+
+
+async def test_large_upload_streams_multipart(db_session, test_claim, small_parts):
+    s3 = FakeS3()
+    data = bytes(range(256)) * 800  # ~200KB
+
+    response = await FileService(db_session, s3_client=s3).upload_file(test_claim.id, make_upload(data))
+
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert s3.calls[0] == "create_multipart_upload"
+    assert s3.calls.count("upload_part") == 4
+    assert response.s3_url.endswith(blob_key(sha256))
+    # Staged under a temporary key, then copied into place
+    assert s3.objects == {blob_key(sha256): data}
+    assert response.sha256 == sha256
+
+
+async def test_oversized_upload_is_rejected_while_streaming(db_session, test_claim, small_parts):
+    s3 = FakeS3()
+
+    with pytest.raises(HTTPException) as exc:
+        await FileService(db_session, s3_client=s3).upload_file(test_claim.id, make_upload(b"x" * 300 * 1024))
+
+    assert exc.value.status_code == 413
+    assert s3.calls[-1] == "abort_multipart_upload"
+    assert not s3.objects and not s3.multipart
+
+
+async def test_local_upload_writes_chunks_and_hashes(db_session, test_claim, small_parts, tmp_path):
+    service = LocalFileService(db_session)
+    service.upload_dir = str(tmp_path)
+    data = b"y" * 100_000
+
+    response = await service.upload_file(test_claim.id, make_upload(data))
+
+    stored = [p for p in tmp_path.rglob("*") if p.is_file()]
+    assert len(stored) == 1 and stored[0].read_bytes() == data
+    assert stored[0].name == response.sha256
+    assert response.file_size == len(data)
+    assert response.sha256 == hashlib.sha256(data).hexdigest()
+
+
+async def test_local_oversized_upload_is_removed(db_session, test_claim, small_parts, tmp_path):
+    service = LocalFileService(db_session)
+    service.upload_dir = str(tmp_path)
+
+    with pytest.raises(HTTPException) as exc:
+        await service.upload_file(test_claim.id, make_upload(b"y" * 300 * 1024))
+
+    assert exc.value.status_code == 413
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+
+
+async def test_duplicate_upload_is_stored_once(db_session, test_claim, small_parts):
+    s3 = FakeS3()
+    service = FileService(db_session, s3_client=s3)
+    data = b"same photo" * 500
+
+    first = await service.upload_file(test_claim.id, make_upload(data))
+    second = await service.upload_file(test_claim.id, make_upload(data))
+
+    assert s3.calls.count("put_object") == 1
+    assert first.id != second.id and first.s3_url == second.s3_url
+
+    # Bytes survive until the last reference is deleted
+    assert await service.delete_file(first.id)
+    assert blob_key(first.sha256) in s3.objects
+    assert await service.delete_file(second.id)
+    assert not s3.objects
+
+
+async def test_duplicate_multipart_upload_discards_staging(db_session, test_claim, small_parts):
+    s3 = FakeS3()
+    service = FileService(db_session, s3_client=s3)
+    data = bytes(range(256)) * 400
+
+    await service.upload_file(test_claim.id, make_upload(data))
+    await service.upload_file(test_claim.id, make_upload(data))
+
+    assert s3.calls.count("copy_object") == 1
+    assert list(s3.objects) == [blob_key(hashlib.sha256(data).hexdigest())]
+
+
+async def test_attach_by_hash_is_scoped_to_user(db_session, test_claim, small_parts):
+    s3 = FakeS3()
+    service = FileService(db_session, s3_client=s3)
+    data = b"receipt" * 100
+    uploaded = await service.upload_file(test_claim.id, make_upload(data))
+
+    attached = await service.attach_by_hash(test_claim.id, test_claim.user_id, uploaded.sha256, "copy.jpg")
+    assert attached.filename == "copy.jpg" and attached.s3_url == uploaded.s3_url
+    assert s3.calls.count("put_object") == 1
+
+    other = User(email="other@example.com", hashed_password="x", full_name="Other", is_active=True)
+    db_session.add(other)
+    await db_session.flush()
+    other_claim = Claim(
+        user_id=other.id,
+        incident_description="Other",
+        insurance_provider="Other Insurance",
+        policy_number="OTHER1",
+        claim_type=ClaimType.AUTO,
+    )
+    db_session.add(other_claim)
+    await db_session.commit()
+
+    assert await service.attach_by_hash(other_claim.id, other.id, uploaded.sha256, "stolen.jpg") is None
+
+
+async def test_local_duplicate_upload_is_stored_once(db_session, test_claim, small_parts, tmp_path):
+    service = LocalFileService(db_session)
+    service.upload_dir = str(tmp_path)
+    data = b"z" * 50_000
+
+    first = await service.upload_file(test_claim.id, make_upload(data))
+    second = await service.upload_file(test_claim.id, make_upload(data))
+
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+    await service.delete_file(first.id)
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+    await service.delete_file(second.id)
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+
+
+async def test_batch_upload_reports_each_file(db_session, test_claim, small_parts, no_derivatives):
+    s3 = FakeS3()
+    service = FileService(db_session, s3_client=s3)
+    payloads = [b"a" * 1000, b"b" * 2000, b"a" * 1000, b"c" * 300 * 1024, bytes(range(256)) * 400]
+
+    batch = await service.upload_files(test_claim.id, [make_upload(data) for data in payloads])
+
+    assert [item.status for item in batch.files] == ["uploaded", "uploaded", "uploaded", "failed", "uploaded"]
+    assert (batch.uploaded, batch.failed) == (4, 1)
+    assert "exceeds" in batch.files[3].error
+    # The duplicate shares the first file's blob
+    assert s3.calls.count("put_object") == 2
+    assert batch.files[0].file.s3_url == batch.files[2].file.s3_url
+    assert len(await service.get_claim_files(test_claim.id)) == 4
+    assert len(no_derivatives) == 4
+
+
+async def test_batch_upload_storage_failure_releases_blob(db_session, test_claim, small_parts):
+    class FailingS3(FakeS3):
+        def put_object(self, Bucket, Key, Body, ContentType=None):
+            if Body.startswith(b"bad"):
+                raise ClientError({"Error": {"Code": "500"}}, "PutObject")
+            super().put_object(Bucket, Key, Body, ContentType)
+
+    service = FileService(db_session, s3_client=FailingS3())
+    batch = await service.upload_files(
+        test_claim.id, [make_upload(b"bad" * 100), make_upload(b"bad" * 100), make_upload(b"good")]
+    )
+
+    assert [item.status for item in batch.files] == ["failed", "failed", "uploaded"]
+    assert not await BlobStore(db_session).exists(hashlib.sha256(b"bad" * 100).hexdigest())
+
+
+async def test_local_batch_upload(db_session, test_claim, small_parts, tmp_path):
+    service = LocalFileService(db_session)
+    service.upload_dir = str(tmp_path)
+
+    batch = await service.upload_files(test_claim.id, [make_upload(bytes([i]) * 5000) for i in range(6)])
+
+    assert batch.uploaded == 6
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 6
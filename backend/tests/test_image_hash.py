@@ -0,0 +1,166 @@
+"""Test perceptual hashing, the Hamming index and near-duplicate collapsing."""
+
+import io
+import random
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+
+from PIL import Image
+from sqlalchemy import update
+
+from app.models.blob import Blob
+from app.models.claim import Claim, ClaimFile, ClaimType
+from app.services import claim_service
+from app.services.ai_service import AIService
+from app.services.blob_store import BlobStore
+from app.services.claim_service import ClaimService
+from app.services.image_hash import HammingIndex, collapse_near_duplicates, parse_phash, phash_bytes
+
+
+def scene(seed: int, size=(800, 600)) -> Image.Image:
+    """A smooth random picture; different seeds look unrelated."""
+    rng = random.Random(seed)
+    coarse = Image.frombytes("RGB", (8, 6), bytes(rng.randrange(256) for _ in range(8 * 6 * 3)))
+    return coarse.resize(size, Image.Resampling.BICUBIC)
+
+
+def jpeg(img: Image.Image, quality: int = 90) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def distance(a: bytes, b: bytes) -> int:
+    return (parse_phash(phash_bytes(a)) ^ parse_phash(phash_bytes(b))).bit_count()
+
+
+def test_phash_survives_resizing_and_recompression():
+    original = scene(1)
+    resized = jpeg(original.resize((256, 192)), quality=60)
+
+    assert len(phash_bytes(jpeg(original))) == 16
+    assert distance(jpeg(original), resized) <= 4
+    assert distance(jpeg(original), jpeg(scene(2))) > 12
+
+
+def test_index_matches_a_linear_scan():
+    rng = random.Random(7)
+    base = [rng.getrandbits(64) for _ in range(50)]
+    hashes = {}
+    for key in range(5000):
+        value = rng.choice(base)
+        for bit in rng.sample(range(64), rng.randint(0, 12)):
+            value ^= 1 << bit
+        hashes[key] = value
+    index = HammingIndex()
+    for key, value in hashes.items():
+        index.add(key, value)
+    for key in range(0, 5000, 3):
+        index.remove(key)
+        del hashes[key]
+
+    for query in base[:10]:
+        for radius in (0, 3, 6, 9):
+            expected = {k for k, v in hashes.items() if (v ^ query).bit_count() <= radius}
+            found = index.query(query, radius)
+            assert {k for k, _ in found} == expected
+            assert [d for _, d in found] == sorted(d for _, d in found)
+    assert len(index) == len(hashes)
+
+
+async def test_analysis_sends_one_image_per_near_duplicate_group(monkeypatch):
+    first, crop, other = scene(1), scene(1).crop((8, 6, 792, 594)), scene(3)
+    files = [
+        SimpleNamespace(content_type="image/jpeg", s3_url="a", filename="a.jpg", phash=phash_bytes(jpeg(first))),
+        SimpleNamespace(content_type="image/jpeg", s3_url="b", filename="b.jpg", phash=phash_bytes(jpeg(crop))),
+        SimpleNamespace(content_type="image/jpeg", s3_url="c", filename="c.jpg", phash=phash_bytes(jpeg(other))),
+        SimpleNamespace(content_type="image/png", s3_url="d", filename="d.png", phash=None),
+    ]
+    encoded = []
+
+    async def encode(self, url):
+        encoded.append(url)
+        return url
+
+    async def request(self, messages, template, estimated_tokens):
+        raise RuntimeError("offline")
+
+    monkeypatch.setattr(AIService, "_encode_image_to_base64", encode)
+    monkeypatch.setattr(AIService, "_make_openai_request", request)
+    claim = SimpleNamespace(
+        claim_type=SimpleNamespace(value="auto"), insurance_provider=None, policy_number=None,
+        incident_date=None, incident_location=None, incident_description="Rear-ended at a light",
+    )
+
+    await AIService().analyze_claim(claim, files)
+
+    assert encoded == ["a", "c", "d"]
+    assert collapse_near_duplicates(files, lambda f: parse_phash(f.phash), 0) == files
+
+
+def photo(claim, phash):
+    return ClaimFile(
+        claim_id=claim.id, filename="p.jpg", original_filename="p.jpg", file_size=1,
+        content_type="image/jpeg", s3_key=f"blobs/{phash}", phash=phash, phash_at=datetime.utcnow(),
+    )
+
+
+async def test_reuse_lookup_keeps_a_synced_index(db_session, test_user, test_claim, monkeypatch):
+    monkeypatch.setattr(claim_service, "_PHASH_INDEXES", OrderedDict())
+    others = [
+        Claim(user_id=test_user.id, incident_description=f"Other {i}", insurance_provider="X",
+              policy_number="P", claim_type=ClaimType.AUTO)
+        for i in range(2)
+    ]
+    db_session.add_all(others)
+    await db_session.flush()
+    mine, copy = photo(test_claim, "00000000000000ff"), photo(others[0], "00000000000000fe")
+    db_session.add_all([mine, copy, photo(others[0], "ffffffff00000000")])
+    await db_session.commit()
+    service = ClaimService(db_session)
+
+    [item] = await service.find_reused_images(test_claim.id, test_user.id)
+    assert item.file_id == mine.id
+    assert [(m.file_id, m.distance) for m in item.matches] == [(copy.id, 1)]
+    cached = claim_service._PHASH_INDEXES[test_user.id]
+    assert len(cached.index) == 3
+
+    # A hash written later is picked up incrementally, into the same index
+    late = photo(others[1], "00000000000000f0")
+    db_session.add(late)
+    await db_session.commit()
+    [item] = await service.find_reused_images(test_claim.id, test_user.id)
+    assert {m.file_id for m in item.matches} == {copy.id, late.id}
+    assert claim_service._PHASH_INDEXES[test_user.id] is cached and len(cached.index) == 4
+
+    # Deleted claims drop out of the results and the cache
+    await db_session.execute(update(Claim).where(Claim.id == others[0].id).values(deleted_at=datetime.utcnow()))
+    await db_session.commit()
+    [item] = await service.find_reused_images(test_claim.id, test_user.id)
+    assert [m.file_id for m in item.matches] == [late.id]
+    assert (others[0].id, copy.id) not in cached.index
+
+
+async def test_files_attached_by_hash_are_reported_as_reused(db_session, test_user, test_claim, monkeypatch):
+    monkeypatch.setattr(claim_service, "_PHASH_INDEXES", OrderedDict())
+    other = Claim(user_id=test_user.id, incident_description="Other", insurance_provider="X",
+                  policy_number="P", claim_type=ClaimType.AUTO)
+    db_session.add(other)
+    await db_session.flush()
+    original = photo(test_claim, "00000000000000ff")
+    original.sha256 = "e" * 64
+    db_session.add_all([
+        original,
+        Blob(sha256=original.sha256, storage_key=original.s3_key, size=1, content_type="image/jpeg", ref_count=1),
+    ])
+    await db_session.commit()
+    service = ClaimService(db_session)
+    assert await service.find_reused_images(other.id, test_user.id) == []
+
+    attached = await BlobStore(db_session).attach_existing(other.id, test_user.id, original.sha256, "again.jpg")
+
+    assert attached.phash == original.phash
+    [item] = await service.find_reused_images(other.id, test_user.id)
+    assert item.file_id == attached.id
+    assert [(m.file_id, m.distance) for m in item.matches] == [(original.id, 0)]
@@ -0,0 +1,114 @@
+"""Test the worker job pool: per-type concurrency, leases and shutdown drain."""
+
+import asyncio
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.repositories import jobs_repo
+from app.repositories.jobs_repo import JobsRepo
+from app.workers.runner import JobPool
+
+
+@pytest.fixture(autouse=True)
+def fresh_stores(monkeypatch):
+    monkeypatch.setattr(jobs_repo, "_JOBS", {})
+    monkeypatch.setattr(jobs_repo, "_QUEUES", defaultdict(deque))
+    monkeypatch.setattr(jobs_repo, "_QUEUED", defaultdict(int))
+    monkeypatch.setattr(jobs_repo, "_FINISHED", defaultdict(OrderedDict))
+    monkeypatch.setattr(jobs_repo, "_LEASES", {})
+
+
+async def test_pool_runs_up_to_the_limit_per_type_at_once():
+    jobs = JobsRepo()
+    ids = [(await jobs.enqueue("user_p", "pool_io"))["id"] for _ in range(10)]
+    running = peak = 0
+
+    async def handle(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"n": job.payload}
+
+    pool = JobPool(jobs, {"pool_io": handle}, {"pool_io": 3})
+    assert await pool.fill() == 3
+    assert await pool.fill() == 0
+    await pool.drain(grace=5)
+    while await pool.fill():
+        await pool.drain(grace=5)
+
+    assert peak == 3
+    assert {(await jobs.get("user_p", job_id))["status"] for job_id in ids} == {"succeeded"}
+
+
+async def test_expired_leases_are_requeued_then_failed(monkeypatch):
+    monkeypatch.setattr(settings, "job_max_attempts", 2)
+    jobs = JobsRepo()
+    job_id = (await jobs.enqueue("user_p", "pool_lease"))["id"]
+    later = datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds + 1)
+
+    assert (await jobs.claim_next("pool_lease")).attempts == 1
+    assert await jobs.reclaim_expired(datetime.utcnow()) == 0
+    assert await jobs.reclaim_expired(later) == 1
+    assert (await jobs.get("user_p", job_id))["status"] == "queued"
+
+    second = await jobs.claim_next("pool_lease")
+    assert second.id == job_id and second.attempts == 2
+    # The first claim lost the job; its late result is dropped
+    assert not await jobs.heartbeat(job_id, 1)
+    assert not await jobs.succeed(job_id, {"stale": True}, attempt=1)
+
+    assert await jobs.reclaim_expired(later) == 1
+    job = await jobs.get("user_p", job_id)
+    assert (job["status"], job["error"]) == ("failed", "lease_expired")
+    assert await jobs.queue_depth("pool_lease") == 0
+
+
+async def test_heartbeat_cancels_jobs_whose_lease_was_lost():
+    jobs = JobsRepo()
+    job_id = (await jobs.enqueue("user_p", "pool_lost"))["id"]
+    started = asyncio.Event()
+
+    async def handle(job):
+        started.set()
+        await asyncio.Event().wait()
+
+    pool = JobPool(jobs, {"pool_lost": handle}, {"pool_lost": 1})
+    await pool.fill()
+    await started.wait()
+    await jobs.reclaim_expired(datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds + 1))
+
+    assert await pool.heartbeat() == 1
+    await asyncio.sleep(0.01)
+    assert pool.in_flight() == 0
+    # Requeued by the reclaim, and not released a second time by the cancelled task
+    assert (await jobs.get("user_p", job_id))["status"] == "queued"
+    assert await jobs.queue_depth("pool_lost") == 1
+
+
+async def test_drain_finishes_quick_jobs_and_requeues_the_rest():
+    jobs = JobsRepo()
+    quick = [(await jobs.enqueue("user_p", "pool_quick"))["id"] for _ in range(2)]
+    stuck = (await jobs.enqueue("user_p", "pool_stuck"))["id"]
+
+    async def finish(job):
+        await asyncio.sleep(0.01)
+        return {}
+
+    async def hang(job):
+        await asyncio.Event().wait()
+
+    pool = JobPool(jobs, {"pool_quick": finish, "pool_stuck": hang}, {"pool_quick": 2, "pool_stuck": 1})
+    assert await pool.fill() == 3
+
+    assert await pool.drain(grace=0.2) == 1
+
+    assert pool.in_flight() == 0
+    assert {(await jobs.get("user_p", job_id))["status"] for job_id in quick} == {"succeeded"}
+    assert (await jobs.get("user_p", stuck))["status"] == "queued"
+    # Released on shutdown, so the attempt does not count against it
+    assert (await jobs.claim_next("pool_stuck")).attempts == 1
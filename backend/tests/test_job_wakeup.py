@@ -0,0 +1,56 @@
+"""Test that idle workers wake on enqueue and back off when nothing arrives."""
+
+import asyncio
+import time
+
+from app.config import settings
+from app.repositories.jobs_repo import JobsRepo, has_queued
+from app.services.job_wakeup import Wakeup
+
+
+async def test_enqueue_wakes_an_idle_worker_at_once(monkeypatch):
+    monkeypatch.setattr(settings, "worker_poll_min_interval", 5.0)
+    monkeypatch.setattr(settings, "worker_poll_max_interval", 5.0)
+    jobs = JobsRepo()
+    wakeup = Wakeup(["wakeup_test"], lambda: has_queued(["wakeup_test"]))
+    waiting = asyncio.create_task(wakeup.wait())
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await jobs.enqueue("user_w", "wakeup_test")
+    await asyncio.wait_for(waiting, 1)
+
+    assert time.perf_counter() - start < 0.1
+    assert (await jobs.claim_next("wakeup_test")).type == "wakeup_test"
+
+
+async def test_idle_waits_back_off_and_reset(monkeypatch):
+    monkeypatch.setattr(settings, "worker_poll_min_interval", 0.01)
+    monkeypatch.setattr(settings, "worker_poll_max_interval", 0.04)
+    wakeup = Wakeup(["wakeup_idle"], lambda: has_queued(["wakeup_idle"]))
+
+    delays = []
+    for _ in range(4):
+        delays.append(wakeup.delay)
+        await wakeup.wait()
+    wakeup.reset()
+
+    assert delays == [0.01, 0.02, 0.04, 0.04]
+    assert wakeup.delay == 0.01
+
+
+async def test_unreachable_redis_falls_back_to_local_wakeup(monkeypatch):
+    monkeypatch.setattr(settings, "job_wakeup_redis", True)
+    monkeypatch.setattr(settings, "redis_url", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(settings, "worker_poll_min_interval", 0.05)
+    jobs = JobsRepo()
+    wakeup = Wakeup(["wakeup_redis"], lambda: has_queued(["wakeup_redis"]))
+
+    await wakeup.wait()  # BLPOP fails; polls locally instead of raising
+    waiting = asyncio.create_task(wakeup.wait())
+    await asyncio.sleep(0.01)
+    await jobs.enqueue("user_w", "wakeup_redis")
+    await asyncio.wait_for(waiting, 1)
+
+    assert has_queued(["wakeup_redis"])
+    await jobs.claim_next("wakeup_redis")
@@ -0,0 +1,45 @@
+"""Test per-type job queues in the in-memory jobs repo."""
+
+import asyncio
+
+from app.repositories.jobs_repo import JobsRepo, has_queued
+
+
+async def test_claims_are_fifo_per_type_and_never_shared():
+    repo = JobsRepo()
+    first = await repo.enqueue("user_q", "queue_test_a")
+    other = await repo.enqueue("user_q", "queue_test_b")
+    second = await repo.enqueue("user_q", "queue_test_a")
+    third = await repo.enqueue("user_q", "queue_test_a")
+
+    claimed = await asyncio.gather(*(repo.claim_next("queue_test_a") for _ in range(5)))
+
+    assert [job.id if job else None for job in claimed] == [first["id"], second["id"], third["id"], None, None]
+    assert all(job.status == "running" for job in claimed if job)
+    assert await repo.queue_depth("queue_test_b") == 1
+    assert (await repo.claim_next("queue_test_b")).id == other["id"]
+
+
+async def test_jobs_finished_without_a_claim_leave_the_queue():
+    repo = JobsRepo()
+    failed = await repo.enqueue("user_q", "queue_test_c")
+    kept = await repo.enqueue("user_q", "queue_test_c")
+
+    await repo.fail(failed["id"], "cancelled")
+
+    assert await repo.queue_depth("queue_test_c") == 1
+    assert (await repo.claim_next("queue_test_c")).id == kept["id"]
+    assert await repo.queue_depth("queue_test_c") == 0
+
+
+async def test_jobs_that_left_the_queue_are_skipped_without_a_search():
+    repo = JobsRepo()
+    jobs = [await repo.enqueue("user_q", "queue_test_d") for _ in range(3)]
+
+    await repo.fail(jobs[2]["id"], "cancelled")
+    await repo.start(jobs[0]["id"])
+
+    assert await repo.queue_depth("queue_test_d") == 1
+    assert (await repo.claim_next("queue_test_d")).id == jobs[1]["id"]
+    assert not has_queued(["queue_test_d"])
+    assert await repo.claim_next("queue_test_d") is None
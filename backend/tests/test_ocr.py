@@ -0,0 +1,82 @@
+"""Test page-level OCR, its result cache and the file_ocr worker stage."""
+
+from collections import OrderedDict
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.domain.models.core import File
+from app.repositories.files_repo import FilesRepo
+from app.repositories.jobs_repo import JobsRepo
+from app.services import ocr_service
+from app.services.ocr_service import OCRService
+from app.services.storage_service import StorageService
+
+
+@pytest.fixture
+def recognized(monkeypatch):
+    """Run OCR inline with a fake engine that 'reads' each page's width."""
+    pages = []
+
+    def fake_recognize(image, languages):
+        pages.append(image.width)
+        return f" width {image.width} \n"
+
+    monkeypatch.setattr(settings, "ocr_workers", 0)
+    monkeypatch.setattr(ocr_service, "_recognize", fake_recognize)
+    monkeypatch.setattr(ocr_service, "engine_version", lambda: "test-1")
+    monkeypatch.setattr(ocr_service, "_CACHE", OrderedDict())
+    return pages
+
+
+def make_pdf(path, widths):
+    # PIL writes one page per image at 72 DPI, so a 72px page renders 300px wide
+    first, *rest = [Image.new("L", (width, 100), 255) for width in widths]
+    first.save(path, "PDF", save_all=True, append_images=rest)
+    return str(path)
+
+
+async def test_pages_are_ocrd_in_order(recognized, tmp_path):
+    path = make_pdf(tmp_path / "scan.pdf", [72, 144, 288])
+
+    text = await OCRService().extract_text(path)
+
+    assert text == "width 300\fwidth 600\fwidth 1200"
+    assert await OCRService().extract_text(str(tmp_path / "notes.txt")) is None
+
+
+async def test_results_are_cached_per_content_and_engine(recognized, tmp_path, monkeypatch):
+    first = make_pdf(tmp_path / "a.pdf", [72])
+    copy = tmp_path / "b.pdf"
+    copy.write_bytes((tmp_path / "a.pdf").read_bytes())
+
+    await OCRService().extract_text(first, "application/pdf")
+    await OCRService().extract_text(str(copy), "application/pdf")
+    assert len(recognized) == 1
+
+    monkeypatch.setattr(ocr_service, "engine_version", lambda: "test-2")
+    await OCRService().extract_text(str(copy), "application/pdf")
+    assert len(recognized) == 2
+
+
+async def test_ocr_stage_writes_ocr_text(recognized, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    storage = StorageService(settings=settings, files_repo=FilesRepo(), jobs_repo=JobsRepo())
+    storage._upload_dir = str(tmp_path)
+    make_pdf(tmp_path / "receipt.pdf", [72, 72])
+    await FilesRepo().create(
+        File(
+            id="file_receipt",
+            user_id="user_a",
+            purpose="receipt",
+            content_type="application/pdf",
+            status="ready",
+            storage_key="receipt.pdf",
+        )
+    )
+
+    f = await storage.ocr_file("file_receipt")
+
+    assert f.ocr_text == "width 300\fwidth 300"
+    assert (await storage.get_file("user_a", "file_receipt")).ocr_text == f.ocr_text
@@ -0,0 +1,120 @@
+"""Test header-only EXIF extraction and its merge into claim incident metadata."""
+
+import io
+import os
+from collections import defaultdict, deque
+
+from PIL import Image
+
+from app.config import settings
+from app.domain.dto.requests import CreateClaimRequest, UpdateClaimRequest
+from app.domain.models.core import File
+from app.repositories.claims_repo import ClaimsRepo
+from app.repositories import jobs_repo
+from app.repositories.files_repo import FilesRepo
+from app.repositories.jobs_repo import JobsRepo
+from app.services.photo_metadata import EXIF_HEAD_BYTES, merge_photo_metadata, read_photo_metadata
+from app.services.storage_service import StorageService
+from app.services.virus_scan_service import ScanVerdict
+
+
+class InfectedScanner:
+    async def scan_stream(self, sha256, chunks):
+        return ScanVerdict(status="infected", signature="Test.Marker")
+
+
+def make_photo(taken="2024:05:01 14:03:22", size=(64, 64), gps=True, noise=False) -> bytes:
+    exif = Image.Exif()
+    exif[0x010F], exif[0x0110] = "Canon", "EOS R5"
+    exif.get_ifd(0x8769)[0x9003] = taken
+    exif.get_ifd(0x8769)[0x9011] = "-05:00"
+    if gps:
+        exif.get_ifd(0x8825).update({1: "N", 2: (40.0, 26.0, 46.8), 3: "W", 4: (79.0, 58.0, 55.2)})
+    img = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)) if noise else Image.new("RGB", size)
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", exif=exif, quality=95)
+    return buffer.getvalue()
+
+
+def test_reads_exif_from_header_bytes_only():
+    photo = make_photo(size=(1600, 1200), noise=True)
+    assert len(photo) > 4 * EXIF_HEAD_BYTES
+
+    metadata = read_photo_metadata(photo[:EXIF_HEAD_BYTES])
+
+    assert metadata == {
+        "taken_at": "2024-05-01T14:03:22-05:00",
+        "gps": {"lat": 40.446333, "lon": -79.982},
+        "camera": "Canon EOS R5",
+    }
+    assert read_photo_metadata(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64) == {}
+    assert read_photo_metadata(make_photo()[:40]) == {}
+
+
+async def test_stage_fills_blank_incident_fields_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    claims = ClaimsRepo()
+    storage = StorageService(settings=settings, files_repo=FilesRepo(), jobs_repo=JobsRepo(), claims_repo=claims)
+    storage._upload_dir = str(tmp_path)
+    (tmp_path / "photo.jpg").write_bytes(make_photo())
+    await FilesRepo().create(
+        File(
+            id="file_exif", user_id="user_a", purpose="incident_image", content_type="image/jpeg",
+            storage_key="photo.jpg", status="ready",
+        )
+    )
+    claim = await claims.create(
+        "user_a",
+        CreateClaimRequest(claim_type="auto", incident_location="Main St & 5th", attachments=["file_exif"]),
+    )
+
+    f = await storage.extract_photo_metadata("file_exif")
+
+    assert f.photo_metadata["camera"] == "Canon EOS R5"
+    assert claim.incident_occurred_at == "2024-05-01T14:03:22-05:00"
+    assert claim.incident_location == "Main St & 5th"
+    assert claim.incident_metadata["photos"]["file_exif"] == f.photo_metadata
+    assert claim.incident_metadata["autofilled"] == ["incident_occurred_at"]
+
+
+async def test_infected_photos_never_reach_the_claim(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    monkeypatch.setattr(jobs_repo, "_QUEUES", defaultdict(deque))
+    monkeypatch.setattr(jobs_repo, "_QUEUED", defaultdict(int))
+    claims = ClaimsRepo()
+    storage = StorageService(
+        settings=settings, files_repo=FilesRepo(), jobs_repo=JobsRepo(), scanner=InfectedScanner(), claims_repo=claims
+    )
+    storage._upload_dir = str(tmp_path)
+    (tmp_path / "infected.jpg").write_bytes(make_photo())
+    await FilesRepo().create(
+        File(
+            id="file_exif_infected", user_id="user_c", purpose="incident_image", content_type="image/jpeg",
+            storage_key="infected.jpg", sha256="f" * 64, status="scanning",
+        )
+    )
+    claim = await claims.create("user_c", CreateClaimRequest(claim_type="auto", attachments=["file_exif_infected"]))
+
+    f = await storage.scan_file("file_exif_infected")
+    assert (f.status, f.virus_scan) == ("failed", "infected")
+    assert await storage._jobs.queue_depth("file_exif") == 0
+
+    # A job queued before the verdict is a no-op once the file failed
+    f = await storage.extract_photo_metadata("file_exif_infected")
+    assert f.photo_metadata is None
+    assert "photos" not in (claim.incident_metadata or {})
+    assert claim.incident_occurred_at is None and claim.incident_location is None
+
+
+async def test_earliest_photo_wins_until_the_user_edits():
+    claim = await ClaimsRepo().create("user_b", CreateClaimRequest(claim_type="home"))
+
+    merge_photo_metadata(claim, "f2", read_photo_metadata(make_photo(taken="2024:05:02 09:00:00")))
+    merge_photo_metadata(claim, "f1", read_photo_metadata(make_photo(taken="2024:05:01 08:00:00", gps=False)))
+    assert claim.incident_occurred_at.startswith("2024-05-01T08:00:00")
+    assert claim.incident_location == "40.446333,-79.982"
+
+    await ClaimsRepo().update("user_b", claim.id, UpdateClaimRequest(incident_occurred_at="2024-04-30"))
+    merge_photo_metadata(claim, "f0", read_photo_metadata(make_photo(taken="2024:04:01 08:00:00")))
+    assert claim.incident_occurred_at == "2024-04-30"
+    assert claim.incident_metadata["autofilled"] == ["incident_location"]
@@ -0,0 +1,127 @@
+"""Test native-text policy extraction, its OCR fallback and downstream use."""
+
+from collections import OrderedDict
+
+import pytest
+
+from app.config import settings
+from app.domain.dto.requests import PolicyValidationRequest
+from app.domain.models.core import PolicyFields
+from app.repositories.providers_repo import ProvidersRepo
+from app.services import ocr_service, policy_extraction
+from app.services.policy_extraction import PolicyExtractor, parse_policy_text
+from app.services.prompt_registry import prompts
+
+
+def text_pdf(path, pages):
+    """Write a minimal PDF; each page is a list of text lines ([] = no text layer)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = ["BT /F1 11 Tf 72 760 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj 0 -16 Td")
+        ops.append("ET")
+        stream = "\n".join(ops).encode() if lines else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+FILLER = ["Section 12. General conditions apply to every coverage part of this policy."] * 3
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_workers", 0)
+    monkeypatch.setattr(ocr_service, "engine_version", lambda: "test-1")
+    monkeypatch.setattr(policy_extraction, "_CACHE", OrderedDict())
+
+
+def test_parse_policy_text_finds_fields():
+    fields = PolicyFields()
+    parse_policy_text(
+        "Policy Number: ab-4471-992\nDwelling Coverage Limit: $350,000\nAll Other Perils Deductible $1,000\n",
+        fields,
+    )
+
+    assert fields.policy_number == "AB-4471-992"
+    assert fields.coverage_limits == {"dwelling coverage": "$350,000"}
+    assert fields.deductibles == {"all other perils": "$1,000"}
+
+
+async def test_extraction_stops_once_fields_are_found(tmp_path, monkeypatch):
+    path = text_pdf(
+        tmp_path / "policy.pdf",
+        [
+            ["Declarations", "Policy Number: HO-3300129", "Liability Limit: $300,000"],
+            ["Per-claim Deductible: $2,500"],
+            *([FILLER] * 40),
+        ],
+    )
+    read = []
+    original = policy_extraction._page_text
+    monkeypatch.setattr(policy_extraction, "_page_text", lambda pdf, i: read.append(i) or original(pdf, i))
+
+    fields = await PolicyExtractor().extract(path)
+    again = await PolicyExtractor().extract(path)
+
+    assert fields.policy_number == "HO-3300129"
+    assert fields.deductibles == {"per-claim": "$2,500"}
+    assert (fields.pages_read, fields.page_count) == (2, 42)
+    assert read == [0, 1] and again is fields
+
+
+async def test_image_only_pages_fall_back_to_ocr(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_service, "_recognize", lambda image, languages: "Policy No. AUTO-778812\n")
+    path = text_pdf(tmp_path / "scan.pdf", [[], ["Collision Deductible: $500", "Bodily Injury Limit $100,000"]])
+
+    fields = await PolicyExtractor().extract(path)
+
+    assert fields.policy_number == "AUTO-778812"
+    assert fields.ocr_pages == [0]
+    assert fields.complete
+
+
+async def test_extracted_fields_feed_validation_and_prompts():
+    document = PolicyFields(policy_number="HO-3300129", deductibles={"general": "$2,500"})
+    request = PolicyValidationRequest(claim_type="home", policy_number="HO-3300128")
+
+    mismatch = await ProvidersRepo().validate_policy(request, document)
+    match = await ProvidersRepo().validate_policy(
+        PolicyValidationRequest(claim_type="home", policy_number="HO 3300129"), document
+    )
+    other_line = await ProvidersRepo().validate_policy(
+        PolicyValidationRequest(claim_type="home", policy_number="AU-3300129"), document
+    )
+    unreadable = await ProvidersRepo().validate_policy(
+        PolicyValidationRequest(claim_type="home", policy_number="ho3300129"), PolicyFields(policy_number="--")
+    )
+    prompt = prompts.get("claim_analysis").render_user(policy_details=document.prompt_text())
+
+    assert not mismatch.valid and "****0129" in mismatch.hints[0]
+    assert match.valid and match.hints == []
+    assert not other_line.valid and "****0129" in other_line.hints[0]
+    assert unreadable.valid and unreadable.hints == []
+    assert "Deductible (general): $2,500" in prompt
@@ -0,0 +1,37 @@
+"""Test prompt template compilation, budgeting and cache keys."""
+
+from app.services.prompt_registry import PromptTemplate, estimate_tokens, prompts
+
+
+def test_static_token_count_excludes_fields():
+    template = PromptTemplate("t", "1", "x" * 40, "Description: {incident_description}")
+
+    assert template.fields == ["incident_description"]
+    assert template.static_tokens == estimate_tokens("x" * 40) + estimate_tokens("Description: ") + 8
+
+
+def test_fit_trims_long_description_to_budget():
+    template = prompts.get("claim_analysis")
+    values = {"claim_type": "auto", "incident_description": "word " * 20000}
+
+    fitted = template.fit(values, budget=2000, trim_field="incident_description", images=1)
+
+    assert template.estimate(fitted, images=1) <= 2000
+    assert fitted["incident_description"].endswith("[... truncated ...]")
+    assert fitted["claim_type"] == "auto"
+
+
+def test_short_description_is_untouched():
+    template = prompts.get("claim_summary")
+    values = {"incident_description": "Hail damage to roof"}
+
+    assert template.fit(values, budget=2000, trim_field="incident_description") == values
+
+
+def test_cache_key_changes_with_version():
+    v1 = PromptTemplate("t", "1", "", "{a}")
+    v2 = PromptTemplate("t", "2", "", "{a}")
+
+    assert v1.cache_key(a="x") == v1.cache_key(a="x")
+    assert v1.cache_key(a="x") != v2.cache_key(a="x")
+    assert v1.cache_key(a="x") != v1.cache_key(a="y")
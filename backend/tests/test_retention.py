@@ -0,0 +1,68 @@
+"""Test TTL and size retention of the in-memory job, draft and PDF URL stores."""
+
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.repositories import claims_repo, jobs_repo
+from app.repositories.claims_repo import ClaimsRepo
+from app.repositories.jobs_repo import JobsRepo
+from app.services import pdf_service, retention
+from app.services.pdf_service import PDFService
+
+
+@pytest.fixture(autouse=True)
+def fresh_stores(monkeypatch):
+    monkeypatch.setattr(jobs_repo, "_JOBS", {})
+    monkeypatch.setattr(jobs_repo, "_QUEUES", defaultdict(deque))
+    monkeypatch.setattr(jobs_repo, "_QUEUED", defaultdict(int))
+    monkeypatch.setattr(jobs_repo, "_FINISHED", defaultdict(OrderedDict))
+    monkeypatch.setattr(claims_repo, "_CLAIM_DRAFTS", OrderedDict())
+    monkeypatch.setattr(pdf_service, "_PDF_URLS", OrderedDict())
+
+
+async def finished_job(repo: JobsRepo, job_type: str) -> str:
+    job = await repo.enqueue("user_r", job_type)
+    await repo.claim_next(job_type)
+    await repo.succeed(job["id"])
+    return job["id"]
+
+
+async def test_finished_jobs_expire_per_type_and_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "job_retention_by_type", {"file_exif": 60})
+    monkeypatch.setattr(settings, "job_retention_max", 3)
+    repo = JobsRepo()
+    exif = await finished_job(repo, "file_exif")
+    drafts = [await finished_job(repo, "draft_generation") for _ in range(4)]
+    queued = await repo.enqueue("user_r", "draft_generation")
+
+    with pytest.raises(KeyError):
+        await repo.get("user_r", drafts[0])  # over the cap
+    removed = await repo.expire_finished(datetime.utcnow() + timedelta(seconds=120))
+
+    assert removed == 1
+    with pytest.raises(KeyError):
+        await repo.get("user_r", exif)
+    assert (await repo.get("user_r", drafts[-1]))["status"] == "succeeded"
+    assert (await repo.get("user_r", queued["id"]))["status"] == "queued"
+    assert await repo.counts() == {"jobs": 4, "queued": 1, "finished": 3}
+
+
+async def test_sweep_drops_idle_drafts_and_old_pdf_urls(monkeypatch):
+    monkeypatch.setattr(settings, "claim_draft_max", 2)
+    claims = ClaimsRepo()
+    for claim_id in ("clm_1", "clm_2", "clm_3"):
+        await claims.save_draft(claim_id, {"summary": claim_id}, 0.5, [])
+    await PDFService(settings).enqueue_pdf_job("user_r", "clm_2")
+
+    assert await claims.get_draft("clm_1") is None
+    assert (await PDFService(settings).get_pdf("user_r", "clm_2"))["url"].endswith("clm_2.pdf")
+
+    removed = await retention.sweep_memory_stores(datetime.utcnow() + timedelta(days=30))
+    gauges = await retention.memory_gauges()
+
+    assert removed == {"jobs": 1, "claim_drafts": 2, "pdf_urls": 1}
+    assert (gauges["jobs"], gauges["claim_drafts"], gauges["pdf_urls"]) == (0, 0, 0)
+    assert gauges["rss_bytes"] > 0 and gauges["last_sweep"]["removed"] == removed
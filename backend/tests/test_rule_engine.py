@@ -0,0 +1,41 @@
+"""Test declarative batch claim validation."""
+
+from app.domain.models.core import Claim
+from app.services.rule_engine import Rule, RuleEngine, default_engine
+
+
+def make_claim(**fields) -> Claim:
+    return Claim(id=fields.pop("id", "clm_1"), user_id="user_a", claim_type=fields.pop("claim_type", "auto"), **fields)
+
+
+def test_default_rules_match_legacy_checks():
+    issues = default_engine.evaluate([make_claim()])[0]
+    severities = {i.code: i.severity for i in issues}
+
+    assert severities["POLICY_MISSING"] == "error"
+    assert severities["PROVIDER_MISSING"] == "error"
+    assert severities["DESCRIPTION_MISSING"] == "error"
+
+
+def test_rules_are_scoped_by_claim_type_and_provider():
+    engine = RuleEngine([
+        Rule("LOC", "Location missing", "warning", ("incident_location",), "missing", claim_types=("auto",)),
+        Rule("DATE", "Date missing", "error", ("incident_occurred_at",), "missing", providers=("prov_xyz",)),
+    ])
+    claims = [
+        make_claim(id="a", claim_type="auto"),
+        make_claim(id="b", claim_type="health", provider_id="prov_xyz"),
+        make_claim(id="c", claim_type="health", provider_id="prov_abc"),
+    ]
+
+    result = [[i.code for i in issues] for issues in engine.evaluate(claims)]
+
+    assert result == [["LOC"], ["DATE"], []]
+
+
+def test_length_rules_ignore_missing_values():
+    engine = RuleEngine([Rule("SHORT", "Too short", "warning", ("policy_number",), "min_digits", 6)])
+
+    result = engine.evaluate([make_claim(), make_claim(policy_number="PO-12"), make_claim(policy_number="1234567")])
+
+    assert [[i.code for i in issues] for issues in result] == [[], ["SHORT"], []]
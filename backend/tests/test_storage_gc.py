@@ -0,0 +1,102 @@
+"""Test the orphaned-object garbage collector on local disk and S3."""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.blob import Blob
+from app.models.claim import ClaimFile
+from app.services import storage_gc
+from app.services.blob_store import blob_key
+from app.services.storage_gc import StorageGarbageCollector
+
+LIVE_SHA, DEAD_SHA = "a" * 64, "b" * 64
+
+
+def attach(db_session, claim, key, sha256=None):
+    db_session.add(ClaimFile(
+        claim_id=claim.id, filename="f", original_filename="f", file_size=5,
+        content_type="image/jpeg", s3_key=key, sha256=sha256,
+    ))
+
+
+async def test_local_collection_keeps_referenced_files(db_session, test_claim, tmp_path):
+    upload_dir = str(tmp_path)
+    path = lambda key: os.path.join(upload_dir, *key.split("/"))  # noqa: E731
+    files = {
+        "live": path(blob_key(LIVE_SHA)),
+        "live_thumb": path(blob_key(LIVE_SHA)) + ".thumb.jpg",
+        "dead": path(blob_key(DEAD_SHA)),
+        "dead_medium": path(blob_key(DEAD_SHA)) + ".medium.jpg",
+        "legacy_live": path(f"claims/{test_claim.id}/a.jpg"),
+        "legacy_dead": path("claims/gone/b.jpg"),
+        "staging_old": path("staging/failed"),
+        "staging_new": path("staging/in-flight"),
+    }
+    old = time.time() - settings.storage_gc_min_age - 60
+    for name, file_path in files.items():
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as handle:
+            handle.write(b"12345")
+        if name != "staging_new":
+            os.utime(file_path, (old, old))
+    attach(db_session, test_claim, files["live"], LIVE_SHA)
+    attach(db_session, test_claim, files["legacy_live"])
+    for sha in (LIVE_SHA, DEAD_SHA):
+        db_session.add(Blob(sha256=sha, storage_key=files["live"], size=5, content_type="image/jpeg", ref_count=1))
+    await db_session.commit()
+    collector = StorageGarbageCollector(db_session, upload_dir=upload_dir)
+
+    dry = await collector.collect(dry_run=True)
+    assert all(os.path.exists(p) for p in files.values())
+    report = await collector.collect()
+
+    expected = {"dead", "dead_medium", "legacy_dead", "staging_old"}
+    assert {name for name, p in files.items() if not os.path.exists(p)} == expected
+    assert (dry.orphans, dry.bytes_reclaimed, dry.scanned) == (4, 20, 8)
+    assert (report.deleted, report.bytes_reclaimed) == (4, 20)
+    blobs = (await db_session.execute(select(Blob.sha256))).scalars().all()
+    assert blobs == [LIVE_SHA]
+
+
+class ListingS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.delete_calls = []
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys, ContinuationToken=None):
+        # Like S3, the token resumes after the last key listed
+        keys = sorted(k for k in self.objects if k.startswith(Prefix) and k > (ContinuationToken or ""))
+        page = keys[:MaxKeys]
+        modified = datetime.now(timezone.utc) - timedelta(days=30)
+        result = {
+            "Contents": [{"Key": k, "Size": len(self.objects[k]), "LastModified": modified} for k in page],
+            "IsTruncated": len(keys) > MaxKeys,
+        }
+        if result["IsTruncated"]:
+            result["NextContinuationToken"] = page[-1]
+        return result
+
+    def delete_objects(self, Bucket, Delete):
+        self.delete_calls.append(len(Delete["Objects"]))
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"])
+        return {}
+
+
+async def test_s3_orphans_are_deleted_in_page_sized_batches(db_session, test_claim, monkeypatch):
+    monkeypatch.setattr(storage_gc, "DELETE_BATCH", 3)
+    monkeypatch.setattr(settings, "storage_gc_delete_rate", 10_000)
+    s3 = ListingS3({f"claims/old/{i}.jpg": b"x" * 10 for i in range(7)})
+    s3.objects[f"claims/{test_claim.id}/kept.jpg"] = b"x"
+    attach(db_session, test_claim, f"claims/{test_claim.id}/kept.jpg")
+    await db_session.commit()
+
+    report = await StorageGarbageCollector(db_session, s3_client=s3).collect()
+
+    assert list(s3.objects) == [f"claims/{test_claim.id}/kept.jpg"]
+    assert sum(s3.delete_calls) == 7 and max(s3.delete_calls) <= 3
+    assert (report.scanned, report.deleted, report.bytes_reclaimed) == (8, 7, 70)
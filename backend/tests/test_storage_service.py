@@ -0,0 +1,243 @@
+"""Test direct-to-storage upload slots, resumable sessions and completion checks."""
+
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+
+from app.config import settings
+from app.domain.dto.requests import CreateFileRequest, CreateUploadSessionRequest
+from app.repositories.files_repo import FilesRepo
+from app.repositories.jobs_repo import JobsRepo
+from app.services.storage_service import StorageService
+
+
+class FakePresignS3:
+    """Records presign calls and serves HEAD from a dict of stored objects."""
+
+    def __init__(self):
+        self.objects = {}
+        self.presigned = []
+        self.uploads = {}
+
+    def generate_presigned_post(self, Bucket, Key, Fields, Conditions, ExpiresIn):
+        self.presigned.append({"Key": Key, "Fields": Fields, "Conditions": Conditions})
+        return {"url": f"https://{Bucket}.s3.amazonaws.com/", "fields": {"key": Key, **Fields}}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self.uploads["mp-1"] = (Key, ContentType, {})
+        return {"UploadId": "mp-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][2][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        key, content_type, parts = self.uploads.pop(UploadId)
+        data = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+        self.objects[key] = (content_type, len(data))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self.objects[Key] = self.objects[CopySource["Key"]]
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        content_type, size = self.objects[Key]
+        return {"ContentType": content_type, "ContentLength": size}
+
+
+@pytest.fixture(autouse=True)
+def no_derivatives(monkeypatch):
+    monkeypatch.setattr("app.services.storage_service.enqueue_derivatives", lambda *args: None)
+
+
+def make_service(s3=None) -> StorageService:
+    return StorageService(settings=settings, files_repo=FilesRepo(), jobs_repo=JobsRepo(), s3_client=s3)
+
+
+async def body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def test_s3_slot_is_presigned_post_with_constraints():
+    s3 = FakePresignS3()
+    storage = make_service(s3)
+
+    slot = await storage.create_upload_slot(
+        "user_a", CreateFileRequest(purpose="incident_image", content_type="image/png", bytes=2048), None
+    )
+
+    assert slot.method == "POST"
+    assert slot.fields["Content-Type"] == "image/png"
+    assert ["content-length-range", 1, 2048] in s3.presigned[0]["Conditions"]
+
+
+async def test_s3_complete_verifies_object_with_head():
+    s3 = FakePresignS3()
+    storage = make_service(s3)
+    slot = await storage.create_upload_slot(
+        "user_a", CreateFileRequest(purpose="incident_image", content_type="image/png", bytes=2048), None
+    )
+
+    with pytest.raises(HTTPException) as exc:
+        await storage.mark_complete_and_queue_scan("user_a", slot.file_id)
+    assert exc.value.status_code == 409
+
+    s3.objects[slot.fields["key"]] = ("image/png", 1500)
+    done = await storage.mark_complete_and_queue_scan("user_a", slot.file_id)
+    assert done.status == "scanning" and done.size == 1500
+
+
+async def test_s3_slot_uploads_to_staging_and_completion_moves_it():
+    s3 = FakePresignS3()
+    storage = make_service(s3)
+    slot = await storage.create_upload_slot(
+        "user_a", CreateFileRequest(purpose="incident_image", content_type="image/png", bytes=2048), None
+    )
+    staged = slot.fields["key"]
+    final = (await FilesRepo().find(slot.file_id)).storage_key
+    assert staged == f"staging/{final}"
+
+    s3.objects[staged] = ("image/png", 1500)
+    await storage.mark_complete_and_queue_scan("user_a", slot.file_id)
+    assert s3.objects == {final: ("image/png", 1500)}
+
+    # The POST policy is still valid, but a second upload cannot replace the scanned object
+    s3.objects[staged] = ("image/png", 2000)
+    with pytest.raises(HTTPException) as exc:
+        await storage.mark_complete_and_queue_scan("user_a", slot.file_id)
+    assert exc.value.status_code == 409
+    assert s3.objects[final] == ("image/png", 1500)
+
+
+async def test_slot_rejects_oversized_and_unknown_types():
+    storage = make_service(FakePresignS3())
+
+    with pytest.raises(HTTPException) as exc:
+        await storage.create_upload_slot(
+            "user_a", CreateFileRequest(purpose="other", content_type="image/png", bytes=settings.max_file_size + 1), None
+        )
+    assert exc.value.status_code == 413
+
+    with pytest.raises(HTTPException) as exc:
+        await storage.create_upload_slot("user_a", CreateFileRequest(purpose="other", content_type="text/html"), None)
+    assert exc.value.status_code == 415
+
+
+async def test_local_signed_upload_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    storage = make_service()
+    storage._upload_dir = str(tmp_path)
+    slot = await storage.create_upload_slot(
+        "user_a", CreateFileRequest(purpose="policy_pdf", content_type="application/pdf", bytes=10), None
+    )
+    query = {k: v[0] for k, v in parse_qs(urlparse(slot.upload_url).query).items()}
+    max_bytes, expires = int(query["max_bytes"]), int(query["expires"])
+
+    with pytest.raises(HTTPException) as exc:
+        await storage.receive_local_upload(slot.file_id, "application/pdf", 10**6, expires, query["signature"], body(b"x"))
+    assert exc.value.status_code == 403
+
+    with pytest.raises(HTTPException) as exc:
+        await storage.receive_local_upload(
+            slot.file_id, "application/pdf", max_bytes, expires, query["signature"], body(b"x" * 8, b"x" * 8)
+        )
+    assert exc.value.status_code == 413
+
+    await storage.receive_local_upload(
+        slot.file_id, "application/pdf", max_bytes, expires, query["signature"], body(b"%PDF", b"-1.4")
+    )
+    done = await storage.mark_complete_and_queue_scan("user_a", slot.file_id)
+    assert done.size == 8 and done.status == "scanning"
+
+    # The signed URL outlives completion; it must not swap bytes under the scan
+    with pytest.raises(HTTPException) as exc:
+        await storage.receive_local_upload(
+            slot.file_id, "application/pdf", max_bytes, expires, query["signature"], body(b"%PDF", b"evil")
+        )
+    assert exc.value.status_code == 409
+    assert (tmp_path / "uploads" / "user_a" / slot.file_id).read_bytes() == b"%PDF-1.4"
+
+
+class DroppedConnection(Exception):
+    pass
+
+
+async def dropped_after(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+    raise DroppedConnection()
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    storage = make_service()
+    storage._upload_dir = str(tmp_path)
+    return storage
+
+
+async def test_local_resumable_upload_keeps_bytes_across_drops(local_storage):
+    session = await local_storage.create_upload_session(
+        "user_a", CreateUploadSessionRequest(purpose="policy_pdf", content_type="application/pdf", bytes=12)
+    )
+
+    with pytest.raises(DroppedConnection):
+        await local_storage.append_upload_chunk("user_a", session.session_id, 0, dropped_after(b"%PDF"))
+    resumed = await local_storage.get_upload_session("user_a", session.session_id)
+    assert resumed.offset == 4
+
+    with pytest.raises(HTTPException) as exc:
+        await local_storage.append_upload_chunk("user_a", session.session_id, 0, body(b"%PDF"))
+    assert exc.value.status_code == 409 and exc.value.headers["Upload-Offset"] == "4"
+
+    await local_storage.append_upload_chunk("user_a", session.session_id, 4, body(b"-1.4", b" eof"))
+    done = await local_storage.complete_upload_session("user_a", session.session_id)
+    assert done.size == 12 and done.status == "scanning"
+
+
+async def test_s3_resumable_upload_buffers_chunks_into_parts(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "s3_multipart_part_size", 4)
+    s3 = FakePresignS3()
+    storage = make_service(s3)
+    storage._upload_dir = str(tmp_path)
+    session = await storage.create_upload_session(
+        "user_a", CreateUploadSessionRequest(purpose="incident_image", content_type="image/png", bytes=10)
+    )
+
+    # Chunks need not line up with parts; full parts go to S3 as they fill
+    await storage.append_upload_chunk("user_a", session.session_id, 0, body(b"abc"))
+    assert s3.uploads["mp-1"][2] == {}
+    with pytest.raises(DroppedConnection):
+        await storage.append_upload_chunk("user_a", session.session_id, 3, dropped_after(b"de"))
+    resumed = await storage.append_upload_chunk("user_a", session.session_id, 5, body(b"fghi", b"j"))
+    assert resumed.offset == 10
+    assert s3.uploads["mp-1"][2] == {1: b"abcd", 2: b"efgh"}
+
+    done = await storage.complete_upload_session("user_a", session.session_id)
+    assert done.size == 10
+    assert s3.objects[f"uploads/user_a/{done.id}"] == ("image/png", 10)
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+
+
+async def test_expired_sessions_are_collected(local_storage, tmp_path):
+    session = await local_storage.create_upload_session(
+        "user_a", CreateUploadSessionRequest(purpose="other", content_type="image/png", bytes=8)
+    )
+    await local_storage.append_upload_chunk("user_a", session.session_id, 0, body(b"1234"))
+
+    assert await local_storage.expire_upload_sessions(datetime.utcnow() + timedelta(days=2)) == 1
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+    assert (await local_storage.get_file("user_a", session.file_id)).status == "failed"
+    with pytest.raises(KeyError):
+        await local_storage.get_upload_session("user_a", session.session_id)
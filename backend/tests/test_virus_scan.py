@@ -0,0 +1,184 @@
+"""Test the clamd INSTREAM client, verdict cache and the file_scan worker stage."""
+
+import asyncio
+import hashlib
+import struct
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.domain.models.core import File
+from app.repositories.files_repo import FilesRepo
+from app.repositories import jobs_repo
+from app.repositories.jobs_repo import JobsRepo
+from app.services import virus_scan_service
+from app.services.storage_service import StorageService
+from app.services.virus_scan_service import ScannerError, VirusScanService, scan_metrics
+from app.workers.runner import run_scans
+
+SIGNATURE = b"TEST-MALWARE-MARKER"
+
+
+class FakeClamd:
+    """Local stand-in for clamd speaking IDSESSION, VERSION, INSTREAM and END."""
+
+    def __init__(self):
+        self.version = "27000"
+        self.connections = 0
+        self.scanned = []
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        session, request = False, 0
+        try:
+            while True:
+                command = (await reader.readuntil(b"\0"))[1:-1]
+                if command == b"IDSESSION":
+                    session = True
+                    continue
+                if command == b"END":
+                    break
+                request += 1
+                if command == b"VERSION":
+                    reply = f"ClamAV 1.2.1/{self.version}/Mon Oct 19 00:00:00 2026"
+                else:
+                    data = bytearray()
+                    while True:
+                        (length,) = struct.unpack("!L", await reader.readexactly(4))
+                        if not length:
+                            break
+                        data += await reader.readexactly(length)
+                    self.scanned.append(bytes(data))
+                    reply = "stream: Test.Marker FOUND" if SIGNATURE in data else "stream: OK"
+                writer.write(f"{request}: {reply}\0".encode() if session else f"{reply}\0".encode())
+                await writer.drain()
+                if not session:
+                    break
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+
+@pytest.fixture
+async def clamd(monkeypatch):
+    fake = FakeClamd()
+    server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+    monkeypatch.setattr(settings, "clamd_socket", None)
+    monkeypatch.setattr(settings, "clamd_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "clamd_port", server.sockets[0].getsockname()[1])
+    monkeypatch.setattr(virus_scan_service, "_VERDICTS", OrderedDict())
+    monkeypatch.setattr(virus_scan_service, "_VERSION", (0.0, ""))
+    monkeypatch.setattr(virus_scan_service, "_POOL", None)
+    yield fake
+    server.close()
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+async def test_instream_verdicts_are_cached_per_content(clamd):
+    scanner = VirusScanService()
+    clean = b"%PDF-1.4 " * 20000  # spans several INSTREAM frames
+
+    first = await scanner.scan_stream(sha(clean), chunks(clean[:100], clean[100:]))
+    again = await scanner.scan_stream(sha(clean), chunks(clean))
+    infected = await scanner.scan_stream(sha(SIGNATURE), chunks(SIGNATURE))
+
+    assert first.status == "clean" and not first.cached
+    assert again.status == "clean" and again.cached
+    assert infected.status == "infected" and infected.signature == "Test.Marker"
+    assert clamd.scanned == [clean, SIGNATURE]
+
+
+async def test_new_signatures_invalidate_cached_verdicts(clamd, monkeypatch):
+    monkeypatch.setattr(virus_scan_service, "VERSION_CHECK_INTERVAL", 0)
+    scanner = VirusScanService()
+    data = b"same bytes"
+
+    await scanner.scan_stream(sha(data), chunks(data))
+    clamd.version = "27001"
+    verdict = await scanner.scan_stream(sha(data), chunks(data))
+
+    assert not verdict.cached and len(clamd.scanned) == 2
+
+
+async def test_pool_reuses_a_bounded_number_of_sessions(clamd, monkeypatch):
+    monkeypatch.setattr(settings, "clamd_pool_size", 2)
+    scanner = VirusScanService()
+    payloads = [f"file {i}".encode() for i in range(10)]
+
+    verdicts = await asyncio.gather(*(scanner.scan_stream(sha(p), chunks(p)) for p in payloads))
+
+    assert all(v.status == "clean" for v in verdicts)
+    assert clamd.connections <= 2
+    assert scan_metrics()["pool"]["idle"] == clamd.connections
+
+
+async def test_unreachable_scanner_raises(clamd, monkeypatch):
+    monkeypatch.setattr(settings, "clamd_port", 1)
+
+    with pytest.raises(ScannerError):
+        await VirusScanService().scan_stream(sha(b"x"), chunks(b"x"))
+
+
+async def test_scan_stage_publishes_verdicts(clamd, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    monkeypatch.setattr("app.services.storage_service.enqueue_derivatives", lambda *args: None)
+    jobs = JobsRepo()
+    storage = StorageService(settings=settings, files_repo=FilesRepo(), jobs_repo=jobs)
+    storage._upload_dir = str(tmp_path)
+    for name, data in (("file_ok", b"%PDF-1.4"), ("file_bad", b"%PDF " + SIGNATURE)):
+        (tmp_path / name).write_bytes(data)
+        await FilesRepo().create(
+            File(id=name, user_id="user_a", purpose="policy_pdf", content_type="application/pdf", storage_key=name)
+        )
+        queued = await storage.mark_complete_and_queue_scan("user_a", name)
+        assert queued.status == "scanning"
+    assert await jobs.queue_depth("file_scan") >= 2
+
+    while await run_scans(jobs, storage, limit=4):
+        pass
+
+    ok, bad = await storage.get_file("user_a", "file_ok"), await storage.get_file("user_a", "file_bad")
+    assert (ok.status, ok.virus_scan) == ("ready", "clean")
+    assert (bad.status, bad.virus_scan) == ("failed", "infected")
+    assert await jobs.queue_depth("file_scan") == 0
+
+
+async def test_scanner_outage_retries_the_job_before_failing_the_file(clamd, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "aws_access_key_id", None)
+    monkeypatch.setattr(settings, "job_max_attempts", 2)
+    # Other tests leave file_scan jobs queued
+    monkeypatch.setattr(jobs_repo, "_JOBS", {})
+    monkeypatch.setattr(jobs_repo, "_QUEUES", defaultdict(deque))
+    monkeypatch.setattr(jobs_repo, "_QUEUED", defaultdict(int))
+    monkeypatch.setattr(jobs_repo, "_LEASES", {})
+    jobs = JobsRepo()
+    storage = StorageService(settings=settings, files_repo=FilesRepo(), jobs_repo=jobs)
+    storage._upload_dir = str(tmp_path)
+    (tmp_path / "file_down").write_bytes(b"%PDF-1.4")
+    await FilesRepo().create(
+        File(id="file_down", user_id="user_a", purpose="policy_pdf", content_type="application/pdf", storage_key="file_down")
+    )
+    await storage.mark_complete_and_queue_scan("user_a", "file_down")
+    monkeypatch.setattr(settings, "clamd_port", 1)
+
+    assert await run_scans(jobs, storage, limit=4) == 1
+    assert (await storage.get_file("user_a", "file_down")).status == "scanning"
+    # Held back until its retry delay passes, then requeued
+    assert await jobs.queue_depth("file_scan") == 0
+    later = datetime.utcnow() + timedelta(seconds=settings.job_retry_delay + 1)
+    assert await jobs.reclaim_expired(later) == 1
+
+    assert await run_scans(jobs, storage, limit=4) == 1
+    f = await storage.get_file("user_a", "file_down")
+    assert (f.status, f.virus_scan) == ("failed", "unknown")
+    assert await jobs.queue_depth("file_scan") == 0